@@ -62,7 +62,7 @@ function startServer() {
   }
 
   // Start Python process with stdio protocol for MCP
-  const serverProcess = spawn(pythonCmd, ['-m', 'src.server'], {
+  const serverProcess = spawn(pythonCmd, ['-m', 'src'], {
     cwd: projectRoot,
     env: env,
     stdio: 'inherit'  // Important: MCP uses stdio communication
@@ -0,0 +1,433 @@
+#!/usr/bin/env python
+"""
+生成用于压测的大型合成文档语料
+
+该脚本使用固定随机种子生成可配置规模的 PDF、Excel、PowerPoint 和 Word 文档，
+相同的参数和种子总是生成内容完全一致的文件，便于离线基准测试和回归测试。
+
+用法:
+    python create_corpus.py                     # 小规模语料 (冒烟测试)
+    python create_corpus.py --preset large      # 大规模语料 (1000 页 PDF 等)
+    python create_corpus.py --kinds pdf,xlsx --pdf-pages 200 --seed 7
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import shutil
+import zipfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from docx import Document
+from docx.enum.section import WD_SECTION
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+from pptx import Presentation
+from pptx.util import Inches, Pt
+
+
+# 固定时间戳,保证文档属性和 zip 成员时间可复现
+FIXED_TIMESTAMP = datetime(2025, 1, 1, 0, 0, 0)
+ZIP_TIMESTAMP = (1980, 1, 1, 0, 0, 0)
+
+PRESETS = {
+    "small": {
+        "pdf_pages": 20,
+        "pdf_tables_every": 4,
+        "xlsx_sheets": 2,
+        "xlsx_rows": 500,
+        "xlsx_cols": 10,
+        "xlsx_formula_ratio": 0.1,
+        "pptx_slides": 15,
+        "docx_tables": 20,
+        "docx_table_rows": 5,
+        "docx_table_cols": 4,
+        "docx_paragraphs_per_table": 2,
+    },
+    "large": {
+        "pdf_pages": 1000,
+        "pdf_tables_every": 5,
+        "xlsx_sheets": 5,
+        "xlsx_rows": 10000,
+        "xlsx_cols": 10,
+        "xlsx_formula_ratio": 0.1,
+        "pptx_slides": 300,
+        "docx_tables": 2000,
+        "docx_table_rows": 6,
+        "docx_table_cols": 4,
+        "docx_paragraphs_per_table": 2,
+    },
+}
+
+KINDS = ("pdf", "xlsx", "pptx", "docx")
+
+WORDS = (
+    "agreement", "party", "clause", "payment", "invoice", "delivery", "service",
+    "term", "notice", "liability", "warranty", "schedule", "amount", "period",
+    "contract", "revenue", "quarter", "budget", "forecast", "report", "analysis",
+    "market", "customer", "product", "region", "growth", "risk", "compliance",
+    "audit", "policy", "section", "annex", "total", "balance", "account",
+    "project", "milestone", "review", "approval", "signature", "effective",
+    "date", "renewal", "termination", "confidential", "obligation", "scope",
+)
+
+
+def sentence(rng, min_words=6, max_words=16):
+    """生成一个随机英文句子"""
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    words[0] = words[0].capitalize()
+    return " ".join(words) + "."
+
+
+def normalize_zip(path):
+    """重写 zip 包,固定成员时间戳和修改时间属性,使输出逐字节可复现"""
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with zipfile.ZipFile(path) as src, zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as dst:
+        for info in src.infolist():
+            member = zipfile.ZipInfo(info.filename, date_time=ZIP_TIMESTAMP)
+            member.compress_type = zipfile.ZIP_DEFLATED
+            member.external_attr = 0o644 << 16
+            if info.filename == "docProps/core.xml":
+                # openpyxl 保存时会把 modified 改写为当前时间
+                core = src.read(info).decode("utf-8")
+                core = re.sub(
+                    r"(<dcterms:modified[^>]*>)[^<]*(</dcterms:modified>)",
+                    rf"\g<1>{FIXED_TIMESTAMP.strftime('%Y-%m-%dT%H:%M:%SZ')}\g<2>",
+                    core,
+                )
+                dst.writestr(member, core.encode("utf-8"))
+                continue
+            with src.open(info) as fsrc, dst.open(member, "w") as fdst:
+                shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+    tmp_path.replace(path)
+
+
+# ---------------------------------------------------------------------------
+# PDF
+# ---------------------------------------------------------------------------
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _pdf_page_stream(rng, page_number, with_table):
+    """生成单页内容流: 标题、正文,以及可选的带框线表格"""
+    ops = ["BT", "/F1 16 Tf", "72 760 Td", f"(Page {page_number}: {_pdf_escape(sentence(rng, 3, 6))}) Tj", "ET"]
+
+    y = 730
+    body_lines = rng.randint(18, 30) if not with_table else rng.randint(6, 10)
+    ops += ["BT", "/F1 10 Tf", "14 TL", f"72 {y} Td"]
+    for _ in range(body_lines):
+        ops.append(f"({_pdf_escape(sentence(rng))}) '")
+        y -= 14
+    ops.append("ET")
+
+    if with_table:
+        rows, cols = rng.randint(4, 8), rng.randint(3, 5)
+        cell_w, cell_h = 460 / cols, 20
+        top = y - 30
+        left = 72
+        # 表格框线 (pdfplumber 的 lines 策略依赖这些线段)
+        ops.append("0.5 w")
+        for r in range(rows + 1):
+            yy = top - r * cell_h
+            ops.append(f"{left} {yy:.2f} m {left + cols * cell_w:.2f} {yy:.2f} l S")
+        for c in range(cols + 1):
+            xx = left + c * cell_w
+            ops.append(f"{xx:.2f} {top:.2f} m {xx:.2f} {top - rows * cell_h:.2f} l S")
+        ops += ["BT", "/F1 9 Tf"]
+        for r in range(rows):
+            for c in range(cols):
+                if r == 0:
+                    value = rng.choice(WORDS).capitalize()
+                else:
+                    value = f"{rng.uniform(0, 100000):.2f}" if c else rng.choice(WORDS)
+                x = left + c * cell_w + 4
+                yy = top - r * cell_h - 14
+                ops.append(f"1 0 0 1 {x:.2f} {yy:.2f} Tm ({_pdf_escape(value)}) Tj")
+        ops.append("ET")
+
+    return "\n".join(ops).encode("latin-1")
+
+
+def create_pdf(path, rng, pages, tables_every):
+    """逐页写出 PDF,内存占用与页数无关"""
+    offsets = {}
+    # 对象编号: 1 Catalog, 2 Pages, 3 Font, 4 Info, 之后每页 (Page, Content) 两个对象
+    first_page_obj = 5
+    page_objs = [first_page_obj + 2 * i for i in range(pages)]
+
+    with open(path, "wb") as f:
+        def write_obj(num, body):
+            offsets[num] = f.tell()
+            f.write(f"{num} 0 obj\n".encode("latin-1"))
+            f.write(body)
+            f.write(b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        write_obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        kids = " ".join(f"{n} 0 R" for n in page_objs)
+        write_obj(2, f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode("latin-1"))
+        write_obj(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        stamp = FIXED_TIMESTAMP.strftime("D:%Y%m%d%H%M%S")
+        write_obj(4, (
+            f"<< /Title (Synthetic corpus {path.stem}) /Author (create_corpus.py) "
+            f"/Producer (docxtpl-mcp corpus generator) /CreationDate ({stamp}) /ModDate ({stamp}) >>"
+        ).encode("latin-1"))
+
+        for i, page_obj in enumerate(page_objs):
+            with_table = tables_every > 0 and (i + 1) % tables_every == 0
+            stream = _pdf_page_stream(rng, i + 1, with_table)
+            write_obj(page_obj, (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_obj + 1} 0 R >>"
+            ).encode("latin-1"))
+            write_obj(page_obj + 1, f"<< /Length {len(stream)} >>\nstream\n".encode("latin-1") + stream + b"\nendstream")
+
+        total_objs = first_page_obj + 2 * pages
+        xref_offset = f.tell()
+        f.write(f"xref\n0 {total_objs}\n".encode("latin-1"))
+        f.write(b"0000000000 65535 f \n")
+        for num in range(1, total_objs):
+            f.write(f"{offsets[num]:010d} 00000 n \n".encode("latin-1"))
+        f.write((
+            f"trailer\n<< /Size {total_objs} /Root 1 0 R /Info 4 0 R >>\n"
+            f"startxref\n{xref_offset}\n%%EOF\n"
+        ).encode("latin-1"))
+
+
+# ---------------------------------------------------------------------------
+# Excel
+# ---------------------------------------------------------------------------
+
+def create_xlsx(path, rng, sheets, rows, cols, formula_ratio):
+    """使用 write_only 模式流式写出大型工作簿"""
+    wb = Workbook(write_only=True)
+    wb.properties.creator = "create_corpus.py"
+    wb.properties.title = f"Synthetic corpus {path.stem}"
+    wb.properties.created = FIXED_TIMESTAMP
+    wb.properties.modified = FIXED_TIMESTAMP
+
+    base_date = FIXED_TIMESTAMP
+    for s in range(sheets):
+        ws = wb.create_sheet(f"Sheet{s + 1}")
+        header = ["id", "name", "date"] + [f"value_{c}" for c in range(1, cols - 2)]
+        ws.append(header[:cols])
+        for r in range(2, rows + 2):
+            row = [r - 1, rng.choice(WORDS), base_date + timedelta(days=rng.randint(0, 3650))]
+            for c in range(3, cols):
+                if c > 3 and rng.random() < formula_ratio:
+                    # 引用同一行前面的列,生成可追踪的公式依赖
+                    row.append(f"={get_column_letter(c)}{r}*{rng.randint(2, 9)}")
+                else:
+                    row.append(round(rng.uniform(-1000, 100000), 2))
+            ws.append(row[:cols])
+        if rows > 1 and cols > 3:
+            ws.append([None, "total", None] + [
+                f"=SUM({get_column_letter(c + 1)}2:{get_column_letter(c + 1)}{rows + 1})" for c in range(3, cols)
+            ])
+
+    wb.save(str(path))
+    normalize_zip(path)
+
+
+# ---------------------------------------------------------------------------
+# PowerPoint
+# ---------------------------------------------------------------------------
+
+def create_pptx(path, rng, slides):
+    """生成包含标题、要点、表格和备注的演示文稿"""
+    prs = Presentation()
+    prs.core_properties.author = "create_corpus.py"
+    prs.core_properties.title = f"Synthetic corpus {path.stem}"
+    prs.core_properties.created = FIXED_TIMESTAMP
+    prs.core_properties.modified = FIXED_TIMESTAMP
+    prs.core_properties.last_modified_by = "create_corpus.py"
+
+    bullet_layout = prs.slide_layouts[1]
+    title_only_layout = prs.slide_layouts[5]
+
+    for i in range(slides):
+        if i % 5 == 4:
+            slide = prs.slides.add_slide(title_only_layout)
+            slide.shapes.title.text = f"Slide {i + 1}: {sentence(rng, 2, 4)}"
+            rows, cols = rng.randint(3, 6), rng.randint(3, 5)
+            table = slide.shapes.add_table(rows, cols, Inches(0.5), Inches(1.5), Inches(9), Inches(0.4 * rows)).table
+            for r in range(rows):
+                for c in range(cols):
+                    table.cell(r, c).text = (
+                        rng.choice(WORDS).capitalize() if r == 0 else f"{rng.uniform(0, 10000):.1f}"
+                    )
+        else:
+            slide = prs.slides.add_slide(bullet_layout)
+            slide.shapes.title.text = f"Slide {i + 1}: {sentence(rng, 2, 4)}"
+            body = slide.placeholders[1].text_frame
+            body.text = sentence(rng)
+            for _ in range(rng.randint(2, 5)):
+                para = body.add_paragraph()
+                para.text = sentence(rng)
+                para.level = rng.randint(0, 1)
+            box = slide.shapes.add_textbox(Inches(0.5), Inches(6.5), Inches(9), Inches(0.5))
+            box.text_frame.text = sentence(rng, 4, 8)
+            box.text_frame.paragraphs[0].runs[0].font.size = Pt(10)
+
+        slide.notes_slide.notes_text_frame.text = sentence(rng)
+
+    prs.save(str(path))
+    normalize_zip(path)
+
+
+# ---------------------------------------------------------------------------
+# Word
+# ---------------------------------------------------------------------------
+
+def create_docx(path, rng, tables, table_rows, table_cols, paragraphs_per_table):
+    """生成包含大量段落和表格的 Word 文档"""
+    doc = Document()
+    doc.core_properties.author = "create_corpus.py"
+    doc.core_properties.title = f"Synthetic corpus {path.stem}"
+    doc.core_properties.created = FIXED_TIMESTAMP
+    doc.core_properties.modified = FIXED_TIMESTAMP
+    doc.core_properties.last_modified_by = "create_corpus.py"
+
+    doc.add_heading(f"Synthetic document {path.stem}", 0)
+    for t in range(tables):
+        if t and t % 100 == 0:
+            doc.add_section(WD_SECTION.NEW_PAGE)
+        doc.add_heading(f"Section {t + 1}: {sentence(rng, 2, 4)}", level=2)
+        for _ in range(paragraphs_per_table):
+            doc.add_paragraph(" ".join(sentence(rng) for _ in range(rng.randint(2, 5))))
+
+        table = doc.add_table(rows=table_rows, cols=table_cols)
+        table.style = "Table Grid"
+        for r, row in enumerate(table.rows):
+            for c, cell in enumerate(row.cells):
+                if r == 0:
+                    cell.text = rng.choice(WORDS).capitalize()
+                else:
+                    cell.text = f"{rng.uniform(0, 10000):.2f}" if c else rng.choice(WORDS)
+
+    doc.save(str(path))
+    normalize_zip(path)
+
+
+def file_sha256(path):
+    """计算文件 SHA-256,写入清单用于校验语料一致性"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_corpus(output_dir, seed=42, preset="small", kinds=KINDS, count=1, **overrides):
+    """
+    生成语料并返回清单
+
+    每个文件使用由 (seed, 类型, 序号) 派生的独立随机数生成器,
+    因此只生成部分类型时,其余文件的内容也不会改变。
+    """
+    params = dict(PRESETS[preset])
+    params.update({k: v for k, v in overrides.items() if v is not None})
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = {"seed": seed, "preset": preset, "params": params, "files": []}
+
+    for kind in kinds:
+        for index in range(count):
+            rng = random.Random(f"{seed}:{kind}:{index}")
+            path = output_dir / f"corpus_{kind}_{index + 1:03d}.{kind}"
+
+            if kind == "pdf":
+                create_pdf(path, rng, params["pdf_pages"], params["pdf_tables_every"])
+                shape = {"pages": params["pdf_pages"]}
+            elif kind == "xlsx":
+                create_xlsx(path, rng, params["xlsx_sheets"], params["xlsx_rows"],
+                            params["xlsx_cols"], params["xlsx_formula_ratio"])
+                shape = {"sheets": params["xlsx_sheets"],
+                         "cells": params["xlsx_sheets"] * (params["xlsx_rows"] + 1) * params["xlsx_cols"]}
+            elif kind == "pptx":
+                create_pptx(path, rng, params["pptx_slides"])
+                shape = {"slides": params["pptx_slides"]}
+            elif kind == "docx":
+                create_docx(path, rng, params["docx_tables"], params["docx_table_rows"],
+                            params["docx_table_cols"], params["docx_paragraphs_per_table"])
+                shape = {"tables": params["docx_tables"]}
+            else:
+                raise ValueError(f"Unknown document kind: {kind}")
+
+            entry = {
+                "file": path.name,
+                "kind": kind,
+                "size": path.stat().st_size,
+                "sha256": file_sha256(path),
+                **shape,
+            }
+            manifest["files"].append(entry)
+            print(f"✅ 生成 {kind.upper()}: {path} ({entry['size'] / 1024:.1f} KB)")
+
+    with open(output_dir / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    return manifest
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="生成用于压测的合成文档语料")
+    parser.add_argument("--output-dir", default="corpus", help="输出目录 (默认: corpus)")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子 (默认: 42)")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small", help="规模预设 (默认: small)")
+    parser.add_argument("--kinds", default=",".join(KINDS), help="要生成的类型,逗号分隔 (默认: 全部)")
+    parser.add_argument("--count", type=int, default=1, help="每种类型生成的文件数 (默认: 1)")
+    parser.add_argument("--pdf-pages", type=int)
+    parser.add_argument("--pdf-tables-every", type=int, help="每 N 页插入一个带框线的表格 (0 表示不插入)")
+    parser.add_argument("--xlsx-sheets", type=int)
+    parser.add_argument("--xlsx-rows", type=int)
+    parser.add_argument("--xlsx-cols", type=int)
+    parser.add_argument("--xlsx-formula-ratio", type=float)
+    parser.add_argument("--pptx-slides", type=int)
+    parser.add_argument("--docx-tables", type=int)
+    parser.add_argument("--docx-table-rows", type=int)
+    parser.add_argument("--docx-table-cols", type=int)
+    parser.add_argument("--docx-paragraphs-per-table", type=int)
+    args = parser.parse_args()
+
+    kinds = [k.strip() for k in args.kinds.split(",") if k.strip()]
+    unknown = [k for k in kinds if k not in KINDS]
+    if unknown:
+        parser.error(f"未知的文档类型: {', '.join(unknown)} (可选: {', '.join(KINDS)})")
+
+    print(f"🚀 开始生成语料 (preset={args.preset}, seed={args.seed})...\n")
+
+    manifest = build_corpus(
+        args.output_dir,
+        seed=args.seed,
+        preset=args.preset,
+        kinds=kinds,
+        count=args.count,
+        pdf_pages=args.pdf_pages,
+        pdf_tables_every=args.pdf_tables_every,
+        xlsx_sheets=args.xlsx_sheets,
+        xlsx_rows=args.xlsx_rows,
+        xlsx_cols=args.xlsx_cols,
+        xlsx_formula_ratio=args.xlsx_formula_ratio,
+        pptx_slides=args.pptx_slides,
+        docx_tables=args.docx_tables,
+        docx_table_rows=args.docx_table_rows,
+        docx_table_cols=args.docx_table_cols,
+        docx_paragraphs_per_table=args.docx_paragraphs_per_table,
+    )
+
+    total_mb = sum(f["size"] for f in manifest["files"]) / (1024 * 1024)
+    print(f"\n✨ 语料生成完成: {len(manifest['files'])} 个文件, 共 {total_mb:.2f} MB")
+    print(f"📁 位置: {args.output_dir}/ (清单: manifest.json)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+"""
+Entry point: ``python -m src`` runs the MCP server.
+
+Worker processes import the main module of the server again, except when
+it is a package's ``__main__``; starting here keeps the tool functions
+sent to them in ``src.server``, where the forkserver preloaded them.
+"""
+
+import asyncio
+
+from .server import main
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,209 @@
+"""
+Batch parsing over directories, globs and path lists.
+
+Files are dispatched by extension to the extractors in a process pool.
+Each worker encodes its record into a spool file while the document is
+parsed and returns only the record's status; the parent appends the
+spooled line to the NDJSON output (with sendfile on Linux), so
+results are never pickled, unpickled or encoded a second time, and the
+parent holds none of them in memory.
+"""
+
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional
+
+from .extractors import SUPPORTED_EXTENSIONS, stream_docx, stream_excel, stream_pdf, stream_pptx
+from .fingerprint import FileFingerprint
+from .loader import LoadedDocument
+from .progress import report_progress
+from .streaming import Deferred, iterencode_line
+
+
+def resolve_batch_paths(
+    paths: Optional[Iterable[str]] = None,
+    directory: Optional[str] = None,
+    pattern: Optional[str] = None,
+    recursive: bool = False
+) -> List[Path]:
+    """
+    Collect the files a batch should process.
+
+    Explicit ``paths`` are kept as given, even when missing or unsupported,
+    so they show up as failures. Files found through ``directory`` and
+    ``pattern`` are filtered to supported extensions. A relative pattern is
+    resolved against ``directory`` when both are given.
+    """
+    found: List[Path] = [Path(p) for p in (paths or [])]
+
+    discovered: List[Path] = []
+    if pattern:
+        if directory and not os.path.isabs(pattern):
+            pattern = str(Path(directory) / pattern)
+        discovered.extend(Path(p) for p in glob.glob(pattern, recursive=True))
+    elif directory:
+        root = Path(directory)
+        iterator = root.rglob("*") if recursive else root.glob("*")
+        discovered.extend(iterator)
+
+    discovered = [
+        p for p in discovered
+        if p.is_file() and p.suffix.lower() in SUPPORTED_EXTENSIONS
+    ]
+    found.extend(sorted(discovered))
+
+    # Drop duplicates while keeping order
+    seen = set()
+    unique = []
+    for p in found:
+        key = str(p.resolve()) if p.exists() else str(p)
+        if key not in seen:
+            seen.add(key)
+            unique.append(p)
+    return unique
+
+
+def _stream(doc: LoadedDocument, file_type: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    if file_type == '.docx':
+        return stream_docx(doc, options.get("include_tables", True))
+    if file_type == '.pdf':
+        return stream_pdf(doc, options.get("include_tables", True))
+    if file_type in ['.xlsx', '.xls']:
+        return stream_excel(doc, None, options.get("include_formulas", True))
+    return stream_pptx(
+        doc,
+        options.get("include_tables", True),
+        options.get("include_images", False)
+    )
+
+
+def parse_file(path: str, options: Dict[str, Any], spool_path: str) -> Dict[str, Any]:
+    """
+    Parse one file with the extractor for its extension and write its
+    NDJSON line to ``spool_path``.
+
+    Runs in a worker process and never raises: failures are written and
+    returned as records with ``status: "error"``. The returned record
+    leaves out ``result``, which is only encoded into the spool file.
+    """
+    started = time.perf_counter()
+    file_path = Path(path)
+    record: Dict[str, Any] = {"file": str(file_path), "type": file_path.suffix.lower()}
+    elapsed = Deferred(lambda: round((time.perf_counter() - started) * 1000, 1))
+
+    try:
+        if not file_path.exists():
+            raise FileNotFoundError(f"File not found: {file_path}")
+        if record["type"] not in SUPPORTED_EXTENSIONS:
+            raise ValueError(f"Unsupported file type: {record['type']}")
+
+        fingerprint = FileFingerprint.of(file_path)
+        max_size_mb = options.get("max_file_size_mb")
+        if max_size_mb and fingerprint.size / (1024 * 1024) > max_size_mb:
+            raise ValueError(f"File exceeds maximum size ({max_size_mb} MB)")
+
+        doc = LoadedDocument(file_path, fingerprint)
+        try:
+            line = {**record, "status": "ok", "result": _stream(doc, record["type"], options), "elapsed_ms": elapsed}
+            with open(spool_path, "w", encoding="utf-8") as f:
+                f.writelines(iterencode_line(line))
+                f.write("\n")
+        finally:
+            doc.close()
+
+        record["status"] = "ok"
+
+    except Exception as e:
+        record.update({"status": "error", "error": f"{type(e).__name__}: {e}"})
+        # Replaces whatever was written before the failure
+        with open(spool_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({**record, "elapsed_ms": elapsed.value}, ensure_ascii=False, default=str))
+            f.write("\n")
+
+    record["elapsed_ms"] = elapsed.value
+    return record
+
+
+# sendfile only copies between regular files on Linux; elsewhere the target must be a socket
+_SENDFILE = sys.platform.startswith("linux")
+
+
+def _append(out: BinaryIO, spool_path: Path):
+    """Copy a spooled line to the end of ``out``, inside the kernel on Linux"""
+    with open(spool_path, "rb") as src:
+        size = os.fstat(src.fileno()).st_size
+        offset = 0
+        if _SENDFILE:
+            while offset < size:
+                sent = os.sendfile(out.fileno(), src.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        if offset < size:
+            src.seek(offset)
+            shutil.copyfileobj(src, out)
+
+
+def run_batch(
+    files: List[Path],
+    options: Dict[str, Any],
+    output_path: Path,
+    max_workers: int
+) -> Dict[str, Any]:
+    """Parse ``files`` in parallel, stream records to NDJSON, return a summary"""
+    started = time.perf_counter()
+    summary: Dict[str, Any] = {
+        "total": len(files),
+        "succeeded": 0,
+        "failed": 0,
+        "by_type": {},
+        "failures": [],
+        "output_file": str(output_path),
+    }
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    workers = max(1, min(max_workers, len(files)))
+
+    spool_dir = Path(tempfile.mkdtemp(prefix=f".{output_path.stem}-", dir=output_path.parent))
+    try:
+        # Unbuffered, so sendfile appends at the real end of the file
+        with open(output_path, "wb", buffering=0) as out:
+            if files:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    spools = [spool_dir / f"{i}.ndjson" for i in range(len(files))]
+                    futures = {
+                        pool.submit(parse_file, str(f), options, str(spool)): spool
+                        for f, spool in zip(files, spools)
+                    }
+                    try:
+                        for done, future in enumerate(as_completed(futures), 1):
+                            record = future.result()
+                            _append(out, futures[future])
+                            futures[future].unlink()
+
+                            type_counts = summary["by_type"].setdefault(record["type"], {"ok": 0, "error": 0})
+                            type_counts[record["status"]] += 1
+                            if record["status"] == "ok":
+                                summary["succeeded"] += 1
+                            else:
+                                summary["failed"] += 1
+                                summary["failures"].append({"file": record["file"], "error": record["error"]})
+                            report_progress(done, len(files), f"Parsed {done}/{len(files)} files")
+                    except BaseException:
+                        # Cancelled: do not start the files still queued
+                        pool.shutdown(cancel_futures=True)
+                        raise
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+    summary["output_size_mb"] = round(output_path.stat().st_size / (1024 * 1024), 2)
+    summary["total_seconds"] = round(time.perf_counter() - started, 2)
+    summary["workers"] = workers
+    return summary
@@ -0,0 +1,127 @@
+"""
+Columnar, typed output for spreadsheet data.
+
+Rows read from a sheet are turned into one array per column with an
+inferred dtype. Columns can be written to CSV, Arrow IPC or Parquet so
+large numeric sheets can be handed between tools as files instead of JSON.
+Arrow and Parquet need the optional pyarrow package.
+"""
+
+import csv
+from datetime import date, datetime, time
+from pathlib import Path
+from typing import Any, Dict, List
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+EXPORT_FORMATS = {"csv": ".csv", "arrow": ".arrow", "parquet": ".parquet"}
+EXPORT_MIME_TYPES = {
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.file",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def infer_dtype(values: List[Any]) -> str:
+    """
+    dtype of one column, ignoring empty cells.
+
+    One of "null", "bool", "int64", "float64", "datetime", "string" or
+    "mixed" (values of different kinds; exported as text).
+    """
+    kinds = set()
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            kinds.add("bool")
+        elif isinstance(value, int):
+            kinds.add("int64")
+        elif isinstance(value, float):
+            kinds.add("float64")
+        elif isinstance(value, (datetime, date)):
+            kinds.add("datetime")
+        elif isinstance(value, str):
+            kinds.add("string")
+        else:
+            kinds.add("mixed")
+
+    if not kinds:
+        return "null"
+    if kinds == {"int64", "float64"}:
+        return "float64"
+    if len(kinds) == 1:
+        return kinds.pop()
+    return "mixed"
+
+
+def _json_value(value: Any, dtype: str) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if dtype == "float64":
+        return float(value)
+    if dtype == "mixed":
+        return str(value)
+    return value
+
+
+def build_columns(names: List[str], letters: List[str], rows: List[List[Any]]) -> Dict[str, Any]:
+    """Per-column arrays and dtypes from row-major sheet values"""
+    fields = []
+    values: Dict[str, List[Any]] = {}
+    for position, (name, letter) in enumerate(zip(names, letters)):
+        column = [row[position] for row in rows]
+        dtype = infer_dtype(column)
+        fields.append({"name": name, "column": letter, "dtype": dtype})
+        values[name] = [_json_value(value, dtype) for value in column]
+    return {"fields": fields, "values": values}
+
+
+def _arrow_table(sheet: Dict[str, Any]):
+    arrow_types = {
+        "null": pa.null(),
+        "bool": pa.bool_(),
+        "int64": pa.int64(),
+        "float64": pa.float64(),
+        "datetime": pa.timestamp("us"),
+        "string": pa.string(),
+        "mixed": pa.string(),
+    }
+    arrays = []
+    for field in sheet["fields"]:
+        column = sheet["values"][field["name"]]
+        if field["dtype"] == "datetime":
+            column = [datetime.fromisoformat(v) if v is not None else None for v in column]
+        arrays.append(pa.array(column, type=arrow_types[field["dtype"]]))
+    return pa.Table.from_arrays(arrays, names=[field["name"] for field in sheet["fields"]])
+
+
+def write_columns(sheet: Dict[str, Any], path: Path, export_format: str) -> Path:
+    """Write a columnar sheet result to ``path`` as CSV, Arrow IPC or Parquet"""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+    if export_format != "csv" and pa is None:
+        raise RuntimeError(f"{export_format} export requires pyarrow (pip install pyarrow)")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    names = [field["name"] for field in sheet["fields"]]
+
+    if export_format == "csv":
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(names)
+            writer.writerows(zip(*(sheet["values"][name] for name in names)))
+    elif export_format == "arrow":
+        table = _arrow_table(sheet)
+        with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pa.parquet.write_table(_arrow_table(sheet), str(path))
+    return path
@@ -0,0 +1,270 @@
+"""
+On-disk tier of the part cache.
+
+The in-memory PartCache is private to one process, so its entries are
+lost whenever a worker process is replaced or the server restarts. Below
+it, results are kept in files shared by all processes: pickled, zstd
+compressed (zlib when the optional zstandard package is missing) and
+stored under ``<directory>/<2 hex digits>/<key hash>.bin``, so no
+directory grows too large.
+
+Every file starts with a fixed header: a magic number, the file format
+version, the schema version of the stored results, the codec, the
+uncompressed size and the cache key itself. Files written for another
+schema (i.e. by an older parser) or another key are misses and are
+removed. Files are read through a memory map, written under a
+``.partial`` name and renamed, and the oldest ones are deleted once the
+directory exceeds ``max_bytes``.
+
+Reading a cache file unpickles it, which runs whatever code the file
+asks for, so the cache directory is trusted like the server's own code.
+It is created with mode 0700, and the disk tier is turned off when the
+directory belongs to another user or others can write to it. A file that
+is not owned by this user, or that others can write to, is removed
+unread.
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import pickle
+import stat
+import struct
+import tempfile
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Hashable, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"DCPC"
+_FORMAT_VERSION = 1
+# magic, format version, schema version, codec, uncompressed size, key length
+_HEADER = struct.Struct("<4sHIBQI")
+
+_CODEC_ZLIB = 1
+_CODEC_ZSTD = 2
+
+# Eviction deletes files until the directory is below this share of max_bytes
+_EVICT_TO = 0.8
+
+
+def _private(st: os.stat_result) -> bool:
+    """Owned by this user and not writable by group or others"""
+    if not hasattr(os, "geteuid"):
+        # No POSIX ownership (Windows): rely on the directory's ACL
+        return True
+    return st.st_uid == os.geteuid() and not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def _compress(data: bytes) -> Tuple[int, bytes]:
+    if zstandard is not None:
+        return _CODEC_ZSTD, zstandard.compress(data, 3)
+    return _CODEC_ZLIB, zlib.compress(data, 6)
+
+
+def _decompress(codec: int, data) -> bytes:
+    if codec == _CODEC_ZSTD and zstandard is not None:
+        return zstandard.decompress(data)
+    if codec == _CODEC_ZLIB:
+        return zlib.decompress(data)
+    raise ValueError(f"Unsupported codec {codec}")
+
+
+class DiskCache:
+    """
+    Compressed result files in ``directory``, at most about ``max_bytes``.
+
+    ``schema`` is the version of the stored results; bump it whenever the
+    parsers produce differently shaped results. Reading and writing are
+    best effort: an unreadable file is a miss and a failed write is
+    skipped.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, schema: int = 0):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.schema = schema
+        self.hits = 0
+        self.misses = 0
+        # Bytes in the directory, counted on the first write and kept up to
+        # date by this process; other processes' writes are found when evicting
+        self._size: Optional[int] = None
+        # Whether the directory is safe to unpickle from, checked on first use
+        self._trusted: Optional[bool] = None
+        self._lock = threading.Lock()
+
+    def _usable(self) -> bool:
+        if self._trusted is None:
+            try:
+                self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+                st = os.lstat(self.directory)
+                if stat.S_ISDIR(st.st_mode) and _private(st) and stat.S_IMODE(st.st_mode) != 0o700:
+                    # Created by an older version or under another umask
+                    os.chmod(self.directory, 0o700)
+                    st = os.lstat(self.directory)
+                trusted = stat.S_ISDIR(st.st_mode) and _private(st)
+            except OSError:
+                trusted = False
+            if not trusted:
+                logger.warning(f"Disk cache disabled: {self.directory} is not a private directory of this user")
+            self._trusted = trusted
+        return self._trusted
+
+    @staticmethod
+    def _key_bytes(key: Hashable) -> bytes:
+        return repr(key).encode("utf-8")
+
+    def _path(self, key_bytes: bytes) -> Path:
+        digest = hashlib.blake2b(key_bytes, digest_size=16).hexdigest()
+        return self.directory / digest[:2] / f"{digest}.bin"
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        found = self.lookup(key)
+        return found[0] if found is not None else None
+
+    def lookup(self, key: Hashable) -> Optional[Tuple[Any, int]]:
+        """Value stored under ``key`` and the length of its pickle, or None"""
+        if not self._usable():
+            return None
+        key_bytes = self._key_bytes(key)
+        path = self._path(key_bytes)
+        try:
+            found = self._read(path, key_bytes)
+        except FileNotFoundError:
+            found = None
+        except Exception:
+            # Truncated, corrupt, from another schema or not ours
+            path.unlink(missing_ok=True)
+            found = None
+        with self._lock:
+            if found is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if found is not None:
+            try:
+                # Eviction removes the least recently used files first
+                os.utime(path)
+            except OSError:
+                pass
+        return found
+
+    def _read(self, path: Path, key_bytes: bytes) -> Tuple[Any, int]:
+        with open(path, "rb") as f:
+            if not _private(os.fstat(f.fileno())):
+                raise ValueError(f"Cache file {path.name} is not a private file of this user")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                magic, version, schema, codec, size, key_length = _HEADER.unpack_from(data)
+                if magic != _MAGIC or version != _FORMAT_VERSION or schema != self.schema:
+                    raise ValueError(f"Stale cache file {path.name}")
+                start = _HEADER.size + key_length
+                if data[_HEADER.size:start] != key_bytes:
+                    raise ValueError(f"Cache file {path.name} belongs to another key")
+                with memoryview(data) as view:
+                    raw = _decompress(codec, view[start:])
+        if len(raw) != size:
+            raise ValueError(f"Truncated cache file {path.name}")
+        return pickle.loads(raw), size
+
+    def put(self, key: Hashable, value: Any, pickled: Optional[bytes] = None):
+        """Store ``value``; pass ``pickled`` when the caller has already pickled it"""
+        if self.max_bytes <= 0 or not self._usable():
+            return
+        key_bytes = self._key_bytes(key)
+        path = self._path(key_bytes)
+        raw = pickled
+        if raw is None:
+            try:
+                raw = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception:
+                return
+        codec, payload = _compress(raw)
+        header = _HEADER.pack(_MAGIC, _FORMAT_VERSION, self.schema, codec, len(raw), len(key_bytes))
+        written = len(header) + len(key_bytes) + len(payload)
+        if written > self.max_bytes:
+            return
+
+        try:
+            path.parent.mkdir(mode=0o700, exist_ok=True)
+            # mkstemp creates the file with mode 0600
+            fd, partial = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".partial")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(header)
+                    f.write(key_bytes)
+                    f.write(payload)
+                os.replace(partial, path)
+            except BaseException:
+                Path(partial).unlink(missing_ok=True)
+                raise
+        except OSError:
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += written
+            evict = self._size > self.max_bytes
+        if evict:
+            self.evict()
+
+    def _files(self):
+        """(mtime, size, path) of every cache file"""
+        files = []
+        if not self.directory.exists():
+            return files
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".bin"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return files
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._files())
+
+    @property
+    def size(self) -> int:
+        """Bytes currently in the cache directory"""
+        return self._scan_size()
+
+    def evict(self):
+        """Delete the least recently used files until well below ``max_bytes``"""
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * _EVICT_TO
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        with self._lock:
+            self._size = total
+
+    def clear(self):
+        for _, _, path in self._files():
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,1011 @@
+"""
+Content extraction for DOCX, PDF, Excel and PowerPoint documents.
+
+Functions here take a LoadedDocument and return plain Python structures;
+the tool methods in server.py add validation and response formatting.
+The stream_* variants of the parsers return the same result with its
+pages, slides, sheets, paragraphs and tables as generators (see
+streaming), to be consumed while the document is still open.
+"""
+
+import re
+from datetime import datetime, date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from lxml import etree
+from openpyxl.packaging.core import DocumentProperties
+from openpyxl.worksheet.formula import ArrayFormula
+from openpyxl.xml.functions import fromstring
+from pdfminer.pdftypes import resolve1
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.opc.constants import CONTENT_TYPE as CT
+from pptx.opc.packuri import PackURI
+from pptx.oxml import parse_xml
+from pptx.parts.coreprops import CorePropertiesPart
+
+from .formula_graph import FormulaGraph
+from .loader import LoadedDocument
+from .pdf_text import fast_pdf_text
+from .progress import report_progress
+from .sheet_query import SheetQuery, trim_rows
+from .streaming import Deferred, materialize
+from .used_range import scan_used_range
+
+SUPPORTED_EXTENSIONS = ['.docx', '.pdf', '.xlsx', '.xls', '.pptx']
+
+# Version of the per-part results cached on disk (slides, sheets, used ranges, formula
+# graphs); bump it whenever their shape changes so results of older parsers are discarded
+RESULT_SCHEMA = 1
+
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_HEADER_PART = re.compile(r"^/word/header\d*\.xml$")
+_FOOTER_PART = re.compile(r"^/word/footer\d*\.xml$")
+
+
+def _isoformat(value) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _flush_page(page):
+    """Drop pdfplumber's cached layout objects once a page is done"""
+    page.flush_cache()
+
+
+def parse_index_range(spec: str) -> List[int]:
+    """
+    Zero-based indices for a 1-based range such as "3", "1-5" or "1,3,5".
+
+    Comma-separated items may themselves be ranges ("1-3,7"). Raises
+    ValueError for anything else.
+    """
+    indices: List[int] = []
+    for item in spec.split(','):
+        item = item.strip()
+        if '-' in item:
+            start, end = item.split('-')
+            indices.extend(range(int(start) - 1, int(end)))
+        else:
+            indices.append(int(item) - 1)
+    return indices
+
+
+# Content stream operators that construct paths (rectangles, lines, curves)
+_PATH_OPERATORS = {b"re", b"l", b"c", b"v", b"y"}
+
+
+def page_may_have_tables(page) -> bool:
+    """
+    Cheap check whether pdfplumber's default "lines" table strategy can find
+    anything on a page.
+
+    That strategy only builds tables from ruling lines, rectangles and
+    curves, so a page whose content streams construct no paths cannot
+    contain one. The check tokenizes the raw content streams instead of
+    running layout analysis; pages that draw form XObjects are always
+    treated as candidates.
+    """
+    page_obj = page.page_obj
+    xobjects = resolve1((page_obj.resources or {}).get("XObject")) or {}
+    for xobject in xobjects.values():
+        subtype = resolve1(xobject).get("Subtype")
+        if getattr(subtype, "name", None) == "Form":
+            return True
+
+    for stream in page_obj.contents or []:
+        data = resolve1(stream).get_data()
+        if _PATH_OPERATORS.intersection(data.split()):
+            return True
+    return False
+
+
+# ---------------------------------------------------------------------------
+# Metadata
+# ---------------------------------------------------------------------------
+
+def extract_metadata(doc: LoadedDocument) -> Dict[str, Any]:
+    """Full metadata for get_document_metadata, memoized per loaded document"""
+    return doc.memoize("metadata", lambda: _extract_metadata(doc))
+
+
+def _extract_metadata(doc: LoadedDocument) -> Dict[str, Any]:
+    metadata = {
+        "filename": doc.path.name,
+        "file_path": str(doc.path),
+        "file_size_mb": round(doc.file_size_mb, 2),
+        "file_type": doc.suffix,
+    }
+
+    if doc.suffix == '.docx':
+        document = doc.docx
+        core_props = document.core_properties
+
+        metadata.update({
+            "author": core_props.author or "Unknown",
+            "title": core_props.title or "",
+            "subject": core_props.subject or "",
+            "keywords": core_props.keywords or "",
+            "created": _isoformat(core_props.created),
+            "modified": _isoformat(core_props.modified),
+            "last_modified_by": core_props.last_modified_by or "",
+            "revision": core_props.revision,
+            "category": core_props.category or "",
+            "comments": core_props.comments or "",
+        })
+
+        # Document statistics
+        metadata["statistics"] = {
+            "paragraphs": len(document.paragraphs),
+            "tables": len(document.tables),
+            "sections": len(document.sections)
+        }
+
+    elif doc.suffix == '.pdf':
+        pdf = doc.pdf
+        pdf_metadata = pdf.metadata or {}
+
+        metadata.update({
+            "pages": len(pdf.pages),
+            "author": pdf_metadata.get('Author', 'Unknown'),
+            "title": pdf_metadata.get('Title', ''),
+            "subject": pdf_metadata.get('Subject', ''),
+            "creator": pdf_metadata.get('Creator', ''),
+            "producer": pdf_metadata.get('Producer', ''),
+            "created": pdf_metadata.get('CreationDate', ''),
+            "modified": pdf_metadata.get('ModDate', ''),
+        })
+
+    elif doc.suffix in ['.xlsx', '.xls']:
+        wb = doc.any_workbook()
+
+        metadata.update({
+            "sheets_count": len(wb.sheetnames),
+            "sheet_names": wb.sheetnames,
+        })
+
+        # Add workbook properties if available
+        if wb.properties:
+            props = wb.properties
+            metadata.update({
+                "creator": props.creator or "Unknown",
+                "title": props.title or "",
+                "subject": props.subject or "",
+                "description": props.description or "",
+                "keywords": props.keywords or "",
+                "created": _isoformat(props.created),
+                "modified": _isoformat(props.modified),
+                "last_modified_by": props.lastModifiedBy or "",
+                "category": props.category or "",
+            })
+
+        # Calculate statistics from the cells that hold content
+        total_cells = 0
+        for sheet_name in wb.sheetnames:
+            used = sheet_used_range(doc, sheet_name)
+            if used is not None:
+                total_cells += used[0] * used[1]
+                continue
+            ws = wb[sheet_name]
+            if ws.max_row and ws.max_column:
+                total_cells += ws.max_row * ws.max_column
+
+        metadata["statistics"] = {
+            "total_cells": total_cells
+        }
+
+    elif doc.suffix == '.pptx':
+        prs = doc.presentation
+
+        metadata.update({
+            "total_slides": len(prs.slides),
+            "slide_width": prs.slide_width,
+            "slide_height": prs.slide_height,
+        })
+
+        # Add core properties if available
+        if prs.core_properties:
+            metadata.update(_pptx_core_properties(prs.core_properties))
+
+        # Calculate statistics
+        total_shapes = sum(len(slide.shapes) for slide in prs.slides)
+        total_tables = sum(1 for slide in prs.slides for shape in slide.shapes if shape.has_table)
+
+        metadata["statistics"] = {
+            "total_shapes": total_shapes,
+            "total_tables": total_tables
+        }
+
+    else:
+        raise ValueError(f"Unsupported file type: {doc.suffix}")
+
+    return metadata
+
+
+def _pptx_core_properties(props) -> Dict[str, Any]:
+    return {
+        "author": props.author or "Unknown",
+        "title": props.title or "",
+        "subject": props.subject or "",
+        "created": _isoformat(props.created),
+        "modified": _isoformat(props.modified),
+        "last_modified_by": props.last_modified_by or "",
+    }
+
+
+# ---------------------------------------------------------------------------
+# Plain text
+# ---------------------------------------------------------------------------
+
+def extract_text(doc: LoadedDocument, engine: str = "layout", max_workers: int = 1) -> str:
+    """
+    Plain text of a document, memoized per loaded document.
+
+    ``engine="fast"`` reads PDF text layers without layout analysis, in
+    parallel across pages for large files; other formats ignore it.
+    """
+    if engine == "fast" and doc.suffix == '.pdf':
+        return doc.memoize(("text", "fast"), lambda: fast_pdf_text(doc.path, max_workers))
+    return doc.memoize("text", lambda: _extract_text(doc))
+
+
+def text_statistics(doc: LoadedDocument, engine: str = "layout", max_workers: int = 1) -> Dict[str, int]:
+    """Character, word and line counts of the extracted text, memoized with it"""
+    def compute() -> Dict[str, int]:
+        text = extract_text(doc, engine, max_workers)
+        return {
+            "chars": len(text),
+            "words": len(text.split()),
+            "lines": text.count('\n') + 1,
+        }
+    return doc.memoize(("text_stats", engine), compute)
+
+
+def text_chunks(text: str, chunk_size: int, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    """
+    Split ``text[start:stop]`` into pieces of at most ``chunk_size`` characters.
+
+    A piece ends after the last line break in its second half when there is
+    one, so lines are only cut when they are longer than half a chunk.
+    Pieces are produced one at a time, without copying the range first.
+    """
+    stop = len(text) if stop is None else min(stop, len(text))
+    while start < stop:
+        end = min(start + chunk_size, stop)
+        if end < stop:
+            newline = text.rfind('\n', start + chunk_size // 2, end)
+            if newline != -1:
+                end = newline + 1
+        yield text[start:end]
+        start = end
+
+
+def _extract_text(doc: LoadedDocument) -> str:
+    if doc.suffix == '.docx':
+        return docx_text(doc)
+
+    elif doc.suffix == '.pdf':
+        text_parts = []
+        pages = doc.pdf.pages
+        for idx, page in enumerate(pages):
+            page_text = doc.pdf_page_text(idx)
+            _flush_page(page)
+            if page_text:
+                text_parts.append(page_text)
+            report_progress(idx + 1, len(pages), f"Extracted text of page {idx + 1}/{len(pages)}")
+        return "\n\n".join(text_parts)
+
+    elif doc.suffix in ['.xlsx', '.xls']:
+        wb = doc.workbook(data_only=True, read_only=True)
+        text_parts = []
+        for sheet_name in wb.sheetnames:
+            ws = wb[sheet_name]
+            text_parts.append(f"=== {sheet_name} ===\n")
+            for row in ws.iter_rows(values_only=True):
+                row_text = "\t".join([str(cell) if cell is not None else "" for cell in row])
+                if row_text.strip():
+                    text_parts.append(row_text)
+        return "\n".join(text_parts)
+
+    elif doc.suffix == '.pptx':
+        prs = doc.presentation
+        text_parts = []
+        for idx, slide in enumerate(prs.slides, 1):
+            text_parts.append(f"=== Slide {idx} ===")
+
+            # Extract title
+            if slide.shapes.title:
+                text_parts.append(f"Title: {slide.shapes.title.text}")
+
+            # Extract text from all shapes
+            for shape in slide.shapes:
+                if shape.has_text_frame and shape != slide.shapes.title:
+                    text = shape.text_frame.text.strip()
+                    if text:
+                        text_parts.append(text)
+
+            # Extract notes
+            if slide.has_notes_slide:
+                notes_text = slide.notes_slide.notes_text_frame.text.strip()
+                if notes_text:
+                    text_parts.append(f"Notes: {notes_text}")
+
+            text_parts.append("")  # Empty line between slides
+
+        return "\n".join(text_parts)
+
+    raise ValueError(f"Unsupported file type: {doc.suffix}")
+
+
+def _wordml_text(element) -> str:
+    """Text of a WordprocessingML element tree, following docx2txt's rules"""
+    parts = []
+    for child in element.iter():
+        if child.tag == f"{_W_NS}t":
+            parts.append(child.text or '')
+        elif child.tag == f"{_W_NS}tab":
+            parts.append('\t')
+        elif child.tag in (f"{_W_NS}br", f"{_W_NS}cr"):
+            parts.append('\n')
+        elif child.tag == f"{_W_NS}p":
+            parts.append('\n\n')
+    return ''.join(parts)
+
+
+def docx_text(doc: LoadedDocument) -> str:
+    """
+    Headers, body and footers as plain text.
+
+    Reads the XML already parsed by python-docx instead of unzipping the
+    package a second time with docx2txt.
+    """
+    package = doc.docx.part.package
+    parts = sorted(package.iter_parts(), key=lambda part: str(part.partname))
+
+    def part_text(part) -> str:
+        element = getattr(part, "element", None)
+        if element is None:
+            element = etree.fromstring(part.blob)
+        return _wordml_text(element)
+
+    text = ''.join(part_text(p) for p in parts if _HEADER_PART.match(str(p.partname)))
+    text += _wordml_text(doc.docx.element)
+    text += ''.join(part_text(p) for p in parts if _FOOTER_PART.match(str(p.partname)))
+    return text.strip()
+
+
+# ---------------------------------------------------------------------------
+# Located text segments (search indexing)
+# ---------------------------------------------------------------------------
+
+SEGMENT_PARAGRAPHS = 20
+SEGMENT_ROWS = 200
+
+
+def extract_segments(doc: LoadedDocument) -> Iterator[Tuple[Dict[str, Any], str]]:
+    """
+    Yield ``(location, text)`` pairs small enough to index individually.
+
+    Locations are ``{"page": n}`` for PDF, ``{"slide": n}`` for PowerPoint,
+    ``{"sheet": name, "rows": [first, last]}`` for Excel and
+    ``{"paragraphs": [first, last]}`` or ``{"table": n}`` for DOCX.
+    """
+    if doc.suffix == '.docx':
+        document = doc.docx
+        block: List[str] = []
+        first = 1
+        for number, para in enumerate(document.paragraphs, 1):
+            if para.text.strip():
+                block.append(para.text)
+            if number - first + 1 >= SEGMENT_PARAGRAPHS:
+                if block:
+                    yield {"paragraphs": [first, number]}, "\n".join(block)
+                block, first = [], number + 1
+        if block:
+            yield {"paragraphs": [first, len(document.paragraphs)]}, "\n".join(block)
+
+        for table_idx, table in enumerate(document.tables, 1):
+            rows = ["\t".join(cell.text for cell in row.cells) for row in table.rows]
+            text = "\n".join(r for r in rows if r.strip())
+            if text:
+                yield {"table": table_idx}, text
+
+    elif doc.suffix == '.pdf':
+        for idx, page in enumerate(doc.pdf.pages):
+            text = doc.pdf_page_text(idx)
+            _flush_page(page)
+            if text.strip():
+                yield {"page": idx + 1}, text
+
+    elif doc.suffix in ['.xlsx', '.xls']:
+        wb = doc.workbook(data_only=True, read_only=True)
+        for sheet_name in wb.sheetnames:
+            lines: List[str] = []
+            first = row_number = 1
+            for row_number, row in enumerate(wb[sheet_name].iter_rows(values_only=True), 1):
+                row_text = "\t".join(str(cell) if cell is not None else "" for cell in row)
+                if row_text.strip():
+                    lines.append(row_text)
+                if row_number - first + 1 >= SEGMENT_ROWS:
+                    if lines:
+                        yield {"sheet": sheet_name, "rows": [first, row_number]}, "\n".join(lines)
+                    lines, first = [], row_number + 1
+            if lines:
+                yield {"sheet": sheet_name, "rows": [first, row_number]}, "\n".join(lines)
+
+    elif doc.suffix == '.pptx':
+        for idx, slide in enumerate(doc.presentation.slides, 1):
+            parts = []
+            title = slide.shapes.title
+            if title is not None and title.text:
+                parts.append(title.text)
+            for shape in slide.shapes:
+                if shape.has_text_frame and shape != title:
+                    text = shape.text_frame.text.strip()
+                    if text:
+                        parts.append(text)
+                if shape.has_table:
+                    for row in shape.table.rows:
+                        parts.append("\t".join(cell.text for cell in row.cells))
+            if slide.has_notes_slide:
+                notes_text = slide.notes_slide.notes_text_frame.text.strip()
+                if notes_text:
+                    parts.append(notes_text)
+            if parts:
+                yield {"slide": idx}, "\n".join(parts)
+
+    else:
+        raise ValueError(f"Unsupported file type: {doc.suffix}")
+
+
+# ---------------------------------------------------------------------------
+# Structured parsing
+# ---------------------------------------------------------------------------
+
+def parse_docx(doc: LoadedDocument, include_tables: bool = True) -> Dict[str, Any]:
+    """Paragraphs with styles, tables and core metadata of a DOCX document"""
+    return materialize(stream_docx(doc, include_tables))
+
+
+def stream_docx(doc: LoadedDocument, include_tables: bool = True) -> Dict[str, Any]:
+    """parse_docx with the paragraphs and tables produced one at a time"""
+    document = doc.docx
+
+    # Extract metadata
+    core_props = document.core_properties
+    metadata = {
+        "filename": doc.path.name,
+        "file_size_mb": round(doc.file_size_mb, 2),
+        "author": core_props.author or "Unknown",
+        "title": core_props.title or "",
+        "subject": core_props.subject or "",
+        "created": _isoformat(core_props.created),
+        "modified": _isoformat(core_props.modified),
+        "last_modified_by": core_props.last_modified_by or "",
+    }
+
+    counts = {"paragraphs": 0, "tables": 0}
+
+    # Extract paragraphs with styles
+    def paragraphs():
+        for para in document.paragraphs:
+            if para.text.strip():  # Skip empty paragraphs
+                counts["paragraphs"] += 1
+                yield {
+                    "text": para.text,
+                    "style": para.style.name if para.style else "Normal"
+                }
+
+    # Extract tables if requested
+    def tables():
+        if not include_tables:
+            return
+        for table_idx, table in enumerate(document.tables):
+            table_data = []
+            for row in table.rows:
+                row_data = [cell.text for cell in row.cells]
+                table_data.append(row_data)
+
+            counts["tables"] += 1
+            yield {
+                "table_number": table_idx + 1,
+                "rows": len(table.rows),
+                "columns": len(table.columns),
+                "data": table_data
+            }
+
+    return {
+        "metadata": metadata,
+        "content": {
+            "paragraphs": paragraphs(),
+            "paragraph_count": Deferred(lambda: counts["paragraphs"]),
+            "tables": tables(),
+            "table_count": Deferred(lambda: counts["tables"])
+        }
+    }
+
+
+def parse_pdf(
+    doc: LoadedDocument,
+    include_tables: bool = True,
+    page_indices: Optional[Iterable[int]] = None,
+    table_pages: Optional[Iterable[int]] = None
+) -> Dict[str, Any]:
+    """
+    Per-page text, tables and dimensions of a PDF document.
+
+    Table extraction only runs on pages in ``table_pages`` (all parsed pages
+    when None) that pass the page_may_have_tables pre-check.
+    """
+    return materialize(stream_pdf(doc, include_tables, page_indices, table_pages))
+
+
+def stream_pdf(
+    doc: LoadedDocument,
+    include_tables: bool = True,
+    page_indices: Optional[Iterable[int]] = None,
+    table_pages: Optional[Iterable[int]] = None
+) -> Dict[str, Any]:
+    """parse_pdf with the pages produced one at a time"""
+    pdf = doc.pdf
+
+    metadata = {
+        "filename": doc.path.name,
+        "file_size_mb": round(doc.file_size_mb, 2),
+        "pages": len(pdf.pages),
+        "metadata": pdf.metadata or {}
+    }
+
+    page_indices = list(range(len(pdf.pages)) if page_indices is None else page_indices)
+    if table_pages is not None:
+        table_pages = set(table_pages)
+
+    counts = {"pages": 0, "table_pages_scanned": 0}
+
+    # Extract content from pages
+    def pages():
+        for done, idx in enumerate(page_indices, 1):
+            if idx >= len(pdf.pages):
+                continue
+
+            page = pdf.pages[idx]
+            page_info = {
+                "page_number": idx + 1,
+                "text": doc.pdf_page_text(idx),
+                "width": page.width,
+                "height": page.height
+            }
+
+            # Extract tables if requested
+            page_info["tables"] = []
+            if include_tables and (table_pages is None or idx in table_pages) and page_may_have_tables(page):
+                counts["table_pages_scanned"] += 1
+                tables = page.extract_tables()
+                if tables:
+                    page_info["tables"] = [
+                        {
+                            "table_number": t_idx + 1,
+                            "rows": len(table),
+                            "columns": len(table[0]) if table else 0,
+                            "data": table
+                        }
+                        for t_idx, table in enumerate(tables)
+                    ]
+
+            _flush_page(page)
+            counts["pages"] += 1
+            report_progress(done, len(page_indices), f"Parsed page {idx + 1} ({done}/{len(page_indices)})")
+            yield page_info
+
+    return {
+        "metadata": metadata,
+        "pages": pages(),
+        "total_pages_parsed": Deferred(lambda: counts["pages"]),
+        "table_pages_scanned": Deferred(lambda: counts["table_pages_scanned"])
+    }
+
+
+def _excel_properties(doc: LoadedDocument):
+    """Workbook core properties, read from docProps/core.xml when the package is indexed"""
+    package = doc.package
+    if package is None:
+        return doc.workbook(data_only=False, read_only=False).properties
+    blob = package.read("docProps/core.xml")
+    return DocumentProperties.from_tree(fromstring(blob)) if blob else DocumentProperties()
+
+
+def sheet_names(doc: LoadedDocument) -> List[str]:
+    """Sheet names in workbook order"""
+    package = doc.package
+    if package is not None and package.sheets is not None:
+        return [name for name, _ in package.sheets]
+    return doc.workbook(data_only=False, read_only=False).sheetnames
+
+
+def sheet_used_range(doc: LoadedDocument, name: str) -> Optional[Tuple[int, int]]:
+    """
+    (rows, columns) spanned by cells with content, starting at A1.
+
+    Computed by streaming the worksheet XML and cached per sheet part, so
+    formatting-only cells far away from the data do not inflate it. An
+    empty sheet gives (0, 0). None when the sheet is not a worksheet part
+    of an OOXML package (legacy .xls, chartsheets).
+    """
+    package = doc.package
+    part = package.sheet_part(name) if package is not None else None
+    if part is None:
+        return None
+    return doc.cached_part(
+        (part,),
+        ("used_range",),
+        lambda: doc.memoize(("used_range", part), lambda: scan_used_range(doc.path, part) or (0, 0))
+    )
+
+
+def _parse_sheet(
+    ws,
+    include_formulas: bool,
+    used: Optional[Tuple[int, int]] = None
+) -> Optional[Dict[str, Any]]:
+    # Get sheet dimensions, preferring the used range over openpyxl's
+    # dimensions, which include formatting-only cells
+    if used is not None:
+        max_row, max_column = used
+    elif ws.max_row is None or ws.max_column is None:
+        return None
+    else:
+        max_row, max_column = ws.max_row, ws.max_column
+
+    # Extract cell data and formulas in one pass
+    data = []
+    formulas = {}
+    for row in ws.iter_rows(min_row=1, max_row=max_row, max_col=max_column) if max_row else []:
+        row_data = []
+        for cell in row:
+            cell_value = cell.value
+            if include_formulas and isinstance(cell_value, str) and cell_value.startswith('='):
+                formulas[cell.coordinate] = cell_value
+            # Convert datetime to ISO format string
+            if isinstance(cell_value, (datetime, date)):
+                cell_value = cell_value.isoformat()
+            row_data.append(cell_value)
+        data.append(row_data)
+
+    # Extract merged cells
+    merged_cells = []
+    if ws.merged_cells:
+        merged_cells = [str(merged_range) for merged_range in ws.merged_cells.ranges]
+
+    sheet_info = {
+        "name": ws.title,
+        "rows": max_row,
+        "columns": max_column,
+        "data": data,
+        "merged_cells": merged_cells,
+    }
+
+    if formulas:
+        sheet_info["formulas"] = formulas
+
+    return sheet_info
+
+
+def parse_excel(
+    doc: LoadedDocument,
+    sheets_to_parse: Optional[List[str]] = None,
+    include_formulas: bool = True,
+    query: Optional[SheetQuery] = None
+) -> Dict[str, Any]:
+    """
+    Cell values, formulas and merged ranges of an Excel workbook.
+
+    With a ``query`` that projects columns, uses a header row or filters
+    rows, sheets are streamed in read-only mode and only the selected cells
+    are returned (merged ranges are not available in that mode). The
+    columnar layout reads cached formula results so every column keeps the
+    type of its values; formulas themselves are not reported.
+
+    With a part cache, each worksheet result is cached under its sheet part
+    plus the shared strings and styles parts; the workbook is only loaded
+    when some requested sheet has no cached result.
+    """
+    return materialize(stream_excel(doc, sheets_to_parse, include_formulas, query))
+
+
+def stream_excel(
+    doc: LoadedDocument,
+    sheets_to_parse: Optional[List[str]] = None,
+    include_formulas: bool = True,
+    query: Optional[SheetQuery] = None
+) -> Dict[str, Any]:
+    """
+    parse_excel with the sheets produced one at a time. A sheet is cached
+    as a whole, so it is the unit here; a query's ValueError for unknown
+    columns surfaces while the sheets are consumed.
+    """
+    names = sheet_names(doc)
+
+    metadata = {
+        "filename": doc.path.name,
+        "file_size_mb": round(doc.file_size_mb, 2),
+        "sheets_count": len(names),
+        "sheet_names": names,
+    }
+
+    # Add workbook properties if available
+    props = _excel_properties(doc)
+    if props:
+        metadata.update({
+            "creator": props.creator or "Unknown",
+            "title": props.title or "",
+            "subject": props.subject or "",
+            "description": props.description or "",
+            "created": _isoformat(props.created),
+            "modified": _isoformat(props.modified),
+        })
+
+    if sheets_to_parse is None:
+        sheets_to_parse = names
+
+    def parse_sheet(ws_name: str) -> Optional[Dict[str, Any]]:
+        used = sheet_used_range(doc, ws_name)
+        if query is not None and query.streams:
+            if query.layout == "columnar":
+                wb = doc.workbook(data_only=True, read_only=True)
+                return {"name": ws_name, **query.run(wb[ws_name], False, used)}
+            wb = doc.workbook(data_only=False, read_only=True)
+            return {"name": ws_name, **query.run(wb[ws_name], include_formulas, used)}
+
+        # read_only=False to access merged_cells
+        wb = doc.workbook(data_only=False, read_only=False)
+        sheet_info = _parse_sheet(wb[ws_name], include_formulas, used)
+        if sheet_info is not None and query is not None and query.trim_empty:
+            sheet_info["data"] = trim_rows(sheet_info["data"])
+            sheet_info["rows"] = len(sheet_info["data"])
+            sheet_info["columns"] = len(sheet_info["data"][0]) if sheet_info["data"] else 0
+        return sheet_info
+
+    package = doc.package
+    counts = {"sheets": 0}
+
+    def sheets():
+        for ws_name in sheets_to_parse:
+            parts = package.sheet_parts(ws_name) if package is not None else None
+            if parts is None:
+                sheet_info = parse_sheet(ws_name)
+            else:
+                sheet_info = doc.cached_part(
+                    parts,
+                    ("sheet", ws_name, include_formulas, package.date1904,
+                     query.cache_key() if query is not None else None),
+                    lambda: parse_sheet(ws_name)
+                )
+            if sheet_info is not None:
+                counts["sheets"] += 1
+                yield sheet_info
+
+    return {
+        "metadata": metadata,
+        "sheets": sheets(),
+        "total_sheets_parsed": Deferred(lambda: counts["sheets"])
+    }
+
+
+def _formula_cells(ws, used: Optional[Tuple[int, int]]) -> Iterator[Tuple[int, int, str]]:
+    """(row, column, formula) of every formula cell of a read-only worksheet"""
+    max_row, max_col = used if used is not None else (None, None)
+    if max_row == 0:
+        return
+    for row_number, row in enumerate(ws.iter_rows(max_row=max_row, max_col=max_col, values_only=True), start=1):
+        for col_number, value in enumerate(row, start=1):
+            if isinstance(value, ArrayFormula):
+                value = value.text
+            if isinstance(value, str) and value.startswith('='):
+                yield row_number, col_number, value
+
+
+def formula_graph(doc: LoadedDocument) -> FormulaGraph:
+    """
+    Precedent / dependent index of all formulas in a workbook.
+
+    Built in one streaming pass over the worksheets and cached under the
+    worksheet parts and the workbook part (which holds the defined names).
+    """
+    def build() -> FormulaGraph:
+        wb = doc.workbook(data_only=False, read_only=True)
+        defined_names = {
+            name: list(defined.destinations)
+            for name, defined in wb.defined_names.items()
+            if defined.attr_text and not defined.is_external
+        }
+        worksheets = [ws for ws in wb.worksheets if hasattr(ws, "iter_rows")]
+        return FormulaGraph.build(
+            ((ws.title, _formula_cells(ws, sheet_used_range(doc, ws.title))) for ws in worksheets),
+            wb.sheetnames,
+            defined_names
+        )
+
+    package = doc.package
+    if package is None or package.sheets is None:
+        return doc.memoize("formula_graph", build)
+    parts = tuple(part for _, part in package.sheets if part is not None) + ("xl/workbook.xml",)
+    return doc.cached_part(parts, ("formula_graph",), lambda: doc.memoize("formula_graph", build))
+
+
+def _parse_slide(slide, include_tables: bool, include_images: bool) -> Dict[str, Any]:
+    """
+    Content of one slide, without its position in the deck.
+
+    Per-slide totals are returned under "_counts" so they can be summed
+    without walking the shapes again when the result comes from the cache.
+    """
+    slide_info = {
+        "title": "",
+        "shapes": [],
+        "tables": [],
+        "images": []
+    }
+    text_length = 0
+    tables = 0
+    images = 0
+
+    # Extract title
+    if slide.shapes.title:
+        slide_info["title"] = slide.shapes.title.text
+        text_length += len(slide.shapes.title.text)
+
+    # Process all shapes
+    for shape in slide.shapes:
+        # Skip title (already extracted)
+        if shape == slide.shapes.title:
+            continue
+
+        # Extract text from text frames
+        if shape.has_text_frame:
+            text = shape.text_frame.text.strip()
+            if text:
+                slide_info["shapes"].append({
+                    "shape_type": "text",
+                    "text": text
+                })
+                text_length += len(text)
+
+        # Extract tables if requested
+        if include_tables and shape.has_table:
+            table = shape.table
+            table_data = []
+            for row in table.rows:
+                row_data = [cell.text for cell in row.cells]
+                table_data.append(row_data)
+
+            slide_info["tables"].append({
+                "rows": len(table.rows),
+                "columns": len(table.columns),
+                "data": table_data
+            })
+            tables += 1
+
+        # Extract image information if requested
+        if include_images and shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
+            slide_info["images"].append({
+                "shape_type": "picture",
+                "width": shape.width,
+                "height": shape.height,
+                "left": shape.left,
+                "top": shape.top
+            })
+            images += 1
+
+    # Extract notes if available
+    if slide.has_notes_slide:
+        notes_text = slide.notes_slide.notes_text_frame.text.strip()
+        if notes_text:
+            slide_info["notes"] = notes_text
+            text_length += len(notes_text)
+    else:
+        slide_info["notes"] = ""
+
+    slide_info["_counts"] = (text_length, tables, images)
+    return slide_info
+
+
+def _pptx_metadata(doc: LoadedDocument) -> Dict[str, Any]:
+    """Slide count, slide size and core properties, without loading the deck when possible"""
+    package = doc.package
+    if package is None or package.slides is None:
+        prs = doc.presentation
+        metadata = {
+            "total_slides": len(prs.slides),
+            "slide_width": prs.slide_width,
+            "slide_height": prs.slide_height,
+        }
+        # Add core properties if available
+        if prs.core_properties:
+            metadata.update(_pptx_core_properties(prs.core_properties))
+        return metadata
+
+    metadata = {
+        "total_slides": len(package.slides),
+        "slide_width": package.slide_width,
+        "slide_height": package.slide_height,
+    }
+    blob = package.read("docProps/core.xml")
+    if blob:
+        core_properties = CorePropertiesPart(
+            PackURI("/docProps/core.xml"), CT.OPC_CORE_PROPERTIES, None, parse_xml(blob)
+        )
+        metadata.update(_pptx_core_properties(core_properties))
+    return metadata
+
+
+def parse_pptx(
+    doc: LoadedDocument,
+    include_tables: bool = True,
+    include_images: bool = False,
+    slide_indices: Optional[Iterable[int]] = None
+) -> Dict[str, Any]:
+    """
+    Titles, text, tables, images and notes of a PowerPoint presentation.
+
+    With a part cache, each slide result is cached under its slide, slide
+    relationships and notes parts; the presentation is only loaded when some
+    requested slide has no cached result.
+    """
+    return materialize(stream_pptx(doc, include_tables, include_images, slide_indices))
+
+
+def stream_pptx(
+    doc: LoadedDocument,
+    include_tables: bool = True,
+    include_images: bool = False,
+    slide_indices: Optional[Iterable[int]] = None
+) -> Dict[str, Any]:
+    """parse_pptx with the slides produced one at a time"""
+    metadata = {
+        "filename": doc.path.name,
+        "file_size_mb": round(doc.file_size_mb, 2),
+        **_pptx_metadata(doc),
+    }
+    slide_count = metadata["total_slides"]
+
+    slide_indices = list(range(slide_count) if slide_indices is None else slide_indices)
+
+    def parse_slide(idx: int) -> Dict[str, Any]:
+        return _parse_slide(doc.presentation.slides[idx], include_tables, include_images)
+
+    package = doc.package
+    statistics = {
+        "total_slides_parsed": 0,
+        "total_text_length": 0,
+        "total_tables": 0,
+        "total_images": 0
+    }
+
+    def slides():
+        for done, idx in enumerate(slide_indices, 1):
+            if idx >= slide_count or idx < 0:
+                continue
+
+            if package is None or package.slides is None:
+                cached = parse_slide(idx)
+            else:
+                cached = doc.cached_part(
+                    package.slide_parts(idx),
+                    ("slide", include_tables, include_images),
+                    lambda: parse_slide(idx)
+                )
+
+            slide_info = {"slide_number": idx + 1}
+            slide_info.update((k, v) for k, v in cached.items() if k != "_counts")
+            text_length, tables, images = cached["_counts"]
+            statistics["total_slides_parsed"] += 1
+            statistics["total_text_length"] += text_length
+            statistics["total_tables"] += tables
+            statistics["total_images"] += images
+
+            report_progress(done, len(slide_indices), f"Parsed slide {idx + 1} ({done}/{len(slide_indices)})")
+            yield slide_info
+
+    return {
+        "metadata": metadata,
+        "slides": slides(),
+        "statistics": Deferred(lambda: statistics)
+    }
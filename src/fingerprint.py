@@ -0,0 +1,102 @@
+"""
+File fingerprints for cache keys.
+
+The fingerprint of a file comes from one stat call: device, inode, size
+and modification time in nanoseconds. It changes whenever the file is
+rewritten or replaced, including an atomic rename of a file with the same
+size and timestamp, so caches can check it on every call.
+
+When the fingerprint has changed, the content hash tells a modified file
+from one that was only touched, copied or restored. It is computed on
+demand over a memory map of the file (xxh3-128 from the optional xxhash
+package, else BLAKE2b with a 128-bit digest from hashlib) and memoized per
+fingerprint, so each version of a file is read at most once.
+"""
+
+import hashlib
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple, Optional, Tuple, Union
+
+try:
+    import xxhash
+except ImportError:  # pragma: no cover - optional dependency
+    xxhash = None
+
+
+class FileFingerprint(NamedTuple):
+    """Identity and version of a file as seen by stat"""
+
+    dev: int
+    inode: int
+    size: int
+    mtime_ns: int
+
+    @classmethod
+    def of(cls, path: Union[str, Path]) -> "FileFingerprint":
+        stat = os.stat(path)
+        return cls(stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def hash_bytes(data) -> str:
+    """Content hash of a bytes-like object, prefixed with the algorithm"""
+    if xxhash is not None:
+        return "xxh3:" + xxhash.xxh3_128_hexdigest(data)
+    return "blake2b:" + hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _hash_file(path: Path, size: int) -> str:
+    if size == 0:
+        # Empty files cannot be mapped
+        return hash_bytes(b"")
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return hash_bytes(data)
+
+
+class FingerprintService:
+    """Fingerprints, and content hashes memoized for ``max_entries`` file versions"""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._hashes: "OrderedDict[Tuple[str, FileFingerprint], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(path: Union[str, Path]) -> FileFingerprint:
+        return FileFingerprint.of(path)
+
+    def content_hash(self, path: Union[str, Path], fingerprint: Optional[FileFingerprint] = None) -> str:
+        """
+        Hash of the file's content, read only when this version of the
+        file has not been hashed before. Pass the ``fingerprint`` already
+        taken to save a stat call.
+        """
+        path = Path(path).resolve()
+        if fingerprint is None:
+            fingerprint = FileFingerprint.of(path)
+        key = (str(path), fingerprint)
+        with self._lock:
+            digest = self._hashes.get(key)
+            if digest is not None:
+                self._hashes.move_to_end(key)
+                return digest
+
+        digest = _hash_file(path, fingerprint.size)
+        # Only remember the hash when the file did not change while it was read
+        if FileFingerprint.of(path) == fingerprint:
+            with self._lock:
+                self._hashes[key] = digest
+                while len(self._hashes) > self.max_entries:
+                    self._hashes.popitem(last=False)
+        return digest
+
+    def clear(self):
+        with self._lock:
+            self._hashes.clear()
+
+
+# Shared by the search index and the template pool
+fingerprints = FingerprintService()
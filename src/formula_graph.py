@@ -0,0 +1,320 @@
+"""
+Formula dependency graph for Excel workbooks.
+
+Every formula is tokenized once and its references are resolved to cells
+and ranges (across sheets and through defined names). The graph keeps, per
+formula cell, its precedents and, per referenced cell, the formula cells
+that depend on it, so looking up either direction costs the degree of the
+cell instead of a scan over all formulas. Large ranges (SUM(A:A)) are not
+expanded cell by cell; they are kept per sheet and checked on lookup.
+"""
+
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Union
+
+from openpyxl.formula import Tokenizer
+from openpyxl.formula.tokenizer import TokenizerError
+from openpyxl.utils import column_index_from_string, get_column_letter
+
+MAX_ROW = 1048576
+MAX_COLUMN = 16384
+
+# Ranges up to this many cells are indexed cell by cell; larger ones are
+# matched against lookups instead
+RANGE_EXPAND_LIMIT = 1024
+
+FORMULA_DIRECTIONS = ("precedents", "dependents", "both")
+
+_CELL = re.compile(r"^([A-Z]{1,3})(\d+)$")
+_COLUMNS = re.compile(r"^([A-Z]{1,3}):([A-Z]{1,3})$")
+_ROWS = re.compile(r"^(\d+):(\d+)$")
+
+
+class Reference(NamedTuple):
+    """A cell or rectangular range on one sheet, 1-based and inclusive"""
+    sheet: str
+    min_row: int
+    min_col: int
+    max_row: int
+    max_col: int
+
+    @property
+    def is_cell(self) -> bool:
+        return self.min_row == self.max_row and self.min_col == self.max_col
+
+    @property
+    def size(self) -> int:
+        return (self.max_row - self.min_row + 1) * (self.max_col - self.min_col + 1)
+
+    def contains(self, row: int, col: int) -> bool:
+        return self.min_row <= row <= self.max_row and self.min_col <= col <= self.max_col
+
+    @property
+    def label(self) -> str:
+        first, last = get_column_letter(self.min_col), get_column_letter(self.max_col)
+        if self.is_cell:
+            ref = f"{first}{self.min_row}"
+        elif self.min_row == 1 and self.max_row == MAX_ROW:
+            ref = f"{first}:{last}"
+        elif self.min_col == 1 and self.max_col == MAX_COLUMN:
+            ref = f"{self.min_row}:{self.max_row}"
+        else:
+            ref = f"{first}{self.min_row}:{last}{self.max_row}"
+        return f"{self.sheet}!{ref}"
+
+
+# Precedents that are not cells of this workbook (external links, unknown
+# names, structured table references) are kept as their formula text
+Precedent = Union[Reference, str]
+
+
+def cell_node(sheet: str, row: int, col: int) -> str:
+    return f"{sheet}!{get_column_letter(col)}{row}"
+
+
+def _parse_area(ref: str) -> Optional[Tuple[int, int, int, int]]:
+    """(min_row, min_col, max_row, max_col) of an A1-style reference without sheet"""
+    ref = ref.replace("$", "").upper()
+    match = _CELL.match(ref)
+    if match:
+        row, col = int(match.group(2)), column_index_from_string(match.group(1))
+        return row, col, row, col
+    if ":" in ref:
+        first, last = ref.split(":", 1)
+        start, end = _CELL.match(first), _CELL.match(last)
+        if start and end:
+            rows = sorted((int(start.group(2)), int(end.group(2))))
+            cols = sorted((column_index_from_string(start.group(1)), column_index_from_string(end.group(1))))
+            return rows[0], cols[0], rows[1], cols[1]
+    match = _COLUMNS.match(ref)
+    if match:
+        cols = sorted(column_index_from_string(c) for c in match.groups())
+        return 1, cols[0], MAX_ROW, cols[1]
+    match = _ROWS.match(ref)
+    if match:
+        rows = sorted(int(r) for r in match.groups())
+        return rows[0], 1, rows[1], MAX_COLUMN
+    return None
+
+
+def _split_sheet(operand: str) -> Tuple[Optional[str], str]:
+    """Sheet prefix (unquoted) and reference of an operand like 'My Sheet'!$A$1"""
+    if "!" not in operand:
+        return None, operand
+    sheet, ref = operand.rsplit("!", 1)
+    if sheet.startswith("'") and sheet.endswith("'"):
+        sheet = sheet[1:-1].replace("''", "'")
+    return sheet, ref
+
+
+def parse_cell_reference(text: str, default_sheet: Optional[str] = None) -> Optional[Tuple[str, int, int]]:
+    """(sheet, row, column) of a single-cell reference such as 'Sheet 1'!B5 or B5"""
+    sheet, ref = _split_sheet(text.strip())
+    area = _parse_area(ref)
+    sheet = sheet or default_sheet
+    if area is None or sheet is None or area[0] != area[2] or area[1] != area[3]:
+        return None
+    return sheet, area[0], area[1]
+
+
+class FormulaGraph:
+    """
+    Precedent and dependent index over all formula cells of a workbook.
+
+    Nodes are cell labels like ``Sheet1!B5``. Instances are shared through
+    the part cache and must not be modified after ``build``.
+    """
+
+    def __init__(self, sheets: List[str], defined_names: Optional[Dict[str, List[Tuple[str, str]]]] = None):
+        self.sheets = list(sheets)
+        self._sheet_lookup = {name.lower(): name for name in self.sheets}
+        self._names = {name.lower(): destinations for name, destinations in (defined_names or {}).items()}
+        self.formulas: Dict[str, str] = {}
+        self.precedents: Dict[str, Tuple[Precedent, ...]] = {}
+        self._dependents: Dict[str, List[str]] = {}
+        self._wide: Dict[str, List[Tuple[Reference, str]]] = {}
+        self._by_sheet: Dict[str, List[Tuple[int, int, str]]] = {}
+        self.edges = 0
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def _sheet(self, name: Optional[str], current: str) -> Optional[str]:
+        if name is None:
+            return current
+        return self._sheet_lookup.get(name.lower())
+
+    def _resolve(self, operand: str, current: str, seen: Optional[Set[str]] = None) -> List[Precedent]:
+        if operand.startswith("["):
+            return [operand]
+
+        sheet_text, ref = _split_sheet(operand)
+        area = _parse_area(ref)
+
+        if area is None:
+            # Defined names, possibly referring to further names
+            key = ref.lower()
+            seen = seen or set()
+            if sheet_text is None and key in self._names and key not in seen:
+                seen.add(key)
+                resolved: List[Precedent] = []
+                for dest_sheet, dest_ref in self._names[key]:
+                    prefix = "'{}'!".format(dest_sheet.replace("'", "''")) if dest_sheet else ""
+                    resolved.extend(self._resolve(f"{prefix}{dest_ref}", current, seen))
+                # Names holding constants or formulas stay as names
+                return resolved or [operand]
+            return [operand]
+
+        if sheet_text is not None and ":" in sheet_text:
+            # 3D reference across a span of sheets: Sheet1:Sheet3!A1
+            first, last = (self._sheet(part, current) for part in sheet_text.split(":", 1))
+            if first is None or last is None:
+                return [operand]
+            start, end = sorted((self.sheets.index(first), self.sheets.index(last)))
+            return [Reference(sheet, *area) for sheet in self.sheets[start:end + 1]]
+
+        sheet = self._sheet(sheet_text, current)
+        if sheet is None:
+            return [operand]
+        return [Reference(sheet, *area)]
+
+    def add_formula(self, sheet: str, row: int, col: int, formula: str):
+        node = cell_node(sheet, row, col)
+        self.formulas[node] = formula
+        self._by_sheet.setdefault(sheet, []).append((row, col, node))
+
+        try:
+            tokens = Tokenizer(formula).items
+        except TokenizerError:
+            tokens = []
+
+        precedents: List[Precedent] = []
+        for token in tokens:
+            if token.type != "OPERAND" or token.subtype != "RANGE":
+                continue
+            for precedent in self._resolve(token.value, sheet):
+                if precedent not in precedents:
+                    precedents.append(precedent)
+
+        for precedent in precedents:
+            if not isinstance(precedent, Reference):
+                continue
+            if precedent.size > RANGE_EXPAND_LIMIT:
+                self._wide.setdefault(precedent.sheet, []).append((precedent, node))
+                continue
+            for r in range(precedent.min_row, precedent.max_row + 1):
+                for c in range(precedent.min_col, precedent.max_col + 1):
+                    self._dependents.setdefault(cell_node(precedent.sheet, r, c), []).append(node)
+
+        self.precedents[node] = tuple(precedents)
+        self.edges += len(precedents)
+
+    @classmethod
+    def build(
+        cls,
+        sheets: Iterable[Tuple[str, Iterable[Tuple[int, int, str]]]],
+        sheet_names: List[str],
+        defined_names: Optional[Dict[str, List[Tuple[str, str]]]] = None
+    ) -> "FormulaGraph":
+        """Graph from ``(sheet name, [(row, column, formula), ...])`` pairs"""
+        graph = cls(sheet_names, defined_names)
+        for sheet, cells in sheets:
+            for row, col, formula in cells:
+                graph.add_formula(sheet, row, col, formula)
+        return graph
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def canonical_sheet(self, name: str) -> Optional[str]:
+        return self._sheet_lookup.get(name.lower())
+
+    def direct_dependents(self, sheet: str, row: int, col: int) -> List[str]:
+        """Formula cells that reference one cell, directly or through a range"""
+        dependents = list(self._dependents.get(cell_node(sheet, row, col), ()))
+        for reference, node in self._wide.get(sheet, ()):
+            if reference.contains(row, col) and node not in dependents:
+                dependents.append(node)
+        return dependents
+
+    def formula_cells_in(self, reference: Reference) -> List[str]:
+        """Formula cells inside a referenced cell or range"""
+        if reference.size <= RANGE_EXPAND_LIMIT:
+            return [
+                node
+                for r in range(reference.min_row, reference.max_row + 1)
+                for c in range(reference.min_col, reference.max_col + 1)
+                for node in (cell_node(reference.sheet, r, c),)
+                if node in self.formulas
+            ]
+        return [
+            node for row, col, node in self._by_sheet.get(reference.sheet, ())
+            if reference.contains(row, col)
+        ]
+
+    def trace(self, sheet: str, row: int, col: int, direction: str, depth: int = 1, limit: int = 200) -> Dict[str, Any]:
+        """
+        Precedents and/or dependents of one cell, breadth first.
+
+        ``depth`` 0 follows the chain to the end. At most ``limit`` entries
+        are returned per direction.
+        """
+        if direction not in FORMULA_DIRECTIONS:
+            raise ValueError(f"Unknown direction: {direction} (expected one of {', '.join(FORMULA_DIRECTIONS)})")
+
+        start = cell_node(sheet, row, col)
+        result: Dict[str, Any] = {"cell": start, "formula": self.formulas.get(start)}
+        if direction in ("precedents", "both"):
+            result["precedents"], result["precedents_truncated"] = self._walk(start, self._precedent_step, depth, limit)
+        if direction in ("dependents", "both"):
+            result["dependents"], result["dependents_truncated"] = self._walk(start, self._dependent_step, depth, limit)
+        return result
+
+    def _precedent_step(self, node: str) -> List[Tuple[str, List[str]]]:
+        """(label, formula cells to continue from) for each precedent of a formula cell"""
+        steps = []
+        for precedent in self.precedents.get(node, ()):
+            if isinstance(precedent, Reference):
+                steps.append((precedent.label, self.formula_cells_in(precedent)))
+            else:
+                steps.append((precedent, []))
+        return steps
+
+    def _dependent_step(self, node: str) -> List[Tuple[str, List[str]]]:
+        sheet, row, col = parse_cell_reference(node)
+        return [(dependent, [dependent]) for dependent in self.direct_dependents(sheet, row, col)]
+
+    def _walk(self, start: str, step, depth: int, limit: int) -> Tuple[List[Dict[str, Any]], bool]:
+        entries: List[Dict[str, Any]] = []
+        listed = {start}
+        expanded = {start}
+        queue = deque([(start, 1)])
+        while queue:
+            node, level = queue.popleft()
+            for label, next_nodes in step(node):
+                if label not in listed:
+                    if len(entries) >= limit:
+                        return entries, True
+                    listed.add(label)
+                    entry: Dict[str, Any] = {"ref": label, "depth": level}
+                    if label in self.formulas:
+                        entry["formula"] = self.formulas[label]
+                    entries.append(entry)
+                if depth and level >= depth:
+                    continue
+                for next_node in next_nodes:
+                    if next_node not in expanded:
+                        expanded.add(next_node)
+                        queue.append((next_node, level + 1))
+        return entries, False
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "formula_cells": len(self.formulas),
+            "references": self.edges,
+            "indexed_cells": len(self._dependents),
+            "wide_ranges": sum(len(ranges) for ranges in self._wide.values()),
+        }
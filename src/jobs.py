@@ -0,0 +1,230 @@
+"""
+Background jobs for long tool calls.
+
+``submit_job`` starts a tool call as a job and returns its id at once; the
+client polls ``get_job_status`` and collects the output with
+``get_job_result``. Each job runs its tool handler on a private event loop
+in a worker thread, so a handler that parses synchronously does not block
+the server. Progress reported by the handler (``report_progress``) is kept
+on the job and forwarded to requests waiting for it.
+
+Finished jobs are kept for a TTL in a bounded store; the oldest finished
+jobs are dropped first when the store is full.
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from .progress import ProgressCallback, progress_reporter
+from .scheduler import LaneScheduler
+
+JOB_STATES = ("queued", "running", "succeeded", "failed", "cancelled")
+FINISHED_STATES = ("succeeded", "failed", "cancelled")
+
+
+class JobCancelled(BaseException):
+    """
+    Raised at the next progress point of a job that has been cancelled.
+
+    Like asyncio.CancelledError it is not an Exception, so the tool
+    handlers' error handling does not turn it into an ordinary result.
+    """
+
+
+class JobStoreFull(Exception):
+    """Raised by submit when every slot holds an unfinished job"""
+
+
+class Job:
+    """State, progress and result of one submitted tool call"""
+
+    def __init__(self, tool: str, arguments: Dict[str, Any], lane: str = "interactive"):
+        self.id = uuid.uuid4().hex[:12]
+        self.tool = tool
+        self.arguments = arguments
+        self.lane = lane
+        self.state = "queued"
+        self.progress: float = 0
+        self.total: Optional[float] = None
+        self.message: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.result: Optional[List[Any]] = None
+        self.error: Optional[str] = None
+        self.cancel_requested = False
+        self._listeners: List[ProgressCallback] = []
+        self._done = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._worker_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker_task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    def update_progress(self, progress: float, total: Optional[float] = None, message: Optional[str] = None):
+        """Progress callback of the running handler; called from its worker thread"""
+        if self.cancel_requested:
+            raise JobCancelled(f"Job {self.id} was cancelled")
+        self.progress = progress
+        self.total = total
+        self.message = message
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(progress, total, message)
+
+    def add_listener(self, listener: ProgressCallback):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: ProgressCallback):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for the job to finish; True when it has"""
+        if not self.done and timeout > 0:
+            try:
+                await asyncio.wait_for(self._done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.done
+
+    def status(self) -> Dict[str, Any]:
+        now = time.time()
+        status = {
+            "job_id": self.id,
+            "tool": self.tool,
+            "lane": self.lane,
+            "state": self.state,
+            "progress": self.progress,
+            "total": self.total,
+            "message": self.message,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "elapsed": round((self.finished or now) - (self.started or now), 3),
+        }
+        if self.error:
+            status["error"] = self.error
+        return status
+
+
+class JobManager:
+    """
+    Runs jobs and keeps them for ``ttl`` seconds after they finish.
+
+    At most ``max_running`` jobs run at once; the others wait in the queued
+    state, interactive jobs ahead of bulk ones (see LaneScheduler).
+    ``lane_limits`` caps how many jobs of one lane run at once. ``max_jobs``
+    bounds how many jobs are stored in total.
+    """
+
+    def __init__(
+        self,
+        max_jobs: int = 100,
+        ttl: float = 3600,
+        max_running: int = 2,
+        lane_limits: Optional[Dict[str, int]] = None
+    ):
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.lanes = LaneScheduler(max_running, lane_limits)
+
+    def _prune(self):
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job.done and now - job.finished > self.ttl:
+                del self._jobs[job_id]
+        # Oldest finished jobs make room first
+        for job_id, job in list(self._jobs.items()):
+            if len(self._jobs) < self.max_jobs:
+                break
+            if job.done:
+                del self._jobs[job_id]
+
+    def submit(
+        self,
+        tool: str,
+        arguments: Dict[str, Any],
+        handler: Callable[[], Awaitable[List[Any]]],
+        lane: str = "interactive",
+        session: Hashable = None
+    ) -> Job:
+        """Start ``handler`` as a job; must be called on the server's event loop"""
+        self._prune()
+        if len(self._jobs) >= self.max_jobs:
+            raise JobStoreFull(f"Too many unfinished jobs ({self.max_jobs})")
+
+        job = Job(tool, arguments, lane)
+        self._jobs[job.id] = job
+        job._task = asyncio.create_task(self._run(job, handler, session))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._prune()
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Job]:
+        self._prune()
+        return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Request cancellation; the job stops at its next await or progress point"""
+        job = self.get(job_id)
+        if job is None or job.done:
+            return job
+        job.cancel_requested = True
+        if job._worker_loop is not None and job._worker_task is not None:
+            job._worker_loop.call_soon_threadsafe(job._worker_task.cancel)
+        elif job._task is not None:
+            # Still queued
+            job._task.cancel()
+        return job
+
+    async def _run(self, job: Job, handler: Callable[[], Awaitable[List[Any]]], session: Hashable):
+        try:
+            await self.lanes.acquire(job.lane, session)
+            try:
+                if job.cancel_requested:
+                    raise asyncio.CancelledError()
+                job.state = "running"
+                job.started = time.time()
+                job.result = await asyncio.to_thread(self._run_in_worker, job, handler)
+                job.state = "succeeded"
+            finally:
+                self.lanes.release(job.lane)
+        except (asyncio.CancelledError, JobCancelled):
+            job.state = "cancelled"
+        except Exception as e:
+            job.state = "failed"
+            job.error = str(e)
+        finally:
+            job.finished = time.time()
+            job._done.set()
+
+    @staticmethod
+    def _run_in_worker(job: Job, handler: Callable[[], Awaitable[List[Any]]]) -> List[Any]:
+        loop = asyncio.new_event_loop()
+        try:
+            with progress_reporter(job.update_progress):
+                job._worker_task = loop.create_task(handler())
+            job._worker_loop = loop
+            if job.cancel_requested:
+                job._worker_task.cancel()
+            return loop.run_until_complete(job._worker_task)
+        finally:
+            job._worker_loop = None
+            # Threads the handler started keep running after its task is
+            # cancelled; they stop at their next progress point
+            loop.run_until_complete(loop.shutdown_default_executor())
+            loop.close()
@@ -0,0 +1,237 @@
+"""
+Shared document loader.
+
+Every file is opened at most once per cache window. The library objects
+(python-docx Document, pdfplumber PDF, openpyxl Workbook, python-pptx
+Presentation) are created lazily on first use and shared by the metadata,
+text and parse tools; derived values such as metadata, plain text and
+per-page PDF text are memoized on the loaded document. Per-part results of
+OOXML packages (slides, worksheets) can additionally be kept in a PartCache
+that outlives the loaded document, so they survive edits to other parts.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import pdfplumber
+from docx import Document
+from openpyxl import load_workbook
+from pptx import Presentation
+
+from .fingerprint import FileFingerprint
+from .parts import PackageParts, PartCache, open_package
+
+
+class LoadedDocument:
+    """A file opened through the loader, with lazily created library objects"""
+
+    def __init__(self, path: Path, fingerprint: FileFingerprint, part_cache: Optional[PartCache] = None):
+        self.path = path
+        self.suffix = path.suffix.lower()
+        self.fingerprint = fingerprint
+        self.size = fingerprint.size
+        self.mtime_ns = fingerprint.mtime_ns
+        self.part_cache = part_cache
+        self.last_used = time.monotonic()
+
+        self._lock = threading.RLock()
+        self._objects: Dict[Hashable, Any] = {}
+        self._memo: Dict[Hashable, Any] = {}
+        self._users = 0
+        self._evicted = False
+
+    @property
+    def file_size_mb(self) -> float:
+        return self.size / (1024 * 1024)
+
+    def _object(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key not in self._objects:
+                self._objects[key] = factory()
+            return self._objects[key]
+
+    @property
+    def docx(self):
+        """python-docx Document"""
+        return self._object("docx", lambda: Document(str(self.path)))
+
+    @property
+    def pdf(self):
+        """pdfplumber PDF"""
+        return self._object("pdf", lambda: pdfplumber.open(str(self.path)))
+
+    @property
+    def presentation(self):
+        """python-pptx Presentation"""
+        return self._object("pptx", lambda: Presentation(str(self.path)))
+
+    def workbook(self, data_only: bool = False, read_only: bool = False):
+        """
+        openpyxl Workbook.
+
+        openpyxl keeps either formulas or cached values, never both, so each
+        (data_only, read_only) combination is a separate object.
+        """
+        return self._object(
+            ("workbook", data_only, read_only),
+            lambda: load_workbook(str(self.path), data_only=data_only, read_only=read_only)
+        )
+
+    def any_workbook(self):
+        """Any already loaded workbook, or a cheap read-only one for metadata"""
+        with self._lock:
+            for key, obj in self._objects.items():
+                if isinstance(key, tuple) and key[0] == "workbook":
+                    return obj
+        return self.workbook(data_only=True, read_only=True)
+
+    def memoize(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Compute a derived value once per loaded document"""
+        with self._lock:
+            if key in self._memo:
+                return self._memo[key]
+        value = compute()
+        with self._lock:
+            return self._memo.setdefault(key, value)
+
+    @property
+    def package(self) -> Optional[PackageParts]:
+        """Zip member table and part relationships of an OOXML file"""
+        if self.suffix not in ('.docx', '.xlsx', '.pptx'):
+            return None
+        return self.memoize("package", lambda: open_package(self.path))
+
+    def cached_part(
+        self,
+        parts: Tuple[str, ...],
+        options: Hashable,
+        compute: Callable[[], Any]
+    ) -> Any:
+        """
+        Result computed from ``parts`` of the package, shared across reloads.
+
+        The cache key covers the CRC and size of every part in ``parts``, so a
+        result is reused as long as those members are unchanged, even when
+        the rest of the file was modified.
+        """
+        package = self.package
+        if package is None or self.part_cache is None:
+            return compute()
+        key = (str(self.path.resolve()), package.fingerprint(*parts), options)
+        value = self.part_cache.get(key)
+        if value is None:
+            value = compute()
+            self.part_cache.put(key, value)
+        return value
+
+    def pdf_page_text(self, index: int) -> str:
+        """Layout-aware text of one PDF page, shared by text and parse tools"""
+        return self.memoize(("pdf_text", index), lambda: self.pdf.pages[index].extract_text() or "")
+
+    def close(self):
+        """Release file handles held by the library objects"""
+        with self._lock:
+            for obj in self._objects.values():
+                close = getattr(obj, "close", None)
+                if close is not None:
+                    try:
+                        close()
+                    except Exception:
+                        pass
+            self._objects.clear()
+            self._memo.clear()
+
+    def __enter__(self) -> "LoadedDocument":
+        return self
+
+    def __exit__(self, *exc_info):
+        self._release()
+
+    def _release(self):
+        with self._lock:
+            self._users -= 1
+            close_now = self._evicted and self._users == 0
+        if close_now:
+            self.close()
+
+
+class DocumentLoader:
+    """
+    LRU cache of loaded documents.
+
+    An entry stays valid while the file's fingerprint (device, inode, size
+    and mtime) is unchanged and it has been used within ``ttl_seconds``. Use as a context manager so an
+    entry evicted while a call is still reading it is closed only after
+    that call finishes::
+
+        with document_loader.open(path) as doc:
+            text = doc.pdf_page_text(0)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 8,
+        ttl_seconds: float = 300,
+        part_cache: Optional[PartCache] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.part_cache = part_cache
+        self._entries: "OrderedDict[str, LoadedDocument]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def open(self, path: Path) -> LoadedDocument:
+        path = Path(path)
+        key = str(path.resolve())
+        fingerprint = FileFingerprint.of(path)
+        now = time.monotonic()
+        evicted = []
+
+        with self._lock:
+            doc = self._entries.get(key)
+            if doc is not None and (
+                doc.fingerprint != fingerprint
+                or now - doc.last_used > self.ttl_seconds
+            ):
+                evicted.append(self._entries.pop(key))
+                doc = None
+
+            if doc is None:
+                doc = LoadedDocument(path, fingerprint, self.part_cache)
+                self._entries[key] = doc
+            else:
+                self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[1])
+
+            doc.last_used = now
+            with doc._lock:
+                doc._users += 1
+
+        for old in evicted:
+            self._evict(old)
+        return doc
+
+    def invalidate(self, path: Optional[Path] = None):
+        """Drop one cached file, or all of them"""
+        with self._lock:
+            if path is None:
+                evicted = list(self._entries.values())
+                self._entries.clear()
+            else:
+                old = self._entries.pop(str(Path(path).resolve()), None)
+                evicted = [old] if old is not None else []
+        for old in evicted:
+            self._evict(old)
+
+    @staticmethod
+    def _evict(doc: LoadedDocument):
+        with doc._lock:
+            doc._evicted = True
+            close_now = doc._users == 0
+        if close_now:
+            doc.close()
@@ -0,0 +1,605 @@
+"""
+Mail merge: one template rendered for many contexts into a single output.
+
+Each context is rendered with docxtpl as usual and its body is appended to
+the combined document, separated by section breaks. The combined
+``word/document.xml`` is written straight into the output zip one record
+at a time, so only the record being rendered is held in memory.
+
+Styles, numbering definitions, headers, footers and all other package
+parts are taken once from the first rendered record; every record uses
+the same template, so they are shared. Relationships used by a record body
+(images, hyperlinks, charts) are mapped onto existing relationships when
+they point to the same target or identical content, and copied otherwise.
+Numbered lists restart in every record.
+
+The archive mode instead writes one complete DOCX per record straight into
+a zip file, with a manifest.json listing the members.
+
+Loaded templates are kept between calls (``prepared_template``) and their
+compiled Jinja source is cached on the environment, so a process that
+warmed them up once (``warm_templates``) renders without loading or
+compiling anything.
+"""
+
+import copy
+import hashlib
+import io
+import json
+import os
+import posixpath
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from collections.abc import Sized
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from docxtpl import DocxTemplate
+from lxml import etree
+
+from .fingerprint import fingerprints
+from .parts import rels_part
+from .progress import report_progress
+
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_WP_NS = "http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"
+_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+
+_W = f"{{{_W_NS}}}"
+_R_PREFIX = f"{{{_R_NS}}}"
+_DOC_PR = f"{{{_WP_NS}}}docPr"
+_BOOKMARKS = (f"{_W}bookmarkStart", f"{_W}bookmarkEnd")
+
+_DOCUMENT = "word/document.xml"
+_NUMBERING = "word/numbering.xml"
+_CONTENT_TYPES = "[Content_Types].xml"
+
+
+# Distinct template sources compiled per environment, and loaded template files kept
+COMPILED_TEMPLATE_LIMIT = 256
+PREPARED_TEMPLATE_LIMIT = 16
+
+
+def cache_templates(jinja_env):
+    """
+    Reuse compiled templates for repeated ``from_string`` calls.
+
+    docxtpl compiles the document XML on every render. In a merge the
+    source is the same for every record, so it only needs compiling once.
+    Calling this again on the same environment keeps its cache.
+    """
+    if getattr(jinja_env, "_compiled_templates", None) is not None:
+        return jinja_env
+
+    compiled: "OrderedDict[str, Any]" = OrderedDict()
+    from_string = jinja_env.from_string
+
+    def cached_from_string(source, *args, **kwargs):
+        if args or kwargs:
+            return from_string(source, *args, **kwargs)
+        template = compiled.get(source)
+        if template is None:
+            template = compiled[source] = from_string(source)
+            while len(compiled) > COMPILED_TEMPLATE_LIMIT:
+                compiled.popitem(last=False)
+        return template
+
+    jinja_env.from_string = cached_from_string
+    jinja_env._compiled_templates = compiled
+    return jinja_env
+
+
+_CORE_PROPERTIES = ("author", "comments", "identifier", "language", "subject", "title")
+_FOOTNOTES = "application/vnd.openxmlformats-officedocument.wordprocessingml.footnotes+xml"
+
+
+class _ReusableTemplate(DocxTemplate):
+    """
+    DocxTemplate that renders many times without reloading the package.
+
+    docxtpl reopens the template file before every render. Instead, the
+    parts docxtpl renders (body, headers, footers, footnotes and core
+    properties) are kept as loaded and put back before the next render.
+    """
+
+    def init_docx(self, reload: bool = True):
+        if self.docx is None:
+            super().init_docx(reload)
+            self._snapshot()
+        elif self.is_rendered and reload:
+            self._restore()
+            self.is_rendered = False
+
+    def _snapshot(self):
+        part = self.docx.part
+        self._template_body = copy.deepcopy(self.docx.element.body)
+        self._template_targets = {
+            rId: rel._target for rId, rel in part.rels.items()
+            if rel.reltype in (self.HEADER_URI, self.FOOTER_URI)
+        }
+        self._template_properties = {
+            name: getattr(self.docx.core_properties, name) for name in _CORE_PROPERTIES
+        }
+        self._template_footnotes = [
+            (footnotes, footnotes._blob) for footnotes in part.package.parts
+            if footnotes.content_type == _FOOTNOTES and getattr(footnotes, "_blob", None) is not None
+        ]
+
+    def _restore(self):
+        self.docx.element.replace(self.docx.element.body, copy.deepcopy(self._template_body))
+        for rId, target in self._template_targets.items():
+            self.docx.part.rels[rId]._target = target
+        for name, value in self._template_properties.items():
+            setattr(self.docx.core_properties, name, value)
+        for footnotes, blob in self._template_footnotes:
+            footnotes._blob = blob
+
+    def render_record(self, index: int, context: Dict[str, Any], jinja_env=None):
+        try:
+            self.render(context, jinja_env)
+        except Exception as e:
+            raise ValueError(f"Record {index}: {e}") from e
+
+    def compile(self, jinja_env):
+        """
+        Compile the body, header and footer sources into ``jinja_env``'s cache.
+
+        Builds the same source strings docxtpl passes to ``from_string``
+        when rendering, without rendering anything.
+        """
+        self.init_docx()
+        sources = [self.get_xml()]
+        for uri in (self.HEADER_URI, self.FOOTER_URI):
+            sources.extend(self.get_part_xml(part) for _, part in self.get_headers_footers(uri))
+        for source in sources:
+            jinja_env.from_string(re.sub(r"<w:p([ >])", r"\n<w:p\1", self.patch_xml(source)))
+
+
+_prepared: "OrderedDict[Tuple[str, str], List[_ReusableTemplate]]" = OrderedDict()
+_prepared_lock = threading.Lock()
+
+
+def _template_key(template_path: Path) -> Tuple[str, str]:
+    path = Path(template_path).resolve()
+    return (str(path), fingerprints.content_hash(path))
+
+
+@contextmanager
+def prepared_template(template_path: Path) -> Iterator[_ReusableTemplate]:
+    """
+    A loaded template for one render, kept for the next call.
+
+    Templates are kept per path and content hash; the hash is only computed
+    again when the file's fingerprint changes, and a file that was touched
+    or restored without changing keeps its loaded template. Each one is
+    lent to one caller at a time; concurrent callers load their own copy.
+    A template whose render failed is dropped.
+    """
+    key = _template_key(template_path)
+    with _prepared_lock:
+        idle = _prepared.get(key)
+        template = idle.pop() if idle else None
+    if template is None:
+        template = _ReusableTemplate(key[0])
+        template.init_docx()
+
+    yield template
+
+    with _prepared_lock:
+        for stale in [k for k in _prepared if k[0] == key[0] and k != key]:
+            del _prepared[stale]
+        _prepared.setdefault(key, []).append(template)
+        _prepared.move_to_end(key)
+        while len(_prepared) > PREPARED_TEMPLATE_LIMIT:
+            _prepared.popitem(last=False)
+
+
+def warm_templates(template_dir: Path, jinja_env) -> int:
+    """Load and compile every template in ``template_dir``; returns how many"""
+    cache_templates(jinja_env)
+    count = 0
+    for path in sorted(Path(template_dir).glob("*.docx")):
+        try:
+            with prepared_template(path) as template:
+                template.compile(jinja_env)
+            count += 1
+        except Exception:
+            # A broken template fails with its usual error when it is used
+            continue
+    return count
+
+
+def _relationship_key(rel) -> Tuple[str, str, str]:
+    if rel.is_external:
+        return ("external", rel.reltype, rel.target_ref)
+    return ("internal", rel.reltype, hashlib.sha1(rel.target_part.blob).hexdigest())
+
+
+class MergedDocumentWriter:
+    """
+    Streams rendered python-docx documents into one DOCX package.
+
+    ``add`` appends the body of one rendered document; ``close`` writes
+    the remaining package parts. The first document added provides the
+    package (styles, numbering, headers, section properties).
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.records = 0
+        self.parts_added = 0
+        self._zip = zipfile.ZipFile(self.path, "w", zipfile.ZIP_DEFLATED, allowZip64=True)
+        self._stream = None
+        self._closing_xml = b""
+        self._sect_pr = None
+        self._relationships = None
+        self._relationship_ids: Dict[Tuple[str, str, str], str] = {}
+        self._content_types = None
+        self._numbering = None
+        self._abstract_nums: Dict[str, Tuple[str, list]] = {}
+        self._next_num_id = 1
+        self._next_rel_id = 1
+        self._docpr_id = 0
+        self._bookmark_offset = 0
+        self._copied: Dict[str, str] = {}
+
+    # ------------------------------------------------------------------
+    # Package set-up from the first record
+    # ------------------------------------------------------------------
+
+    def _start(self, document):
+        buffer = io.BytesIO()
+        document.save(buffer)
+        with zipfile.ZipFile(buffer) as base:
+            for info in base.infolist():
+                if info.filename in (_DOCUMENT, rels_part(_DOCUMENT), _CONTENT_TYPES, _NUMBERING):
+                    continue
+                self._zip.writestr(info, base.read(info.filename))
+            self._content_types = etree.fromstring(base.read(_CONTENT_TYPES))
+            self._relationships = etree.fromstring(base.read(rels_part(_DOCUMENT)))
+            if _NUMBERING in base.namelist():
+                self._numbering = etree.fromstring(base.read(_NUMBERING))
+                self._index_numbering()
+
+        for rId, rel in document.part.rels.items():
+            self._relationship_ids.setdefault(_relationship_key(rel), rId)
+        self._next_rel_id = 1 + max(
+            (int(rId[3:]) for rId in document.part.rels if rId.startswith("rId") and rId[3:].isdigit()),
+            default=0
+        )
+
+        body = document.element.body
+        self._sect_pr = body.find(f"{_W}sectPr")
+        if self._sect_pr is not None:
+            self._sect_pr = copy.deepcopy(self._sect_pr)
+            # Records start on a new page
+            for section_type in self._sect_pr.findall(f"{_W}type"):
+                self._sect_pr.remove(section_type)
+
+        # Root element and namespace declarations of the template document
+        root = document.element
+        shell = etree.Element(root.tag, attrib=dict(root.attrib), nsmap=root.nsmap)
+        for child in root:
+            if child.tag != body.tag:
+                shell.append(copy.deepcopy(child))
+        etree.SubElement(shell, body.tag)
+        xml = etree.tostring(shell, xml_declaration=True, encoding="UTF-8", standalone=True)
+        opening, self._closing_xml = xml.split(b"<w:body/>")
+        self._closing_xml = b"</w:body>" + self._closing_xml
+
+        self._stream = self._zip.open(_DOCUMENT, "w", force_zip64=True)
+        self._stream.write(opening + b"<w:body>")
+
+    def _index_numbering(self):
+        starts = {}
+        for abstract in self._numbering.iterfind(f"{_W}abstractNum"):
+            levels = []
+            for level in abstract.iterfind(f"{_W}lvl"):
+                start = level.find(f"{_W}start")
+                levels.append((level.get(f"{_W}ilvl"), start.get(f"{_W}val") if start is not None else "1"))
+            starts[abstract.get(f"{_W}abstractNumId")] = levels
+        for num in self._numbering.iterfind(f"{_W}num"):
+            abstract_id = num.find(f"{_W}abstractNumId").get(f"{_W}val")
+            self._abstract_nums[num.get(f"{_W}numId")] = (abstract_id, starts.get(abstract_id, []))
+            self._next_num_id = max(self._next_num_id, int(num.get(f"{_W}numId")) + 1)
+
+    # ------------------------------------------------------------------
+    # Records
+    # ------------------------------------------------------------------
+
+    def _copy_part(self, part) -> str:
+        """Copy a part (and the parts it refers to) into the package; returns its name"""
+        key = hashlib.sha1(part.blob).hexdigest() + part.content_type
+        if key in self._copied:
+            return self._copied[key]
+
+        directory, name = posixpath.split(part.partname.lstrip("/"))
+        new_name = posixpath.join(directory, f"merge{len(self._copied) + 1}_{name}")
+        self._copied[key] = new_name
+        self._zip.writestr(new_name, part.blob)
+        override = etree.SubElement(self._content_types, f"{{{_CT_NS}}}Override")
+        override.set("PartName", f"/{new_name}")
+        override.set("ContentType", part.content_type)
+        self.parts_added += 1
+
+        if part.rels:
+            rels = etree.Element(f"{{{_REL_NS}}}Relationships", nsmap={None: _REL_NS})
+            for rId, rel in part.rels.items():
+                element = etree.SubElement(rels, f"{{{_REL_NS}}}Relationship", Id=rId, Type=rel.reltype)
+                if rel.is_external:
+                    element.set("Target", rel.target_ref)
+                    element.set("TargetMode", "External")
+                else:
+                    target = self._copy_part(rel.target_part)
+                    element.set("Target", posixpath.relpath(target, directory))
+            self._zip.writestr(rels_part(new_name), etree.tostring(rels, xml_declaration=True, encoding="UTF-8", standalone=True))
+        return new_name
+
+    def _map_relationship(self, rel) -> str:
+        """rId in the combined document for a relationship of one record"""
+        key = _relationship_key(rel)
+        rId = self._relationship_ids.get(key)
+        if rId is not None:
+            return rId
+
+        rId = f"rId{self._next_rel_id}"
+        self._next_rel_id += 1
+        element = etree.SubElement(self._relationships, f"{{{_REL_NS}}}Relationship", Id=rId, Type=rel.reltype)
+        if rel.is_external:
+            element.set("Target", rel.target_ref)
+            element.set("TargetMode", "External")
+        else:
+            element.set("Target", posixpath.relpath(self._copy_part(rel.target_part), "word"))
+        self._relationship_ids[key] = rId
+        return rId
+
+    def _restart_numbering(self, body):
+        """Give every list in the record its own num so numbering starts again"""
+        if self._numbering is None:
+            return
+        mapping: Dict[str, str] = {}
+        for num_id in body.iter(f"{_W}numId"):
+            old = num_id.get(f"{_W}val")
+            if old not in self._abstract_nums:
+                continue
+            if old not in mapping:
+                abstract_id, levels = self._abstract_nums[old]
+                new = str(self._next_num_id)
+                self._next_num_id += 1
+                num = etree.Element(f"{_W}num")
+                num.set(f"{_W}numId", new)
+                etree.SubElement(num, f"{_W}abstractNumId").set(f"{_W}val", abstract_id)
+                for ilvl, start in levels:
+                    override = etree.SubElement(num, f"{_W}lvlOverride")
+                    override.set(f"{_W}ilvl", ilvl)
+                    etree.SubElement(override, f"{_W}startOverride").set(f"{_W}val", start)
+                cleanup = self._numbering.find(f"{_W}numIdMacAtCleanup")
+                if cleanup is not None:
+                    cleanup.addprevious(num)
+                else:
+                    self._numbering.append(num)
+                mapping[old] = new
+            num_id.set(f"{_W}val", mapping[old])
+
+    def add(self, document):
+        """Append the body of one rendered document"""
+        if self._stream is None:
+            self._start(document)
+
+        body = document.element.body
+        sect_pr = body.find(f"{_W}sectPr")
+        if sect_pr is not None:
+            body.remove(sect_pr)
+
+        rels = document.part.rels
+        max_bookmark = -1
+        for element in body.iter():
+            for name, value in element.attrib.items():
+                if name.startswith(_R_PREFIX) and value in rels:
+                    element.set(name, self._map_relationship(rels[value]))
+            if element.tag == _DOC_PR:
+                self._docpr_id += 1
+                element.set("id", str(self._docpr_id))
+            elif element.tag in _BOOKMARKS:
+                bookmark_id = element.get(f"{_W}id")
+                if bookmark_id is not None and bookmark_id.isdigit():
+                    max_bookmark = max(max_bookmark, int(bookmark_id))
+                    element.set(f"{_W}id", str(int(bookmark_id) + self._bookmark_offset))
+        self._bookmark_offset += max_bookmark + 1
+
+        if self.records:
+            self._restart_numbering(body)
+            # Section break that ends the previous record
+            if self._sect_pr is not None:
+                self._stream.write(
+                    b"<w:p><w:pPr>" + etree.tostring(self._sect_pr) + b"</w:pPr></w:p>"
+                )
+
+        xml = etree.tostring(body, encoding="UTF-8")
+        start = xml.index(b">", xml.index(b"<w:body")) + 1
+        if xml[start - 2:start] != b"/>":
+            self._stream.write(xml[start:xml.rindex(b"</w:body>")])
+        self.records += 1
+
+    def close(self):
+        """Write the final section and the remaining package parts"""
+        if self._stream is not None:
+            if self._sect_pr is not None:
+                self._stream.write(etree.tostring(self._sect_pr))
+            self._stream.write(self._closing_xml)
+            self._stream.close()
+            self._stream = None
+
+            declaration = dict(xml_declaration=True, encoding="UTF-8", standalone=True)
+            self._zip.writestr(rels_part(_DOCUMENT), etree.tostring(self._relationships, **declaration))
+            self._zip.writestr(_CONTENT_TYPES, etree.tostring(self._content_types, **declaration))
+            if self._numbering is not None:
+                self._zip.writestr(_NUMBERING, etree.tostring(self._numbering, **declaration))
+        self._zip.close()
+
+    def __enter__(self) -> "MergedDocumentWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _partial_path(output_path: Path) -> Path:
+    """
+    Where output is written until it is complete.
+
+    A render that is killed midway leaves only a ``.partial`` file, never
+    a truncated file under the final name.
+    """
+    output_path = Path(output_path)
+    return output_path.with_name(output_path.name + ".partial")
+
+
+def render_merged(
+    template_path: Path,
+    contexts: Iterable[Dict[str, Any]],
+    output_path: Path,
+    jinja_env=None,
+    prepare: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Render ``template_path`` once per context into one DOCX at ``output_path``.
+
+    ``prepare`` may add values to each context before rendering (for
+    example the current date). Returns the number of records and the size
+    of the combined file.
+    """
+    if jinja_env is not None:
+        cache_templates(jinja_env)
+
+    total = len(contexts) if isinstance(contexts, Sized) else None
+    partial = _partial_path(output_path)
+    try:
+        with prepared_template(template_path) as template, MergedDocumentWriter(partial) as writer:
+            for index, context in enumerate(contexts, start=1):
+                if prepare is not None:
+                    context = prepare(context)
+                template.render_record(index, context, jinja_env)
+                writer.add(template.docx)
+                report_progress(index, total, f"Rendered record {index}")
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+
+    if writer.records == 0:
+        partial.unlink()
+        raise ValueError("No contexts to render")
+    os.replace(partial, output_path)
+
+    return {
+        "records": writer.records,
+        "parts_added": writer.parts_added,
+        "size": Path(output_path).stat().st_size,
+    }
+
+
+class _HashingWriter(io.RawIOBase):
+    """Write-only stream that passes data through and records its SHA-256 and size"""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._stream.write(data)
+        self.sha256.update(data)
+        self.size += len(data)
+        return len(data)
+
+
+def _member_name(index: int, context: Dict[str, Any], name_field: Optional[str], used: set) -> str:
+    stem = f"{index:05d}"
+    value = context.get(name_field) if name_field else None
+    if value not in (None, ""):
+        slug = re.sub(r'[^\w.-]+', '_', str(value)).strip('_.')
+        if slug:
+            stem = f"{stem}_{slug[:80]}"
+    name = f"{stem}.docx"
+    while name in used:
+        name = f"{stem}_{len(used)}.docx"
+    used.add(name)
+    return name
+
+
+def render_archive(
+    template_path: Path,
+    contexts: Iterable[Dict[str, Any]],
+    output_path: Path,
+    jinja_env=None,
+    prepare: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    name_field: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Render ``template_path`` once per context into a zip of DOCX files.
+
+    Each document is written directly into its zip member; nothing is
+    written to disk per record. Members are named by record number, plus
+    the value of ``name_field`` in the context when given. The archive
+    ends with manifest.json; the manifest is also returned.
+    """
+    if jinja_env is not None:
+        cache_templates(jinja_env)
+
+    members = []
+    used: set = set()
+    total = len(contexts) if isinstance(contexts, Sized) else None
+    partial = _partial_path(output_path)
+    try:
+        with prepared_template(template_path) as template, \
+                zipfile.ZipFile(partial, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+            for index, context in enumerate(contexts, start=1):
+                name = _member_name(index, context, name_field, used)
+                if prepare is not None:
+                    context = prepare(context)
+                template.render_record(index, context, jinja_env)
+
+                # DOCX files are already compressed
+                info = zipfile.ZipInfo(name, date_time=datetime.now().timetuple()[:6])
+                info.compress_type = zipfile.ZIP_STORED
+                with archive.open(info, "w") as stream:
+                    writer = _HashingWriter(stream)
+                    template.save(writer)
+                members.append({
+                    "index": index,
+                    "name": name,
+                    "size": writer.size,
+                    "sha256": writer.sha256.hexdigest(),
+                })
+                report_progress(index, total, f"Rendered record {index}")
+
+            manifest = {
+                "template": Path(template_path).name,
+                "created": datetime.now().isoformat(),
+                "records": len(members),
+                "members": members,
+            }
+            archive.writestr("manifest.json", json.dumps(manifest, indent=2, ensure_ascii=False))
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+
+    if not members:
+        partial.unlink()
+        raise ValueError("No contexts to render")
+    os.replace(partial, output_path)
+
+    return {
+        "records": len(members),
+        "size": Path(output_path).stat().st_size,
+        "manifest": manifest,
+    }
@@ -0,0 +1,247 @@
+"""
+Part-level caching for OOXML packages.
+
+DOCX, XLSX and PPTX files are zip packages. The zip central directory gives
+the CRC-32 and size of every member without decompressing anything, so
+per-part results (one slide, one worksheet) can be cached under the
+fingerprint of the members they were computed from. When one slide of a
+large deck changes, only that slide is parsed again.
+"""
+
+import pickle
+import posixpath
+import sys
+import threading
+import zipfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from lxml import etree
+
+from .disk_cache import DiskCache
+
+_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_R_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+_P_NS = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+_S_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+Fingerprint = Tuple[Tuple[str, int, int], ...]
+
+
+def rels_part(part: str) -> str:
+    """Name of the relationships part that belongs to ``part``"""
+    directory, name = posixpath.split(part)
+    return posixpath.join(directory, "_rels", f"{name}.rels")
+
+
+class PackageParts:
+    """
+    Member table and part relationships of one OOXML package.
+
+    Only the central directory and the small XML parts that describe the
+    package structure are read; slide and worksheet parts are not touched.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.slides: Optional[List[str]] = None
+        self.notes: Dict[str, str] = {}
+        # Slide -> slide layout, and slide layout -> slide master
+        self.layouts: Dict[str, str] = {}
+        self.masters: Dict[str, str] = {}
+        self.sheets: Optional[List[Tuple[str, Optional[str]]]] = None
+        self.date1904 = False
+
+        with zipfile.ZipFile(self.path) as zf:
+            self.members: Dict[str, Tuple[int, int]] = {
+                info.filename: (info.CRC, info.file_size) for info in zf.infolist()
+            }
+            if "ppt/presentation.xml" in self.members:
+                self._read_presentation(zf)
+            elif "xl/workbook.xml" in self.members:
+                self._read_workbook(zf)
+
+    def _relationships(self, zf: zipfile.ZipFile, part: str) -> Dict[str, Tuple[str, str]]:
+        """rId -> (relationship type, target part name) for internal targets"""
+        name = rels_part(part)
+        if name not in self.members:
+            return {}
+        relationships = {}
+        for rel in etree.fromstring(zf.read(name)).iter(f"{_REL_NS}Relationship"):
+            if rel.get("TargetMode") == "External":
+                continue
+            target = rel.get("Target", "")
+            if target.startswith("/"):
+                target = target[1:]
+            else:
+                target = posixpath.normpath(posixpath.join(posixpath.dirname(part), target))
+            relationships[rel.get("Id")] = (rel.get("Type", ""), target)
+        return relationships
+
+    def _read_presentation(self, zf: zipfile.ZipFile):
+        part = "ppt/presentation.xml"
+        root = etree.fromstring(zf.read(part))
+        relationships = self._relationships(zf, part)
+
+        size = root.find(f"{_P_NS}sldSz")
+        self.slide_width = int(size.get("cx")) if size is not None else None
+        self.slide_height = int(size.get("cy")) if size is not None else None
+
+        self.slides = []
+        for slide_id in root.iterfind(f"{_P_NS}sldIdLst/{_P_NS}sldId"):
+            slide = relationships[slide_id.get(_R_ID)][1]
+            self.slides.append(slide)
+            for rel_type, target in self._relationships(zf, slide).values():
+                if rel_type.endswith("/notesSlide"):
+                    self.notes[slide] = target
+                elif rel_type.endswith("/slideLayout"):
+                    self.layouts[slide] = target
+
+        for layout in set(self.layouts.values()):
+            for rel_type, target in self._relationships(zf, layout).values():
+                if rel_type.endswith("/slideMaster"):
+                    self.masters[layout] = target
+
+    def _read_workbook(self, zf: zipfile.ZipFile):
+        part = "xl/workbook.xml"
+        root = etree.fromstring(zf.read(part))
+        relationships = self._relationships(zf, part)
+
+        workbook_pr = root.find(f"{_S_NS}workbookPr")
+        if workbook_pr is not None:
+            self.date1904 = workbook_pr.get("date1904") in ("1", "true")
+
+        self.sheets = []
+        for sheet in root.iterfind(f"{_S_NS}sheets/{_S_NS}sheet"):
+            rel_type, target = relationships.get(sheet.get(_R_ID), ("", None))
+            # Chartsheets have no cells; they are left to openpyxl
+            self.sheets.append((sheet.get("name"), target if rel_type.endswith("/worksheet") else None))
+
+    def read(self, name: str) -> Optional[bytes]:
+        """Content of one member, or None when the package has no such member"""
+        if name not in self.members:
+            return None
+        with zipfile.ZipFile(self.path) as zf:
+            return zf.read(name)
+
+    def fingerprint(self, *parts: str) -> Fingerprint:
+        """(name, CRC-32, size) of each part that exists in the package"""
+        return tuple(
+            (name, *self.members[name]) for name in parts if name in self.members
+        )
+
+    def slide_parts(self, index: int) -> Tuple[str, ...]:
+        """
+        Members whose content determines the parse result of one slide,
+        including the layout and master its placeholders inherit from
+        """
+        slide = self.slides[index]
+        parts = [slide, rels_part(slide)]
+        if slide in self.notes:
+            parts.append(self.notes[slide])
+        layout = self.layouts.get(slide)
+        if layout is not None:
+            parts += [layout, rels_part(layout)]
+            if layout in self.masters:
+                parts.append(self.masters[layout])
+        return tuple(parts)
+
+    def sheet_part(self, name: str) -> Optional[str]:
+        for sheet_name, part in self.sheets or []:
+            if sheet_name == name:
+                return part
+        return None
+
+    def sheet_parts(self, name: str) -> Optional[Tuple[str, ...]]:
+        """Members whose content determines the parse result of one worksheet"""
+        part = self.sheet_part(name)
+        if part is None:
+            return None
+        return (part, "xl/sharedStrings.xml", "xl/styles.xml")
+
+
+def open_package(path: Path) -> Optional[PackageParts]:
+    """PackageParts for a zip package, or None for other files (e.g. legacy .xls)"""
+    try:
+        return PackageParts(path)
+    except (zipfile.BadZipFile, etree.XMLSyntaxError, KeyError):
+        return None
+
+
+class PartCache:
+    """
+    LRU cache of per-part parse results, at most about ``max_bytes``.
+
+    Keys include the fingerprint of the parts a result was computed from, so
+    entries never go stale: a changed part simply gets a new key and the old
+    entry ages out. Cached values are shared and must not be modified.
+
+    One worksheet's result can be a thousand times the size of one slide's,
+    so the memory tier is limited by size rather than entry count. The size
+    of an entry is estimated by the length of its pickle, which the disk
+    tier needs anyway.
+
+    With a DiskCache, results are also written to disk and entries missing
+    from memory are looked up there, so they survive worker restarts.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, disk: Optional[DiskCache] = None):
+        self.max_bytes = max_bytes
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+        # Estimated bytes held by the memory tier
+        self.size = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[0]
+        value = None
+        if self.disk is not None:
+            found = self.disk.lookup(key)
+            if found is not None:
+                value, size = found
+                self._remember(key, value, size)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        try:
+            pickled = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            pickled = None
+        self._remember(key, value, len(pickled) if pickled is not None else sys.getsizeof(value))
+        if self.disk is not None and pickled is not None:
+            self.disk.put(key, value, pickled)
+
+    def _remember(self, key: Hashable, value: Any, size: int):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+
+    def clear(self):
+        """Empty the in-memory tier; the disk tier is kept"""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
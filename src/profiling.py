@@ -0,0 +1,53 @@
+"""
+Opt-in profiling for tool calls.
+
+A profiled call runs under cProfile and its stats are dumped in pstats
+format, which `python -m pstats`, snakeviz and flameprof can all read.
+"""
+
+import io
+import cProfile
+import pstats
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Tuple
+
+
+def profile_path_for(tool_name: str, profile_dir: Path) -> Path:
+    """Build a unique, sortable stats file path for one tool call"""
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return profile_dir / f"{timestamp}_{tool_name}_{uuid.uuid4().hex[:8]}.prof"
+
+
+def summarize_stats(stats_path: Path, limit: int = 15) -> str:
+    """Render the top entries of a stats file sorted by cumulative time"""
+    buffer = io.StringIO()
+    stats = pstats.Stats(str(stats_path), stream=buffer)
+    stats.strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+    return buffer.getvalue().strip()
+
+
+async def profile_call(
+    tool_name: str,
+    call: Awaitable[Any],
+    profile_dir: Path
+) -> Tuple[Any, Path, str]:
+    """
+    Await a tool call under cProfile.
+
+    The profiler is bound to the event loop thread, so other requests
+    handled concurrently on the loop show up in the same profile.
+    Returns the call result, the stats file path and a text summary.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = await call
+    finally:
+        profiler.disable()
+
+    stats_path = profile_path_for(tool_name, profile_dir)
+    profiler.dump_stats(str(stats_path))
+    return result, stats_path, summarize_stats(stats_path)
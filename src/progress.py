@@ -0,0 +1,90 @@
+"""
+Progress reporting for long tool calls.
+
+Long loops (PDF pages, batch files, rendered records) call
+``report_progress``. Whoever runs the call decides where progress goes: a
+job records it in its status, and a direct tool call whose request carries
+an MCP progress token forwards it as progress notifications. Outside such
+a call ``report_progress`` does nothing.
+
+The reporter is held in a context variable, so it follows the call into
+threads started with ``asyncio.to_thread``.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[float, Optional[float], Optional[str]], None]
+
+_reporter: ContextVar[Optional[ProgressCallback]] = ContextVar("progress_reporter", default=None)
+
+
+def report_progress(progress: float, total: Optional[float] = None, message: Optional[str] = None):
+    """
+    Report progress of the current tool call.
+
+    May raise when the call has been cancelled, so loops stop at their
+    next progress point.
+    """
+    reporter = _reporter.get()
+    if reporter is not None:
+        reporter(progress, total, message)
+
+
+@contextmanager
+def progress_reporter(callback: Optional[ProgressCallback]) -> Iterator[None]:
+    """Route ``report_progress`` calls made in this context to ``callback`` (None drops them)"""
+    token = _reporter.set(callback)
+    try:
+        yield
+    finally:
+        _reporter.reset(token)
+
+
+class ProgressNotifier:
+    """
+    Sends progress as MCP notifications for one request.
+
+    Safe to call from worker threads; notifications are sent on the event
+    loop and throttled to one per ``interval`` seconds, except the last one.
+    """
+
+    def __init__(
+        self,
+        session,
+        progress_token,
+        loop: asyncio.AbstractEventLoop,
+        related_request_id=None,
+        interval: float = 0.2
+    ):
+        self.session = session
+        self.progress_token = progress_token
+        self.loop = loop
+        self.related_request_id = related_request_id
+        self.interval = interval
+        self._last = 0.0
+
+    def __call__(self, progress: float, total: Optional[float] = None, message: Optional[str] = None):
+        now = time.monotonic()
+        if now - self._last < self.interval and (total is None or progress < total):
+            return
+        self._last = now
+        self.loop.call_soon_threadsafe(self._send, progress, total, message)
+
+    def _send(self, progress: float, total: Optional[float], message: Optional[str]):
+        asyncio.ensure_future(self._notify(progress, total, message))
+
+    async def _notify(self, progress: float, total: Optional[float], message: Optional[str]):
+        try:
+            await self.session.send_progress_notification(
+                self.progress_token, progress, total, message, self.related_request_id
+            )
+        except Exception as e:
+            # The client may already have gone away; progress is best effort
+            logger.debug(f"Progress notification failed: {e}")
@@ -0,0 +1,123 @@
+"""
+Priority lanes for worker slots and background jobs.
+
+Every call is queued in a lane: ``interactive`` for single-document tools
+a user is waiting on, ``bulk`` for batch work. Freed slots go to waiting
+interactive calls first. Within a lane, sessions take turns, so one client
+queuing a hundred calls does not starve another. Each lane can be limited
+to part of the capacity; keeping bulk below the total leaves slots that
+only interactive calls can take.
+
+Bulk work is not interrupted; interactive calls overtake it whenever a
+slot is handed out, i.e. at task boundaries.
+"""
+
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Hashable, Optional
+
+LANES = ("interactive", "bulk")
+
+
+class _Waiter:
+    __slots__ = ("loop", "future", "granted")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.future = loop.create_future()
+        self.granted = False
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class LaneScheduler:
+    """
+    Hands out ``capacity`` slots by lane priority, taking turns per session.
+
+    ``lane_limits`` caps how many slots one lane may hold at once. Usable
+    from several event loops at the same time, as the worker pool is from
+    the private loops background jobs run on.
+    """
+
+    def __init__(self, capacity: int, lane_limits: Optional[Dict[str, int]] = None):
+        self.capacity = max(1, capacity)
+        self.lane_limits = {
+            lane: max(1, min(limit, self.capacity)) for lane, limit in (lane_limits or {}).items()
+        }
+        self._lock = threading.Lock()
+        self._running = {lane: 0 for lane in LANES}
+        self._waiting: Dict[str, "OrderedDict[Hashable, Deque[_Waiter]]"] = {
+            lane: OrderedDict() for lane in LANES
+        }
+
+    def _can_run(self, lane: str) -> bool:
+        return (
+            sum(self._running.values()) < self.capacity
+            and self._running[lane] < self.lane_limits.get(lane, self.capacity)
+        )
+
+    async def acquire(self, lane: str, session: Hashable = None):
+        """Wait for a slot in ``lane``; pair every acquire with a release"""
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane: {lane} (expected one of {', '.join(LANES)})")
+
+        with self._lock:
+            if self._can_run(lane) and not self._waiting[lane]:
+                self._running[lane] += 1
+                return
+            waiter = _Waiter(asyncio.get_running_loop())
+            self._waiting[lane].setdefault(session, deque()).append(waiter)
+
+        try:
+            await waiter.future
+        except BaseException:
+            with self._lock:
+                if not waiter.granted:
+                    queue = self._waiting[lane].get(session)
+                    if queue is not None and waiter in queue:
+                        queue.remove(waiter)
+                        if not queue:
+                            del self._waiting[lane][session]
+                    raise
+            # Granted while being cancelled: hand the slot on
+            self.release(lane)
+            raise
+
+    def release(self, lane: str):
+        with self._lock:
+            self._running[lane] -= 1
+            self._dispatch()
+
+    def _dispatch(self):
+        for lane in LANES:
+            sessions = self._waiting[lane]
+            while sessions and self._can_run(lane):
+                session, queue = next(iter(sessions.items()))
+                waiter = queue.popleft()
+                # The session goes to the back of the lane
+                del sessions[session]
+                if queue:
+                    sessions[session] = queue
+                try:
+                    waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+                except RuntimeError:
+                    # The waiter's loop was closed while it waited (e.g. a
+                    # background job's loop); nothing can take the slot there
+                    continue
+                waiter.granted = True
+                self._running[lane] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                lane: {
+                    "running": self._running[lane],
+                    "waiting": sum(len(queue) for queue in self._waiting[lane].values()),
+                    "limit": self.lane_limits.get(lane, self.capacity),
+                }
+                for lane in LANES
+            }
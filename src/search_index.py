@@ -0,0 +1,337 @@
+"""
+Full-text search index over parsed documents.
+
+Text segments from the extractors are stored in a local SQLite FTS5 table
+together with their page/slide/sheet location. Re-indexing is incremental:
+files whose size and mtime are unchanged are skipped, and files whose
+content hash is unchanged only get their stat data refreshed.
+"""
+
+import json
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .extractors import SUPPORTED_EXTENSIONS, extract_segments
+from .fingerprint import FileFingerprint, fingerprints
+from .loader import LoadedDocument
+from .progress import report_progress
+
+SCHEMA_VERSION = "1"
+
+
+def fts5_tokenizer() -> str:
+    """
+    Pick the FTS5 tokenizer.
+
+    The trigram tokenizer (SQLite 3.34+) matches substrings in any script,
+    which unicode61 cannot do for Chinese text without word separators.
+    """
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE VIRTUAL TABLE probe USING fts5(content, tokenize='trigram')")
+        return "trigram"
+    except sqlite3.OperationalError:
+        return "unicode61"
+    finally:
+        conn.close()
+
+
+def extract_file_segments(path: str) -> Dict[str, Any]:
+    """Extract located text segments of one file; runs in a worker process"""
+    file_path = Path(path)
+    try:
+        doc = LoadedDocument(file_path, FileFingerprint.of(file_path))
+        try:
+            segments = [(json.dumps(loc, ensure_ascii=False), text) for loc, text in extract_segments(doc)]
+        finally:
+            doc.close()
+        return {"file": path, "status": "ok", "segments": segments}
+    except Exception as e:
+        return {"file": path, "status": "error", "error": f"{type(e).__name__}: {e}"}
+
+
+def format_location(location: Dict[str, Any]) -> str:
+    """Human readable location of a segment"""
+    if "page" in location:
+        return f"第 {location['page']} 页"
+    if "slide" in location:
+        return f"第 {location['slide']} 张幻灯片"
+    if "sheet" in location:
+        first, last = location["rows"]
+        return f"工作表 {location['sheet']} 第 {first}-{last} 行"
+    if "paragraphs" in location:
+        first, last = location["paragraphs"]
+        return f"第 {first}-{last} 段"
+    if "table" in location:
+        return f"表格 {location['table']}"
+    return json.dumps(location, ensure_ascii=False)
+
+
+class SearchIndex:
+    """
+    SQLite FTS5 index stored in a single file.
+
+    Every method opens its own connection, so the index can be used from
+    worker threads without sharing connection objects.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._tokenizer: Optional[str] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path))
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        row = conn.execute("SELECT value FROM meta WHERE key = 'tokenizer'").fetchone()
+        if row is None:
+            self._tokenizer = fts5_tokenizer()
+            conn.executescript(f"""
+                CREATE TABLE IF NOT EXISTS documents (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT UNIQUE NOT NULL,
+                    file_type TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    segment_count INTEGER NOT NULL,
+                    first_rowid INTEGER,
+                    last_rowid INTEGER,
+                    indexed_at TEXT NOT NULL
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS segments USING fts5(
+                    content, location UNINDEXED, doc_id UNINDEXED, tokenize='{self._tokenizer}'
+                );
+            """)
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [("tokenizer", self._tokenizer), ("schema_version", SCHEMA_VERSION)]
+            )
+            conn.commit()
+        else:
+            self._tokenizer = row[0]
+        return conn
+
+    # ------------------------------------------------------------------
+    # Indexing
+    # ------------------------------------------------------------------
+
+    def index_files(
+        self,
+        files: List[Path],
+        max_workers: int = 1,
+        remove_missing: bool = False
+    ) -> Dict[str, Any]:
+        """Index ``files`` incrementally and return a summary"""
+        started = time.perf_counter()
+        summary: Dict[str, Any] = {
+            "total": len(files),
+            "indexed": 0,
+            "unchanged": 0,
+            "touched": 0,
+            "failed": 0,
+            "removed": 0,
+            "segments": 0,
+            "failures": [],
+        }
+
+        conn = self._connect()
+        try:
+            pending: Dict[str, Dict[str, Any]] = {}
+            for path in files:
+                key = str(path.resolve()) if path.exists() else str(path)
+                if not path.is_file() or path.suffix.lower() not in SUPPORTED_EXTENSIONS:
+                    summary["failed"] += 1
+                    summary["failures"].append({"file": key, "error": "File not found or unsupported type"})
+                    continue
+
+                fingerprint = fingerprints.fingerprint(path)
+                row = conn.execute(
+                    "SELECT id, size, mtime_ns, content_hash FROM documents WHERE path = ?", (key,)
+                ).fetchone()
+
+                if row is not None and row[1] == fingerprint.size and row[2] == fingerprint.mtime_ns:
+                    summary["unchanged"] += 1
+                    continue
+
+                content_hash = fingerprints.content_hash(path, fingerprint)
+                if row is not None and row[3] == content_hash:
+                    # Content identical (e.g. copied or touched): refresh stat data only
+                    conn.execute(
+                        "UPDATE documents SET size = ?, mtime_ns = ? WHERE id = ?",
+                        (fingerprint.size, fingerprint.mtime_ns, row[0])
+                    )
+                    summary["touched"] += 1
+                    continue
+
+                pending[key] = {
+                    "file_type": path.suffix.lower(),
+                    "size": fingerprint.size,
+                    "mtime_ns": fingerprint.mtime_ns,
+                    "content_hash": content_hash,
+                }
+            conn.commit()
+
+            if pending:
+                workers = max(1, min(max_workers, len(pending)))
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    futures = [pool.submit(extract_file_segments, key) for key in pending]
+                    try:
+                        for done, future in enumerate(as_completed(futures), 1):
+                            record = future.result()
+                            if record["status"] != "ok":
+                                summary["failed"] += 1
+                                summary["failures"].append({"file": record["file"], "error": record["error"]})
+                            else:
+                                self._store(conn, record["file"], pending[record["file"]], record["segments"])
+                                summary["indexed"] += 1
+                                summary["segments"] += len(record["segments"])
+                            report_progress(done, len(pending), f"Indexed {done}/{len(pending)} files")
+                    except BaseException:
+                        # Cancelled: do not start the files still queued
+                        pool.shutdown(cancel_futures=True)
+                        raise
+
+            if remove_missing:
+                summary["removed"] = self._remove_missing(conn)
+
+            summary["documents_in_index"] = conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        finally:
+            conn.close()
+
+        summary["total_seconds"] = round(time.perf_counter() - started, 2)
+        return summary
+
+    def _store(self, conn: sqlite3.Connection, path: str, info: Dict[str, Any], segments: List):
+        with conn:
+            row = conn.execute("SELECT id FROM documents WHERE path = ?", (path,)).fetchone()
+            if row is not None:
+                self._delete_document(conn, row[0])
+
+            # Segments of one document get contiguous rowids, so deleting them
+            # later is a rowid range scan instead of a scan of the whole table
+            first_rowid = last_rowid = None
+            if segments:
+                conn.executemany(
+                    "INSERT INTO segments (content, location, doc_id) VALUES (?, ?, NULL)",
+                    [(text, location) for location, text in segments]
+                )
+                last_rowid = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                first_rowid = last_rowid - len(segments) + 1
+
+            cursor = conn.execute(
+                "INSERT INTO documents (path, file_type, size, mtime_ns, content_hash, segment_count, "
+                "first_rowid, last_rowid, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, info["file_type"], info["size"], info["mtime_ns"], info["content_hash"],
+                 len(segments), first_rowid, last_rowid, datetime.now().isoformat())
+            )
+            if segments:
+                conn.execute(
+                    "UPDATE segments SET doc_id = ? WHERE rowid BETWEEN ? AND ?",
+                    (cursor.lastrowid, first_rowid, last_rowid)
+                )
+
+    @staticmethod
+    def _delete_document(conn: sqlite3.Connection, doc_id: int):
+        first_rowid, last_rowid = conn.execute(
+            "SELECT first_rowid, last_rowid FROM documents WHERE id = ?", (doc_id,)
+        ).fetchone()
+        if first_rowid is not None:
+            conn.execute("DELETE FROM segments WHERE rowid BETWEEN ? AND ?", (first_rowid, last_rowid))
+        conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+
+    def _remove_missing(self, conn: sqlite3.Connection) -> int:
+        removed = 0
+        with conn:
+            for doc_id, path in conn.execute("SELECT id, path FROM documents").fetchall():
+                if not Path(path).exists():
+                    self._delete_document(conn, doc_id)
+                    removed += 1
+        return removed
+
+    # ------------------------------------------------------------------
+    # Searching
+    # ------------------------------------------------------------------
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        file_types: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Ranked search results.
+
+        Whitespace-separated terms must all match. With the trigram
+        tokenizer, terms shorter than three characters cannot use the FTS
+        index and are matched with LIKE instead.
+        """
+        terms = [t for t in query.split() if t]
+        if not terms:
+            return []
+
+        conn = self._connect()
+        try:
+            fts_terms = terms
+            like_terms: List[str] = []
+            if self._tokenizer == "trigram":
+                fts_terms = [t for t in terms if len(t) >= 3]
+                like_terms = [t for t in terms if len(t) < 3]
+
+            conditions = []
+            params: List[Any] = []
+            if fts_terms:
+                conditions.append("segments MATCH ?")
+                params.append(" ".join('"' + t.replace('"', '""') + '"' for t in fts_terms))
+            for term in like_terms:
+                conditions.append("segments.content LIKE ? ESCAPE '\\'")
+                escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                params.append(f"%{escaped}%")
+            if file_types:
+                normalized = [t if t.startswith('.') else f".{t}" for t in file_types]
+                conditions.append(f"documents.file_type IN ({', '.join('?' * len(normalized))})")
+                params.extend(t.lower() for t in normalized)
+
+            if fts_terms:
+                select = "bm25(segments) AS score, snippet(segments, 0, '**', '**', '…', 24) AS snippet"
+                order = "score"
+            else:
+                select = "0.0 AS score, substr(segments.content, 1, 160) AS snippet"
+                order = "documents.path"
+
+            rows = conn.execute(
+                f"SELECT documents.path, documents.file_type, segments.location, {select} "
+                f"FROM segments JOIN documents ON documents.id = segments.doc_id "
+                f"WHERE {' AND '.join(conditions)} ORDER BY {order} LIMIT ?",
+                params + [limit]
+            ).fetchall()
+        finally:
+            conn.close()
+
+        return [
+            {
+                "file": path,
+                "file_type": file_type,
+                "location": json.loads(location),
+                "score": round(-score, 4),
+                "snippet": snippet,
+            }
+            for path, file_type, location, score, snippet in rows
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        try:
+            documents, segments = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(segment_count), 0) FROM documents"
+            ).fetchone()
+        finally:
+            conn.close()
+        return {"documents": documents, "segments": segments, "tokenizer": self._tokenizer}
@@ -6,8 +6,12 @@ A Model Context Protocol server for generating Word documents from templates usi
 """
 
 import os
+import re
 import sys
 import json
+import asyncio
+import functools
+import multiprocessing
 import uuid
 import base64
 import logging
@@ -23,13 +27,37 @@ from mcp.server.models import InitializationOptions
 import mcp.types as types
 import mcp.server.stdio
 
-# Document parsing libraries
-import pdfplumber
-import docx2txt
-from openpyxl import load_workbook
-from openpyxl.utils import get_column_letter
-from pptx import Presentation
-from pptx.enum.shapes import MSO_SHAPE_TYPE
+from .batch import resolve_batch_paths, run_batch
+from .columnar import EXPORT_FORMATS, EXPORT_MIME_TYPES, write_columns
+from .disk_cache import DiskCache
+from .extractors import (
+    formula_graph,
+    RESULT_SCHEMA,
+    SUPPORTED_EXTENSIONS,
+    extract_metadata,
+    extract_text,
+    parse_index_range,
+    sheet_names,
+    stream_docx,
+    stream_excel,
+    stream_pdf,
+    stream_pptx,
+    text_chunks,
+    text_statistics,
+)
+from .formula_graph import FORMULA_DIRECTIONS, parse_cell_reference
+from .jobs import JobManager, JobStoreFull
+from .loader import DocumentLoader
+from .mail_merge import cache_templates, render_archive, render_merged, warm_templates
+from .parts import PartCache
+from .pdf_text import PDF_TEXT_ENGINES
+from .profiling import profile_call
+from .progress import ProgressNotifier, progress_reporter
+from .search_index import SearchIndex, format_location
+from .spill import encode_or_spill
+from .streaming import observe, resolve
+from .sheet_query import PREDICATE_OPERATORS, SHEET_LAYOUTS, SheetQuery
+from .workers import WorkerCrashed, WorkerPool, WorkerTimeout
 
 # Configure logging
 logging.basicConfig(
@@ -43,6 +71,88 @@ TEMPLATE_DIR = Path(os.getenv('TEMPLATE_DIR', 'templates'))
 OUTPUT_DIR = Path(os.getenv('OUTPUT_DIR', 'output'))
 MAX_FILE_SIZE_MB = int(os.getenv('MAX_FILE_SIZE_MB', '50'))
 
+# Profiling: PROFILE_TOOLS=true profiles every call, or pass "profile": true per call
+PROFILE_TOOLS = os.getenv('PROFILE_TOOLS', 'false').lower() in ('1', 'true', 'yes')
+PROFILE_DIR = Path(os.getenv('PROFILE_DIR', str(OUTPUT_DIR / 'profiles')))
+
+# Shared document loader: each file is opened once per cache window
+DOCUMENT_CACHE_SIZE = int(os.getenv('DOCUMENT_CACHE_SIZE', '8'))
+DOCUMENT_CACHE_TTL = float(os.getenv('DOCUMENT_CACHE_TTL', '300'))
+
+# Per-slide / per-worksheet results kept in memory across file edits, in MB per process (0 disables)
+PART_CACHE_MB = int(os.getenv('PART_CACHE_MB', '64'))
+
+# Per-part results are also stored compressed in PART_CACHE_DIR, shared by all worker processes
+# and kept across restarts; the oldest are deleted above PART_CACHE_DISK_MB (0 disables)
+PART_CACHE_DIR = Path(os.getenv('PART_CACHE_DIR', str(OUTPUT_DIR / 'cache')))
+PART_CACHE_DISK_MB = int(os.getenv('PART_CACHE_DISK_MB', '512'))
+
+# Parallel worker processes used by parse_documents_batch and the fast PDF text engine
+BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', str(os.cpu_count() or 4)))
+
+# Output modes of generate_documents_batch
+BATCH_OUTPUT_MODES = ("merge", "zip")
+
+# Parse results whose JSON is longer than MAX_INLINE_RESULT_KB (units of 1024 characters) are
+# written to OUTPUT_DIR/parsed and returned as a parsed://<id> resource instead (0 always inlines).
+# The same limit bounds one window of text chunks.
+MAX_INLINE_RESULT_KB = int(os.getenv('MAX_INLINE_RESULT_KB', '1024'))
+MAX_INLINE_RESULT_CHARS = MAX_INLINE_RESULT_KB * 1024
+PARSED_RESULT_DIR = OUTPUT_DIR / 'parsed'
+
+# SQLite full-text index used by index_documents and search_documents
+SEARCH_INDEX_PATH = Path(os.getenv('SEARCH_INDEX_PATH', str(OUTPUT_DIR / 'search_index.db')))
+
+# Background jobs: finished jobs are kept JOB_RESULT_TTL seconds, at most JOB_STORE_SIZE jobs
+JOB_STORE_SIZE = int(os.getenv('JOB_STORE_SIZE', '100'))
+JOB_RESULT_TTL = float(os.getenv('JOB_RESULT_TTL', '3600'))
+JOB_MAX_RUNNING = int(os.getenv('JOB_MAX_RUNNING', '2'))
+
+# Tools that manage jobs and cannot be submitted as jobs themselves
+JOB_TOOLS = ("submit_job", "get_job_status", "get_job_result", "cancel_job")
+
+# Parsing and batch tools run in killable worker processes (TOOL_WORKERS=0 runs them in-process).
+# A call still running after its deadline has its worker killed; TOOL_TIMEOUTS overrides
+# TOOL_TIMEOUT per tool, e.g. "parse_pdf_document=300,parse_documents_batch=3600" (0 disables)
+WORKER_TOOLS = (
+    "parse_docx_document",
+    "parse_pdf_document",
+    "extract_text_from_document",
+    "get_document_metadata",
+    "parse_excel_document",
+    "parse_ppt_document",
+    "parse_documents_batch",
+    "index_documents",
+    "query_formula_dependencies",
+    "generate_documents_batch",
+)
+TOOL_WORKERS = int(os.getenv('TOOL_WORKERS', '2'))
+TOOL_TIMEOUT = float(os.getenv('TOOL_TIMEOUT', '600'))
+TOOL_TIMEOUTS = {
+    name.strip(): float(seconds)
+    for name, _, seconds in (
+        item.partition('=') for item in os.getenv('TOOL_TIMEOUTS', '').split(',') if '=' in item
+    )
+}
+# forkserver (where available) forks workers from a process that has already imported the
+# parsers and loaded the templates, so starting and recycling a worker is nearly free
+WORKER_START_METHOD = os.getenv(
+    'WORKER_START_METHOD',
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
+
+# A worker is replaced after WORKER_MAX_TASKS calls, or when its RSS after a call
+# (heap already trimmed) is above WORKER_MAX_RSS_MB (0 disables either limit)
+WORKER_MAX_TASKS = int(os.getenv('WORKER_MAX_TASKS', '200'))
+WORKER_MAX_RSS_MB = float(os.getenv('WORKER_MAX_RSS_MB', '1024'))
+
+# Priority lanes: batch tools queue in the bulk lane, everything else in the interactive lane,
+# which is served first. Bulk may hold at most BULK_WORKERS workers and BULK_JOBS running jobs,
+# so the rest stay free for interactive calls
+BULK_TOOLS = ("parse_documents_batch", "index_documents", "generate_documents_batch")
+BULK_WORKERS = int(os.getenv('BULK_WORKERS', str(max(1, TOOL_WORKERS - 1))))
+BULK_JOBS = int(os.getenv('BULK_JOBS', str(max(1, JOB_MAX_RUNNING - 1))))
+
 # Ensure directories exist
 TEMPLATE_DIR.mkdir(exist_ok=True)
 OUTPUT_DIR.mkdir(exist_ok=True)
@@ -50,6 +160,140 @@ OUTPUT_DIR.mkdir(exist_ok=True)
 # Store generated documents metadata
 generated_documents: Dict[str, Dict] = {}
 
+# Parse results spilled to disk, served as parsed://<id>
+parsed_results: Dict[str, Dict] = {}
+
+document_loader = DocumentLoader(
+    DOCUMENT_CACHE_SIZE,
+    DOCUMENT_CACHE_TTL,
+    PartCache(
+        PART_CACHE_MB * 1024 * 1024,
+        DiskCache(PART_CACHE_DIR, PART_CACHE_DISK_MB * 1024 * 1024, RESULT_SCHEMA) if PART_CACHE_DISK_MB > 0 else None
+    ) if PART_CACHE_MB > 0 or PART_CACHE_DISK_MB > 0 else None
+)
+
+search_index = SearchIndex(SEARCH_INDEX_PATH)
+
+job_manager = JobManager(JOB_STORE_SIZE, JOB_RESULT_TTL, JOB_MAX_RUNNING, {"bulk": BULK_JOBS})
+
+worker_pool = WorkerPool(
+    TOOL_WORKERS,
+    WORKER_START_METHOD,
+    WORKER_MAX_TASKS,
+    WORKER_MAX_RSS_MB,
+    preload=[f"{__package__}.worker_preload"] if __package__ else [],
+    lane_limits={"bulk": BULK_WORKERS}
+) if TOOL_WORKERS > 0 else None
+
+
+def tool_lane(name: str) -> str:
+    """Priority lane a tool call is scheduled in"""
+    return "bulk" if name in BULK_TOOLS else "interactive"
+
+
+def tool_affinity(arguments: Dict[str, Any]) -> Optional[str]:
+    """
+    File a single-document tool call reads. Calls on the same file go to
+    the worker that has it loaded, so metadata, text and parse calls share
+    one loaded document as they do in-process.
+    """
+    file_path = arguments.get("file_path")
+    if not isinstance(file_path, str) or not file_path:
+        return None
+    return str(Path(file_path).resolve())
+
+
+def format_currency(value):
+    try:
+        return f"${float(value):,.2f}"
+    except:
+        return str(value)
+
+
+def format_date(value, format_str="%B %d, %Y"):
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError as e:
+            raise ValueError(f"Invalid date format for value '{value}'. Please use ISO format (YYYY-MM-DD)")
+    elif not isinstance(value, (datetime, date)):
+        raise ValueError(f"Invalid date type: {type(value).__name__}. Expected string in ISO format or datetime object")
+    return value.strftime(format_str)
+
+
+_worker_server: Optional["DocxTemplateServer"] = None
+
+
+def prepare_worker() -> int:
+    """
+    Set up worker state ahead of the first call: the tool server and the
+    loaded, compiled templates. Returns the number of templates warmed.
+    """
+    global _worker_server
+    if _worker_server is None:
+        _worker_server = DocxTemplateServer()
+    return warm_templates(TEMPLATE_DIR, template_environment())
+
+
+def run_tool_in_worker(name: str, arguments: Dict[str, Any], profile: bool = False):
+    """
+    Run one tool call inside a worker process.
+
+    Returns the tool output, the documents and spilled parse results the
+    call registered, which the parent adds to its own generated_documents
+    and parsed_results, and with ``profile`` the stats file path and summary
+    of the call (else None).
+    """
+    global _worker_server
+    if _worker_server is None:
+        _worker_server = DocxTemplateServer()
+    documents_before = set(generated_documents)
+    parsed_before = set(parsed_results)
+    profiled = None
+    if profile:
+        result, profile_path, summary = asyncio.run(
+            profile_call(name, _worker_server.dispatch_tool(name, arguments), PROFILE_DIR)
+        )
+        profiled = (profile_path, summary)
+    else:
+        result = asyncio.run(_worker_server.dispatch_tool(name, arguments))
+    return (
+        result,
+        {doc_id: generated_documents[doc_id] for doc_id in generated_documents.keys() - documents_before},
+        {result_id: parsed_results[result_id] for result_id in parsed_results.keys() - parsed_before},
+        profiled
+    )
+
+
+def profile_section(profile_path: Path, summary: str) -> types.TextContent:
+    """Response block pointing at the stats file of a profiled call"""
+    return types.TextContent(
+        type="text",
+        text=f"""🔬 **Profile**: `{profile_path}`
+
+Open with `python -m pstats {profile_path}`, snakeviz or flameprof.
+
+```
+{summary}
+```"""
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def template_environment():
+    """
+    Jinja2 environment with the custom template filters registered.
+
+    Shared by every render in the process, so compiled template sources
+    are reused across calls.
+    """
+    from jinja2 import Environment
+    jinja_env = Environment()
+    jinja_env.filters['currency'] = format_currency
+    jinja_env.filters['date'] = format_date
+    return cache_templates(jinja_env)
+
+
 class DocxTemplateServer:
     """Main MCP server for docxtpl operations"""
 
@@ -57,247 +301,559 @@ class DocxTemplateServer:
         self.server = Server("docxtpl-mcp")
         self.setup_handlers()
 
-    def setup_handlers(self):
-        """Setup all MCP protocol handlers"""
-
-        @self.server.list_tools()
-        async def list_tools() -> List[types.Tool]:
-            """List all available tools"""
-            return [
-                types.Tool(
-                    name="generate_document",
-                    description="Generate a Word document from a template with provided data",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "template_name": {
-                                "type": "string",
-                                "description": "Name of the template file (without path)"
-                            },
-                            "context_data": {
-                                "type": "object",
-                                "description": "JSON object containing the data to fill the template"
-                            },
-                            "output_name": {
-                                "type": "string",
-                                "description": "Optional output filename (without extension). If not provided, will use timestamp"
-                            }
+    def tool_definitions(self) -> List[types.Tool]:
+        """Schemas of all tools, as listed to clients"""
+        tools = [
+            types.Tool(
+                name="generate_document",
+                description="Generate a Word document from a template with provided data",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "template_name": {
+                            "type": "string",
+                            "description": "Name of the template file (without path)"
                         },
-                        "required": ["template_name", "context_data"]
-                    }
-                ),
-                types.Tool(
-                    name="list_templates",
-                    description="List all available Word templates",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {}
-                    }
-                ),
-                types.Tool(
-                    name="validate_template",
-                    description="Validate a template and extract its variables",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "template_name": {
-                                "type": "string",
-                                "description": "Name of the template file to validate"
-                            }
+                        "context_data": {
+                            "type": "object",
+                            "description": "JSON object containing the data to fill the template"
                         },
-                        "required": ["template_name"]
-                    }
-                ),
-                types.Tool(
-                    name="preview_template",
-                    description="Preview template with sample data to check rendering",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "template_name": {
-                                "type": "string",
-                                "description": "Name of the template file"
-                            },
-                            "sample_data": {
+                        "output_name": {
+                            "type": "string",
+                            "description": "Optional output filename (without extension). If not provided, will use timestamp"
+                        }
+                    },
+                    "required": ["template_name", "context_data"]
+                }
+            ),
+            types.Tool(
+                name="list_templates",
+                description="List all available Word templates",
+                inputSchema={
+                    "type": "object",
+                    "properties": {}
+                }
+            ),
+            types.Tool(
+                name="validate_template",
+                description="Validate a template and extract its variables",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "template_name": {
+                            "type": "string",
+                            "description": "Name of the template file to validate"
+                        }
+                    },
+                    "required": ["template_name"]
+                }
+            ),
+            types.Tool(
+                name="preview_template",
+                description="Preview template with sample data to check rendering",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "template_name": {
+                            "type": "string",
+                            "description": "Name of the template file"
+                        },
+                        "sample_data": {
+                            "type": "object",
+                            "description": "Sample data to preview the template"
+                        }
+                    },
+                    "required": ["template_name", "sample_data"]
+                }
+            ),
+            types.Tool(
+                name="delete_document",
+                description="Delete a generated document",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "document_id": {
+                            "type": "string",
+                            "description": "ID of the document to delete"
+                        }
+                    },
+                    "required": ["document_id"]
+                }
+            ),
+            types.Tool(
+                name="list_documents",
+                description="List all generated documents",
+                inputSchema={
+                    "type": "object",
+                    "properties": {}
+                }
+            ),
+            types.Tool(
+                name="get_template_schema",
+                description="Get the complete schema for a template including all required and optional fields",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "template_name": {
+                            "type": "string",
+                            "description": "Name of the template file"
+                        }
+                    },
+                    "required": ["template_name"]
+                }
+            ),
+            types.Tool(
+                name="generate_sample_data",
+                description="Generate sample data for a template with all required fields filled",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "template_name": {
+                            "type": "string",
+                            "description": "Name of the template file"
+                        },
+                        "locale": {
+                            "type": "string",
+                            "description": "Locale for sample data (en or zh). Default is en",
+                            "enum": ["en", "zh"]
+                        }
+                    },
+                    "required": ["template_name"]
+                }
+            ),
+            types.Tool(
+                name="parse_docx_document",
+                description="Parse a DOCX document and extract structured content including paragraphs, tables, and metadata",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "file_path": {
+                            "type": "string",
+                            "description": "Absolute path to the DOCX file to parse"
+                        },
+                        "include_tables": {
+                            "type": "boolean",
+                            "description": "Whether to extract tables from the document (default: true)"
+                        }
+                    },
+                    "required": ["file_path"]
+                }
+            ),
+            types.Tool(
+                name="parse_pdf_document",
+                description="Parse a PDF document and extract text, tables, and metadata from each page",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "file_path": {
+                            "type": "string",
+                            "description": "Absolute path to the PDF file to parse"
+                        },
+                        "include_tables": {
+                            "type": "boolean",
+                            "description": "Whether to extract tables from the PDF (default: true)"
+                        },
+                        "pages": {
+                            "type": "string",
+                            "description": "Page range to parse (e.g., '1-5' or 'all'). Default is 'all'"
+                        },
+                        "table_pages": {
+                            "type": "string",
+                            "description": "Only look for tables on these pages (e.g., '3' or '2-4,9'). Default: every parsed page. Pages without ruling lines or rectangles are always skipped"
+                        }
+                    },
+                    "required": ["file_path"]
+                }
+            ),
+            types.Tool(
+                name="extract_text_from_document",
+                description="Quick text extraction from DOCX, PDF, or Excel documents (without structure analysis)",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "file_path": {
+                            "type": "string",
+                            "description": "Absolute path to the document file (DOCX, PDF, or Excel)"
+                        },
+                        "engine": {
+                            "type": "string",
+                            "enum": list(PDF_TEXT_ENGINES),
+                            "description": "PDF text engine: 'layout' (default) keeps pdfplumber's layout-aware line reconstruction; 'fast' reads the text layer directly and in parallel across pages, much faster for plain-text ingestion"
+                        },
+                        "offset": {
+                            "type": "integer",
+                            "description": "Character offset to start returning text from (default: 0). The extracted text is cached, so reading further windows does not extract the document again"
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "description": "Maximum number of characters to return (default: 2000; 0 returns everything from offset, or with chunk_size as many whole chunks as fit in MAX_INLINE_RESULT_KB × 1024 characters, followed by the next offset)"
+                        },
+                        "chunk_size": {
+                            "type": "integer",
+                            "description": "Return the requested window as separate text blocks of at most this many characters instead of one block"
+                        }
+                    },
+                    "required": ["file_path"]
+                }
+            ),
+            types.Tool(
+                name="get_document_metadata",
+                description="Extract metadata information from DOCX, PDF, or Excel documents",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "file_path": {
+                            "type": "string",
+                            "description": "Absolute path to the document file (DOCX, PDF, or Excel)"
+                        }
+                    },
+                    "required": ["file_path"]
+                }
+            ),
+            types.Tool(
+                name="parse_excel_document",
+                description="Parse an Excel document (XLSX/XLS) and extract structured content including sheets, cells, and metadata",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "file_path": {
+                            "type": "string",
+                            "description": "Absolute path to the Excel file to parse"
+                        },
+                        "sheet_name": {
+                            "type": "string",
+                            "description": "Specific sheet name to parse (default: parse all sheets)"
+                        },
+                        "include_formulas": {
+                            "type": "boolean",
+                            "description": "Whether to include cell formulas (default: true)"
+                        },
+                        "columns": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Only return these columns: letters ('A'), ranges ('C:F') or header names when header_row is set"
+                        },
+                        "header_row": {
+                            "type": "integer",
+                            "description": "1-based row holding column headers; rows below it are returned as records keyed by header"
+                        },
+                        "where": {
+                            "type": "array",
+                            "description": "Row filters that must all match",
+                            "items": {
                                 "type": "object",
-                                "description": "Sample data to preview the template"
+                                "properties": {
+                                    "column": {
+                                        "type": "string",
+                                        "description": "Column letter or header name"
+                                    },
+                                    "op": {
+                                        "type": "string",
+                                        "enum": list(PREDICATE_OPERATORS),
+                                        "description": "Comparison (default: eq). Numbers compare numerically, text case-sensitively; contains is case-insensitive"
+                                    },
+                                    "value": {
+                                        "description": "Value to compare with (not needed for empty / not_empty)"
+                                    }
+                                },
+                                "required": ["column"]
                             }
                         },
-                        "required": ["template_name", "sample_data"]
-                    }
-                ),
-                types.Tool(
-                    name="delete_document",
-                    description="Delete a generated document",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "document_id": {
-                                "type": "string",
-                                "description": "ID of the document to delete"
-                            }
+                        "trim_empty": {
+                            "type": "boolean",
+                            "description": "Drop trailing rows and columns that contain no values (default: false)"
                         },
-                        "required": ["document_id"]
-                    }
-                ),
-                types.Tool(
-                    name="list_documents",
-                    description="List all generated documents",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {}
-                    }
-                ),
-                types.Tool(
-                    name="get_template_schema",
-                    description="Get the complete schema for a template including all required and optional fields",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "template_name": {
-                                "type": "string",
-                                "description": "Name of the template file"
-                            }
+                        "layout": {
+                            "type": "string",
+                            "enum": list(SHEET_LAYOUTS),
+                            "description": "rows: row lists or header records (default); columnar: one typed array per column with inferred dtypes, using cached formula results"
                         },
-                        "required": ["template_name"]
-                    }
-                ),
-                types.Tool(
-                    name="generate_sample_data",
-                    description="Generate sample data for a template with all required fields filled",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "template_name": {
-                                "type": "string",
-                                "description": "Name of the template file"
-                            },
-                            "locale": {
-                                "type": "string",
-                                "description": "Locale for sample data (en or zh). Default is en",
-                                "enum": ["en", "zh"]
-                            }
+                        "export_format": {
+                            "type": "string",
+                            "enum": list(EXPORT_FORMATS),
+                            "description": "Write each sheet's columns to a file in the output directory (arrow / parquet need pyarrow) and return a document handle instead of the values; implies the columnar layout"
+                        }
+                    },
+                    "required": ["file_path"]
+                }
+            ),
+            types.Tool(
+                name="parse_ppt_document",
+                description="Parse a PowerPoint document (PPTX) and extract structured content including slides, text, tables, and metadata",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "file_path": {
+                            "type": "string",
+                            "description": "Absolute path to the PowerPoint file to parse"
                         },
-                        "required": ["template_name"]
-                    }
-                ),
-                types.Tool(
-                    name="parse_docx_document",
-                    description="Parse a DOCX document and extract structured content including paragraphs, tables, and metadata",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "file_path": {
-                                "type": "string",
-                                "description": "Absolute path to the DOCX file to parse"
-                            },
-                            "include_tables": {
-                                "type": "boolean",
-                                "description": "Whether to extract tables from the document (default: true)"
-                            }
+                        "include_tables": {
+                            "type": "boolean",
+                            "description": "Whether to extract tables from slides (default: true)"
                         },
-                        "required": ["file_path"]
-                    }
-                ),
-                types.Tool(
-                    name="parse_pdf_document",
-                    description="Parse a PDF document and extract text, tables, and metadata from each page",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "file_path": {
-                                "type": "string",
-                                "description": "Absolute path to the PDF file to parse"
-                            },
-                            "include_tables": {
-                                "type": "boolean",
-                                "description": "Whether to extract tables from the PDF (default: true)"
-                            },
-                            "pages": {
-                                "type": "string",
-                                "description": "Page range to parse (e.g., '1-5' or 'all'). Default is 'all'"
-                            }
+                        "include_images": {
+                            "type": "boolean",
+                            "description": "Whether to extract image information (default: false)"
                         },
-                        "required": ["file_path"]
-                    }
-                ),
-                types.Tool(
-                    name="extract_text_from_document",
-                    description="Quick text extraction from DOCX, PDF, or Excel documents (without structure analysis)",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "file_path": {
-                                "type": "string",
-                                "description": "Absolute path to the document file (DOCX, PDF, or Excel)"
-                            }
+                        "slides": {
+                            "type": "string",
+                            "description": "Slide range to parse (e.g., '1-5' or 'all'). Default is 'all'"
+                        }
+                    },
+                    "required": ["file_path"]
+                }
+            ),
+            types.Tool(
+                name="parse_documents_batch",
+                description="Parse many DOCX/PDF/Excel/PowerPoint files in parallel. Per-file results are streamed to an NDJSON file; only a summary is returned",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "paths": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Absolute paths of files to parse"
                         },
-                        "required": ["file_path"]
-                    }
-                ),
-                types.Tool(
-                    name="get_document_metadata",
-                    description="Extract metadata information from DOCX, PDF, or Excel documents",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "file_path": {
-                                "type": "string",
-                                "description": "Absolute path to the document file (DOCX, PDF, or Excel)"
-                            }
+                        "directory": {
+                            "type": "string",
+                            "description": "Directory whose supported documents should be parsed"
                         },
-                        "required": ["file_path"]
+                        "pattern": {
+                            "type": "string",
+                            "description": "Glob pattern such as '/data/**/*.pdf' (relative patterns are resolved against directory)"
+                        },
+                        "recursive": {
+                            "type": "boolean",
+                            "description": "Include subdirectories when only directory is given (default: false)"
+                        },
+                        "output_name": {
+                            "type": "string",
+                            "description": "NDJSON output filename (without extension). If not provided, will use timestamp"
+                        },
+                        "max_workers": {
+                            "type": "integer",
+                            "description": "Number of parallel worker processes (default: BATCH_MAX_WORKERS)"
+                        },
+                        "include_tables": {
+                            "type": "boolean",
+                            "description": "Whether to extract tables from DOCX/PDF/PowerPoint files (default: true)"
+                        },
+                        "include_formulas": {
+                            "type": "boolean",
+                            "description": "Whether to include Excel cell formulas (default: true)"
+                        },
+                        "include_images": {
+                            "type": "boolean",
+                            "description": "Whether to extract PowerPoint image information (default: false)"
+                        }
                     }
-                ),
-                types.Tool(
-                    name="parse_excel_document",
-                    description="Parse an Excel document (XLSX/XLS) and extract structured content including sheets, cells, and metadata",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "file_path": {
-                                "type": "string",
-                                "description": "Absolute path to the Excel file to parse"
-                            },
-                            "sheet_name": {
-                                "type": "string",
-                                "description": "Specific sheet name to parse (default: parse all sheets)"
-                            },
-                            "include_formulas": {
-                                "type": "boolean",
-                                "description": "Whether to include cell formulas (default: true)"
-                            }
+                }
+            ),
+            types.Tool(
+                name="index_documents",
+                description="Add documents to the local full-text search index. Unchanged files are skipped, so re-indexing a folder only processes new or modified files",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "paths": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Absolute paths of files to index"
+                        },
+                        "directory": {
+                            "type": "string",
+                            "description": "Directory whose supported documents should be indexed"
+                        },
+                        "pattern": {
+                            "type": "string",
+                            "description": "Glob pattern such as '/data/**/*.pdf' (relative patterns are resolved against directory)"
                         },
-                        "required": ["file_path"]
+                        "recursive": {
+                            "type": "boolean",
+                            "description": "Include subdirectories when only directory is given (default: false)"
+                        },
+                        "remove_missing": {
+                            "type": "boolean",
+                            "description": "Remove indexed files that no longer exist on disk (default: false)"
+                        },
+                        "max_workers": {
+                            "type": "integer",
+                            "description": "Number of parallel worker processes (default: BATCH_MAX_WORKERS)"
+                        }
                     }
-                ),
-                types.Tool(
-                    name="parse_ppt_document",
-                    description="Parse a PowerPoint document (PPTX) and extract structured content including slides, text, tables, and metadata",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "file_path": {
-                                "type": "string",
-                                "description": "Absolute path to the PowerPoint file to parse"
-                            },
-                            "include_tables": {
-                                "type": "boolean",
-                                "description": "Whether to extract tables from slides (default: true)"
-                            },
-                            "include_images": {
-                                "type": "boolean",
-                                "description": "Whether to extract image information (default: false)"
-                            },
-                            "slides": {
-                                "type": "string",
-                                "description": "Slide range to parse (e.g., '1-5' or 'all'). Default is 'all'"
-                            }
+                }
+            ),
+            types.Tool(
+                name="search_documents",
+                description="Search indexed documents. Returns ranked matches with file path, page/slide/sheet location and a highlighted snippet",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "query": {
+                            "type": "string",
+                            "description": "Search terms; all whitespace-separated terms must match"
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "description": "Maximum number of results (default: 10)"
+                        },
+                        "file_types": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Only return results from these file types, e.g. ['.pdf', '.docx']"
+                        }
+                    },
+                    "required": ["query"]
+                }
+            ),
+            types.Tool(
+                name="query_formula_dependencies",
+                description="Trace formula dependencies of an Excel cell: the cells and ranges it references (precedents) and the formula cells that reference it (dependents), across sheets and defined names",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "file_path": {
+                            "type": "string",
+                            "description": "Absolute path to the Excel file (XLSX)"
+                        },
+                        "cell": {
+                            "type": "string",
+                            "description": "Cell reference, e.g. 'B5' or 'Sheet1!B5'"
                         },
-                        "required": ["file_path"]
+                        "sheet_name": {
+                            "type": "string",
+                            "description": "Sheet of the cell when it has no sheet prefix (default: first sheet)"
+                        },
+                        "direction": {
+                            "type": "string",
+                            "enum": list(FORMULA_DIRECTIONS),
+                            "description": "Which side of the graph to return (default: both)"
+                        },
+                        "depth": {
+                            "type": "integer",
+                            "description": "Levels to follow; 1 returns direct references only, 0 follows the whole chain (default: 1)"
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "description": "Maximum entries per direction (default: 200)"
+                        }
+                    },
+                    "required": ["file_path", "cell"]
+                }
+            ),
+            types.Tool(
+                name="generate_documents_batch",
+                description="Render one Word template for many data records into a single output instead of one document per record",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "template_name": {
+                            "type": "string",
+                            "description": "Name of the template file (without path)"
+                        },
+                        "contexts": {
+                            "type": "array",
+                            "items": {"type": "object"},
+                            "description": "One JSON object of template data per record"
+                        },
+                        "output_mode": {
+                            "type": "string",
+                            "enum": list(BATCH_OUTPUT_MODES),
+                            "description": "merge: one DOCX with every record in its own section (default); zip: one DOCX per record inside a single zip archive with a manifest"
+                        },
+                        "name_field": {
+                            "type": "string",
+                            "description": "zip mode: context key whose value is added to each member's filename, e.g. 'customer_name'"
+                        },
+                        "output_name": {
+                            "type": "string",
+                            "description": "Optional output filename (without extension). If not provided, will use timestamp"
+                        }
+                    },
+                    "required": ["template_name", "contexts"]
+                }
+            ),
+            types.Tool(
+                name="submit_job",
+                description="Start a long tool call (e.g. parse_pdf_document, parse_documents_batch, generate_documents_batch) as a background job and return its job id at once",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "tool": {
+                            "type": "string",
+                            "description": "Name of the tool to run"
+                        },
+                        "arguments": {
+                            "type": "object",
+                            "description": "Arguments of the tool call"
+                        }
+                    },
+                    "required": ["tool"]
+                }
+            ),
+            types.Tool(
+                name="get_job_status",
+                description="Get the state and progress of a job, or of all jobs when no job id is given",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "job_id": {
+                            "type": "string",
+                            "description": "Job id returned by submit_job"
+                        }
                     }
-                )
-            ]
+                }
+            ),
+            types.Tool(
+                name="get_job_result",
+                description="Get the output of a finished job. Can wait for the job to finish, sending progress notifications while waiting",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "job_id": {
+                            "type": "string",
+                            "description": "Job id returned by submit_job"
+                        },
+                        "wait_seconds": {
+                            "type": "number",
+                            "description": "Wait up to this many seconds for the job to finish (default: 0, return at once)"
+                        }
+                    },
+                    "required": ["job_id"]
+                }
+            ),
+            types.Tool(
+                name="cancel_job",
+                description="Cancel a queued or running job",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "job_id": {
+                            "type": "string",
+                            "description": "Job id returned by submit_job"
+                        }
+                    },
+                    "required": ["job_id"]
+                }
+            )
+        ]
+
+        # Every tool accepts an optional "profile" flag
+        for tool in tools:
+            tool.inputSchema.setdefault("properties", {})["profile"] = {
+                "type": "boolean",
+                "description": "Run this call under cProfile and return the path of the stats file (default: PROFILE_TOOLS)"
+            }
+
+        return tools
+
+    def setup_handlers(self):
+        """Setup all MCP protocol handlers"""
+
+        @self.server.list_tools()
+        async def list_tools() -> List[types.Tool]:
+            """List all available tools"""
+            return self.tool_definitions()
 
         @self.server.call_tool()
         async def call_tool(
@@ -306,84 +862,12 @@ class DocxTemplateServer:
         ) -> List[types.TextContent | types.ImageContent | types.EmbeddedResource]:
             """Handle tool calls"""
 
-            try:
-                if name == "generate_document":
-                    return await self.generate_document(
-                        arguments.get("template_name"),
-                        arguments.get("context_data"),
-                        arguments.get("output_name")
-                    )
-
-                elif name == "list_templates":
-                    return await self.list_templates()
-
-                elif name == "validate_template":
-                    return await self.validate_template(arguments.get("template_name"))
-
-                elif name == "preview_template":
-                    return await self.preview_template(
-                        arguments.get("template_name"),
-                        arguments.get("sample_data")
-                    )
-
-                elif name == "delete_document":
-                    return await self.delete_document(arguments.get("document_id"))
-
-                elif name == "list_documents":
-                    return await self.list_documents()
-
-                elif name == "get_template_schema":
-                    return await self.get_template_schema(arguments.get("template_name"))
+            arguments = dict(arguments or {})
+            profile = arguments.pop("profile", PROFILE_TOOLS)
 
-                elif name == "generate_sample_data":
-                    return await self.generate_sample_data(
-                        arguments.get("template_name"),
-                        arguments.get("locale", "en")
-                    )
-
-                elif name == "parse_docx_document":
-                    return await self.parse_docx_document(
-                        arguments.get("file_path"),
-                        arguments.get("include_tables", True)
-                    )
-
-                elif name == "parse_pdf_document":
-                    return await self.parse_pdf_document(
-                        arguments.get("file_path"),
-                        arguments.get("include_tables", True),
-                        arguments.get("pages", "all")
-                    )
-
-                elif name == "extract_text_from_document":
-                    return await self.extract_text_from_document(
-                        arguments.get("file_path")
-                    )
-
-                elif name == "get_document_metadata":
-                    return await self.get_document_metadata(
-                        arguments.get("file_path")
-                    )
-
-                elif name == "parse_excel_document":
-                    return await self.parse_excel_document(
-                        arguments.get("file_path"),
-                        arguments.get("sheet_name"),
-                        arguments.get("include_formulas", True)
-                    )
-
-                elif name == "parse_ppt_document":
-                    return await self.parse_ppt_document(
-                        arguments.get("file_path"),
-                        arguments.get("include_tables", True),
-                        arguments.get("include_images", False),
-                        arguments.get("slides", "all")
-                    )
-
-                else:
-                    return [types.TextContent(
-                        type="text",
-                        text=f"Unknown tool: {name}"
-                    )]
+            try:
+                with progress_reporter(self._progress_notifier()):
+                    return await self.execute_tool(name, arguments, profile)
 
             except Exception as e:
                 logger.error(f"Error executing tool {name}: {str(e)}")
@@ -411,16 +895,31 @@ class DocxTemplateServer:
                 resources.append(types.Resource(
                     uri=f"document://{doc_id}",
                     name=doc_info["filename"],
-                    mimeType="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                    mimeType=doc_info.get(
+                        "mime_type",
+                        "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+                    ),
                     description=f"Generated document: {doc_info['filename']}"
                 ))
 
+            # Add spilled parse results
+            for result_id, result_info in parsed_results.items():
+                resources.append(types.Resource(
+                    uri=f"parsed://{result_id}",
+                    name=f"{result_info['source']} ({result_info['tool']})",
+                    mimeType="application/json",
+                    description=f"Parse result of {result_info['source']} ({result_info['size']:,} bytes)"
+                ))
+
             return resources
 
         @self.server.read_resource()
         async def read_resource(uri: str) -> str:
             """Read a specific resource"""
 
+            # The SDK passes a pydantic AnyUrl
+            uri = str(uri)
+
             if uri.startswith("template://"):
                 template_name = uri.replace("template://", "")
                 template_path = TEMPLATE_DIR / f"{template_name}.docx"
@@ -461,9 +960,27 @@ class DocxTemplateServer:
                     "path": str(doc_path),
                     "size": doc_path.stat().st_size,
                     "created": doc_info["created"],
-                    "template": doc_info["template"]
+                    "template": doc_info["template"],
+                    **({"members": doc_info["members"]} if "members" in doc_info else {})
                 })
 
+            elif uri.startswith("parsed://"):
+                result_id = uri.replace("parsed://", "")
+
+                if result_id not in parsed_results:
+                    return json.dumps({
+                        "error": f"Parse result not found: {result_id}"
+                    })
+
+                result_path = Path(parsed_results[result_id]["path"])
+                if not result_path.exists():
+                    return json.dumps({
+                        "error": f"Parse result file not found: {result_path.name}"
+                    })
+
+                # The full result, as the tool would have returned it inline
+                return await asyncio.to_thread(result_path.read_text, encoding="utf-8")
+
             return json.dumps({
                 "error": f"Unknown resource URI: {uri}"
             })
@@ -566,32 +1083,243 @@ Make the content professional and well-structured."""
 
             raise ValueError(f"Unknown prompt: {name}")
 
-    async def generate_document(
+    async def execute_tool(
         self,
-        template_name: str,
-        context_data: Dict[str, Any],
-        output_name: Optional[str] = None
-    ) -> List[types.TextContent]:
-        """Generate a Word document from template"""
+        name: str,
+        arguments: Dict[str, Any],
+        profile: bool = False
+    ) -> List[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+        """
+        Run a tool call, in a worker process under its deadline for WORKER_TOOLS.
+
+        With ``profile`` the call runs under cProfile where it runs, i.e.
+        in the worker under the same deadline and lane, and the stats file
+        and summary are appended to the result.
+        """
+
+        if worker_pool is None or name not in WORKER_TOOLS:
+            if not profile:
+                return await self.dispatch_tool(name, arguments)
+            result, profile_path, summary = await profile_call(
+                name, self.dispatch_tool(name, arguments), PROFILE_DIR
+            )
+            return result + [profile_section(profile_path, summary)]
 
-        # Validate template exists
-        template_path = TEMPLATE_DIR / template_name
-        if not template_path.exists():
-            template_path = TEMPLATE_DIR / f"{template_name}.docx"
-            if not template_path.exists():
-                return [types.TextContent(
-                    type="text",
-                    text=f"Error: Template not found: {template_name}"
-                )]
+        timeout = TOOL_TIMEOUTS.get(name, TOOL_TIMEOUT)
+        try:
+            result, documents, parsed, profiled = await worker_pool.run(
+                run_tool_in_worker, name, arguments, profile,
+                timeout=timeout or None, lane=tool_lane(name), session=self._session_key(),
+                affinity=tool_affinity(arguments)
+            )
+        except WorkerTimeout:
+            logger.warning(f"Tool {name} exceeded its {timeout:g}s deadline; worker killed")
+            return [types.TextContent(
+                type="text",
+                text=f"Error: {name} did not finish within {timeout:g} seconds and was stopped"
+            )]
+        except WorkerCrashed as e:
+            logger.error(f"Worker running {name} crashed: {str(e)}")
+            return [types.TextContent(
+                type="text",
+                text=f"Error: {name} failed: {str(e)}"
+            )]
 
-        # Generate output filename
-        if output_name:
-            output_filename = f"{output_name}.docx"
-        else:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_filename = f"{template_path.stem}_{timestamp}.docx"
+        generated_documents.update(documents)
+        parsed_results.update(parsed)
+        if profiled is not None:
+            return result + [profile_section(*profiled)]
+        return result
 
-        output_path = OUTPUT_DIR / output_filename
+    async def dispatch_tool(
+        self,
+        name: str,
+        arguments: Dict[str, Any]
+    ) -> List[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+        """Route a tool call to its implementation"""
+
+        if name == "generate_document":
+            return await self.generate_document(
+                arguments.get("template_name"),
+                arguments.get("context_data"),
+                arguments.get("output_name")
+            )
+
+        elif name == "generate_documents_batch":
+            return await self.generate_documents_batch(
+                arguments.get("template_name"),
+                arguments.get("contexts"),
+                arguments.get("output_mode", "merge"),
+                arguments.get("output_name"),
+                arguments.get("name_field")
+            )
+
+        elif name == "list_templates":
+            return await self.list_templates()
+
+        elif name == "validate_template":
+            return await self.validate_template(arguments.get("template_name"))
+
+        elif name == "preview_template":
+            return await self.preview_template(
+                arguments.get("template_name"),
+                arguments.get("sample_data")
+            )
+
+        elif name == "delete_document":
+            return await self.delete_document(arguments.get("document_id"))
+
+        elif name == "list_documents":
+            return await self.list_documents()
+
+        elif name == "get_template_schema":
+            return await self.get_template_schema(arguments.get("template_name"))
+
+        elif name == "generate_sample_data":
+            return await self.generate_sample_data(
+                arguments.get("template_name"),
+                arguments.get("locale", "en")
+            )
+
+        elif name == "parse_docx_document":
+            return await self.parse_docx_document(
+                arguments.get("file_path"),
+                arguments.get("include_tables", True)
+            )
+
+        elif name == "parse_pdf_document":
+            return await self.parse_pdf_document(
+                arguments.get("file_path"),
+                arguments.get("include_tables", True),
+                arguments.get("pages", "all"),
+                arguments.get("table_pages")
+            )
+
+        elif name == "extract_text_from_document":
+            return await self.extract_text_from_document(
+                arguments.get("file_path"),
+                arguments.get("engine", "layout"),
+                arguments.get("offset", 0),
+                arguments.get("limit", 2000),
+                arguments.get("chunk_size")
+            )
+
+        elif name == "get_document_metadata":
+            return await self.get_document_metadata(
+                arguments.get("file_path")
+            )
+
+        elif name == "parse_excel_document":
+            return await self.parse_excel_document(
+                arguments.get("file_path"),
+                arguments.get("sheet_name"),
+                arguments.get("include_formulas", True),
+                arguments.get("columns"),
+                arguments.get("header_row"),
+                arguments.get("where"),
+                arguments.get("trim_empty", False),
+                arguments.get("layout", "rows"),
+                arguments.get("export_format")
+            )
+
+        elif name == "parse_ppt_document":
+            return await self.parse_ppt_document(
+                arguments.get("file_path"),
+                arguments.get("include_tables", True),
+                arguments.get("include_images", False),
+                arguments.get("slides", "all")
+            )
+
+        elif name == "parse_documents_batch":
+            return await self.parse_documents_batch(
+                arguments.get("paths"),
+                arguments.get("directory"),
+                arguments.get("pattern"),
+                arguments.get("recursive", False),
+                arguments.get("output_name"),
+                arguments.get("max_workers"),
+                arguments.get("include_tables", True),
+                arguments.get("include_formulas", True),
+                arguments.get("include_images", False)
+            )
+
+        elif name == "index_documents":
+            return await self.index_documents(
+                arguments.get("paths"),
+                arguments.get("directory"),
+                arguments.get("pattern"),
+                arguments.get("recursive", False),
+                arguments.get("remove_missing", False),
+                arguments.get("max_workers")
+            )
+
+        elif name == "search_documents":
+            return await self.search_documents(
+                arguments.get("query", ""),
+                arguments.get("limit", 10),
+                arguments.get("file_types")
+            )
+
+        elif name == "query_formula_dependencies":
+            return await self.query_formula_dependencies(
+                arguments.get("file_path"),
+                arguments.get("cell", ""),
+                arguments.get("sheet_name"),
+                arguments.get("direction", "both"),
+                arguments.get("depth", 1),
+                arguments.get("limit", 200)
+            )
+
+        elif name == "submit_job":
+            return await self.submit_job(
+                arguments.get("tool", ""),
+                arguments.get("arguments")
+            )
+
+        elif name == "get_job_status":
+            return await self.get_job_status(arguments.get("job_id"))
+
+        elif name == "get_job_result":
+            return await self.get_job_result(
+                arguments.get("job_id", ""),
+                arguments.get("wait_seconds", 0)
+            )
+
+        elif name == "cancel_job":
+            return await self.cancel_job(arguments.get("job_id", ""))
+
+        else:
+            return [types.TextContent(
+                type="text",
+                text=f"Unknown tool: {name}"
+            )]
+
+    async def generate_document(
+        self,
+        template_name: str,
+        context_data: Dict[str, Any],
+        output_name: Optional[str] = None
+    ) -> List[types.TextContent]:
+        """Generate a Word document from template"""
+
+        # Validate template exists
+        template_path = TEMPLATE_DIR / template_name
+        if not template_path.exists():
+            template_path = TEMPLATE_DIR / f"{template_name}.docx"
+            if not template_path.exists():
+                return [types.TextContent(
+                    type="text",
+                    text=f"Error: Template not found: {template_name}"
+                )]
+
+        # Generate output filename
+        if output_name:
+            output_filename = f"{output_name}.docx"
+        else:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_filename = f"{template_path.stem}_{timestamp}.docx"
+
+        output_path = OUTPUT_DIR / output_filename
 
         try:
             # Load template and render with context
@@ -601,28 +1329,7 @@ Make the content professional and well-structured."""
             context_data["now"] = datetime.now()
             context_data["today"] = datetime.now().date()
 
-            # Custom filters
-            def format_currency(value):
-                try:
-                    return f"${float(value):,.2f}"
-                except:
-                    return str(value)
-
-            def format_date(value, format_str="%B %d, %Y"):
-                if isinstance(value, str):
-                    try:
-                        value = datetime.fromisoformat(value)
-                    except ValueError as e:
-                        raise ValueError(f"Invalid date format for value '{value}'. Please use ISO format (YYYY-MM-DD)")
-                elif not isinstance(value, (datetime, date)):
-                    raise ValueError(f"Invalid date type: {type(value).__name__}. Expected string in ISO format or datetime object")
-                return value.strftime(format_str)
-
-            # Register custom filters using Jinja2 Environment
-            from jinja2 import Environment
-            jinja_env = Environment()
-            jinja_env.filters['currency'] = format_currency
-            jinja_env.filters['date'] = format_date
+            jinja_env = template_environment()
 
             # Render the document
             doc.render(context_data, jinja_env)
@@ -952,6 +1659,98 @@ For detailed field information, check templates_metadata.json"""
                 text=f"❌ Error validating template: {str(e)}"
             )]
 
+    async def generate_documents_batch(
+        self,
+        template_name: str,
+        contexts: List[Dict[str, Any]],
+        output_mode: str = "merge",
+        output_name: Optional[str] = None,
+        name_field: Optional[str] = None
+    ) -> List[types.TextContent]:
+        """Render a template for many records into one output file"""
+
+        template_path = TEMPLATE_DIR / template_name
+        if not template_path.exists():
+            template_path = TEMPLATE_DIR / f"{template_name}.docx"
+            if not template_path.exists():
+                return [types.TextContent(
+                    type="text",
+                    text=f"Error: Template not found: {template_name}"
+                )]
+
+        if output_mode not in BATCH_OUTPUT_MODES:
+            return [types.TextContent(
+                type="text",
+                text=f"Error: Unknown output mode: {output_mode} (expected one of {', '.join(BATCH_OUTPUT_MODES)})"
+            )]
+
+        if not contexts or not all(isinstance(context, dict) for context in contexts):
+            return [types.TextContent(
+                type="text",
+                text="Error: contexts must be a non-empty list of objects"
+            )]
+
+        extension = ".zip" if output_mode == "zip" else ".docx"
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if output_name:
+            output_filename = f"{output_name}{extension}"
+        else:
+            output_filename = f"{template_path.stem}_{output_mode}_{timestamp}{extension}"
+        output_path = OUTPUT_DIR / output_filename
+
+        def prepare(context: Dict[str, Any]) -> Dict[str, Any]:
+            return {**context, "now": datetime.now(), "today": datetime.now().date()}
+
+        try:
+            if output_mode == "zip":
+                summary = await asyncio.to_thread(
+                    render_archive, template_path, contexts, output_path, template_environment(), prepare, name_field
+                )
+            else:
+                summary = await asyncio.to_thread(
+                    render_merged, template_path, contexts, output_path, template_environment(), prepare
+                )
+        except Exception as e:
+            # The renderers remove their own .partial file; anything at output_path is an earlier,
+            # still registered document with the same name
+            logger.error(f"Error generating merged document: {str(e)}")
+            return [types.TextContent(
+                type="text",
+                text=f"Error generating documents: {str(e)}"
+            )]
+
+        doc_id = str(uuid.uuid4())[:8]
+        generated_documents[doc_id] = {
+            "id": doc_id,
+            "filename": output_filename,
+            "path": str(output_path),
+            "template": template_name,
+            "created": datetime.now().isoformat(),
+            "size": summary["size"],
+            "records": summary["records"]
+        }
+        if output_mode == "zip":
+            generated_documents[doc_id]["mime_type"] = "application/zip"
+            generated_documents[doc_id]["members"] = summary["manifest"]["members"]
+            layout = "one DOCX each, listed in manifest.json"
+        else:
+            layout = "one section each"
+
+        return [types.TextContent(
+            type="text",
+            text=f"""Documents generated successfully!
+
+📄 **File**: {output_filename}
+📁 **Location**: {output_path}
+🆔 **Document ID**: {doc_id}
+🧾 **Records**: {summary['records']} ({layout})
+📏 **Size**: {summary['size'] / (1024 * 1024):.2f} MB
+📋 **Template**: {template_name}
+⏰ **Created**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+
+You can access this document using the resource URI: `document://{doc_id}`"""
+        )]
+
     async def preview_template(
         self,
         template_name: str,
@@ -1337,6 +2136,30 @@ Use document IDs with the `delete_document` tool to remove documents."""
         # Otherwise generate generic Chinese sample
         return self._generate_english_sample_data(template_key, schema)
 
+    def _json_section(self, title: str, result: Dict[str, Any], tool: str, source: Path) -> str:
+        """
+        JSON block of a parse result, or a link to the parsed:// resource
+        it was written to when it is longer than MAX_INLINE_RESULT_KB
+        """
+        result_id = str(uuid.uuid4())[:8]
+        result_path = PARSED_RESULT_DIR / f"{source.stem}_{result_id}.json"
+        text = encode_or_spill(result, MAX_INLINE_RESULT_CHARS, result_path)
+        if text is not None:
+            return f"📋 **{title} (JSON)**:\n```json\n{text}\n```"
+
+        size = result_path.stat().st_size
+        parsed_results[result_id] = {
+            "id": result_id,
+            "tool": tool,
+            "source": source.name,
+            "path": str(result_path),
+            "size": size,
+            "created": datetime.now().isoformat()
+        }
+        return f"""📋 **{title} (JSON)**: 共 {size / (1024 * 1024):.2f} MB,超过内联上限 ({MAX_INLINE_RESULT_KB} KB),已写入文件
+- 资源 URI: `parsed://{result_id}` (通过 read_resource 读取完整结果)
+- 文件: {result_path}"""
+
     async def parse_docx_document(
         self,
         file_path: str,
@@ -1369,58 +2192,12 @@ Use document IDs with the `delete_document` tool to remove documents."""
                     text=f"❌ 错误: 文件大小超过限制 ({MAX_FILE_SIZE_MB} MB)"
                 )]
 
-            # Parse document
-            doc = Document(str(doc_path))
-
-            # Extract metadata
-            core_props = doc.core_properties
-            metadata = {
-                "filename": doc_path.name,
-                "file_size_mb": round(file_size_mb, 2),
-                "author": core_props.author or "Unknown",
-                "title": core_props.title or "",
-                "subject": core_props.subject or "",
-                "created": core_props.created.isoformat() if core_props.created else None,
-                "modified": core_props.modified.isoformat() if core_props.modified else None,
-                "last_modified_by": core_props.last_modified_by or "",
-            }
-
-            # Extract paragraphs with styles
-            paragraphs = []
-            for para in doc.paragraphs:
-                if para.text.strip():  # Skip empty paragraphs
-                    para_info = {
-                        "text": para.text,
-                        "style": para.style.name if para.style else "Normal"
-                    }
-                    paragraphs.append(para_info)
-
-            # Extract tables if requested
-            tables_data = []
-            if include_tables and doc.tables:
-                for table_idx, table in enumerate(doc.tables):
-                    table_data = []
-                    for row in table.rows:
-                        row_data = [cell.text for cell in row.cells]
-                        table_data.append(row_data)
-
-                    tables_data.append({
-                        "table_number": table_idx + 1,
-                        "rows": len(table.rows),
-                        "columns": len(table.columns),
-                        "data": table_data
-                    })
-
-            # Construct result
-            result = {
-                "metadata": metadata,
-                "content": {
-                    "paragraphs": paragraphs,
-                    "paragraph_count": len(paragraphs),
-                    "tables": tables_data,
-                    "table_count": len(tables_data)
-                }
-            }
+            # Parse document, encoding paragraphs and tables as they are read
+            with document_loader.open(doc_path) as doc:
+                result = stream_docx(doc, include_tables)
+                json_section = self._json_section('解析结果', result, 'parse_docx_document', doc_path)
+            metadata = result["metadata"]
+            content = result["content"]
 
             return [types.TextContent(
                 type="text",
@@ -1433,13 +2210,10 @@ Use document IDs with the `delete_document` tool to remove documents."""
 - 标题: {metadata['title'] or '(无)'}
 
 📝 **内容统计**:
-- 段落数: {result['content']['paragraph_count']}
-- 表格数: {result['content']['table_count']}
+- 段落数: {resolve(content['paragraph_count'])}
+- 表格数: {resolve(content['table_count'])}
 
-📋 **解析结果 (JSON)**:
-```json
-{json.dumps(result, indent=2, ensure_ascii=False)}
-```
+{json_section}
 
 💡 提示: 使用此结构化数据可以进行进一步分析或转换。"""
             )]
@@ -1455,7 +2229,8 @@ Use document IDs with the `delete_document` tool to remove documents."""
         self,
         file_path: str,
         include_tables: bool = True,
-        pages: str = "all"
+        pages: str = "all",
+        table_pages: Optional[str] = None
     ) -> List[types.TextContent]:
         """Parse a PDF document and extract text and tables"""
 
@@ -1484,79 +2259,42 @@ Use document IDs with the `delete_document` tool to remove documents."""
                     text=f"❌ 错误: 文件大小超过限制 ({MAX_FILE_SIZE_MB} MB)"
                 )]
 
-            # Open PDF
-            with pdfplumber.open(str(pdf_path)) as pdf:
-                # Extract metadata
-                metadata = {
-                    "filename": pdf_path.name,
-                    "file_size_mb": round(file_size_mb, 2),
-                    "pages": len(pdf.pages),
-                    "metadata": pdf.metadata or {}
-                }
-
+            with document_loader.open(pdf_path) as doc:
                 # Parse page range
                 if pages == "all":
-                    page_indices = range(len(pdf.pages))
+                    page_indices = None
                 else:
                     # Parse range like "1-5" or "1,3,5"
                     try:
-                        if '-' in pages:
-                            start, end = pages.split('-')
-                            page_indices = range(int(start) - 1, int(end))
-                        elif ',' in pages:
-                            page_indices = [int(p.strip()) - 1 for p in pages.split(',')]
-                        else:
-                            page_indices = [int(pages) - 1]
+                        page_indices = parse_index_range(pages)
                     except ValueError:
                         return [types.TextContent(
                             type="text",
                             text=f"❌ 错误: 无效的页面范围: {pages}"
                         )]
 
-                # Extract content from pages
-                pages_data = []
-                for idx in page_indices:
-                    if idx >= len(pdf.pages):
-                        continue
-
-                    page = pdf.pages[idx]
-                    page_info = {
-                        "page_number": idx + 1,
-                        "text": page.extract_text() or "",
-                        "width": page.width,
-                        "height": page.height
-                    }
+                table_indices = None
+                if table_pages:
+                    try:
+                        table_indices = parse_index_range(table_pages)
+                    except ValueError:
+                        return [types.TextContent(
+                            type="text",
+                            text=f"❌ 错误: 无效的表格页面范围: {table_pages}"
+                        )]
 
-                    # Extract tables if requested
-                    if include_tables:
-                        tables = page.extract_tables()
-                        if tables:
-                            page_info["tables"] = [
-                                {
-                                    "table_number": t_idx + 1,
-                                    "rows": len(table),
-                                    "columns": len(table[0]) if table else 0,
-                                    "data": table
-                                }
-                                for t_idx, table in enumerate(tables)
-                            ]
-                        else:
-                            page_info["tables"] = []
-                    else:
-                        page_info["tables"] = []
+                # Calculate statistics while the pages are encoded
+                totals = {"tables": 0, "text_length": 0}
 
-                    pages_data.append(page_info)
+                def count_page(page):
+                    totals["tables"] += len(page["tables"])
+                    totals["text_length"] += len(page["text"])
 
-            # Construct result
-            result = {
-                "metadata": metadata,
-                "pages": pages_data,
-                "total_pages_parsed": len(pages_data)
-            }
+                result = stream_pdf(doc, include_tables, page_indices, table_indices)
+                result["pages"] = observe(result["pages"], count_page)
+                json_section = self._json_section('解析结果', result, 'parse_pdf_document', pdf_path)
 
-            # Calculate statistics
-            total_tables = sum(len(p.get("tables", [])) for p in pages_data)
-            total_text_length = sum(len(p.get("text", "")) for p in pages_data)
+            metadata = result["metadata"]
 
             return [types.TextContent(
                 type="text",
@@ -1566,18 +2304,16 @@ Use document IDs with the `delete_document` tool to remove documents."""
 - 文件名: {metadata['filename']}
 - 大小: {metadata['file_size_mb']} MB
 - 总页数: {metadata['pages']}
-- 已解析: {len(pages_data)} 页
+- 已解析: {resolve(result['total_pages_parsed'])} 页
 
 📝 **内容统计**:
-- 文本长度: {total_text_length} 字符
-- 表格数: {total_tables}
+- 文本长度: {totals['text_length']} 字符
+- 表格数: {totals['tables']}
+- 检测表格的页数: {resolve(result['table_pages_scanned'])} (无表格线的页面已跳过)
 
-📋 **解析结果 (JSON)**:
-```json
-{json.dumps(result, indent=2, ensure_ascii=False)}
-```
+{json_section}
 
-💡 提示: 可以使用 pages 参数指定解析特定页面 (例如: "1-5" 或 "1,3,5")"""
+💡 提示: 可以使用 pages 参数指定解析特定页面 (例如: "1-5" 或 "1,3,5"),使用 table_pages 只在指定页面检测表格"""
             )]
 
         except Exception as e:
@@ -1589,9 +2325,13 @@ Use document IDs with the `delete_document` tool to remove documents."""
 
     async def extract_text_from_document(
         self,
-        file_path: str
+        file_path: str,
+        engine: str = "layout",
+        offset: int = 0,
+        limit: int = 2000,
+        chunk_size: Optional[int] = None
     ) -> List[types.TextContent]:
-        """Quick text extraction from DOCX or PDF documents"""
+        """Quick text extraction from DOCX or PDF documents, returned in windows"""
 
         try:
             doc_path = Path(file_path)
@@ -1605,91 +2345,79 @@ Use document IDs with the `delete_document` tool to remove documents."""
 
             file_ext = doc_path.suffix.lower()
 
-            # Extract text based on file type
-            if file_ext == '.docx':
-                # Use docx2txt for quick text extraction
-                text = docx2txt.process(str(doc_path))
-
-            elif file_ext == '.pdf':
-                # Use pdfplumber for quick text extraction
-                text_parts = []
-                with pdfplumber.open(str(doc_path)) as pdf:
-                    for page in pdf.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text_parts.append(page_text)
-                text = "\n\n".join(text_parts)
-
-            elif file_ext in ['.xlsx', '.xls']:
-                # Use openpyxl for quick text extraction from Excel
-                wb = load_workbook(str(doc_path), data_only=True, read_only=True)
-                text_parts = []
-                for sheet_name in wb.sheetnames:
-                    ws = wb[sheet_name]
-                    text_parts.append(f"=== {sheet_name} ===\n")
-                    for row in ws.iter_rows(values_only=True):
-                        row_text = "\t".join([str(cell) if cell is not None else "" for cell in row])
-                        if row_text.strip():
-                            text_parts.append(row_text)
-                text = "\n".join(text_parts)
-                wb.close()
-
-            elif file_ext == '.pptx':
-                # Use python-pptx for quick text extraction from PowerPoint
-                prs = Presentation(str(doc_path))
-                text_parts = []
-                for idx, slide in enumerate(prs.slides, 1):
-                    text_parts.append(f"=== Slide {idx} ===")
-
-                    # Extract title
-                    if slide.shapes.title:
-                        text_parts.append(f"Title: {slide.shapes.title.text}")
-
-                    # Extract text from all shapes
-                    for shape in slide.shapes:
-                        if shape.has_text_frame and shape != slide.shapes.title:
-                            text = shape.text_frame.text.strip()
-                            if text:
-                                text_parts.append(text)
-
-                    # Extract notes
-                    if slide.has_notes_slide:
-                        notes_text = slide.notes_slide.notes_text_frame.text.strip()
-                        if notes_text:
-                            text_parts.append(f"Notes: {notes_text}")
-
-                    text_parts.append("")  # Empty line between slides
-
-                text = "\n".join(text_parts)
-
-            else:
+            if file_ext not in SUPPORTED_EXTENSIONS:
                 return [types.TextContent(
                     type="text",
                     text=f"❌ 错误: 不支持的文件格式: {file_ext}\n仅支持 .docx, .pdf, .xlsx, .xls 和 .pptx 文件"
                 )]
 
-            # Statistics
-            char_count = len(text)
-            word_count = len(text.split())
-            line_count = len(text.split('\n'))
+            if engine not in PDF_TEXT_ENGINES:
+                return [types.TextContent(
+                    type="text",
+                    text=f"❌ 错误: 无效的提取引擎: {engine}\n可选值: {', '.join(PDF_TEXT_ENGINES)}"
+                )]
 
-            return [types.TextContent(
-                type="text",
-                text=f"""✅ **文本提取成功**
+            if offset < 0 or limit < 0 or (chunk_size is not None and chunk_size <= 0):
+                return [types.TextContent(
+                    type="text",
+                    text="❌ 错误: offset 和 limit 不能为负数, chunk_size 必须大于 0"
+                )]
+
+            # Extract text based on file type (shared with the parse tools).
+            # Text and statistics are memoized on the loaded document, so
+            # reading the next window only slices the cached text.
+            with document_loader.open(doc_path) as doc:
+                text = extract_text(doc, engine, BATCH_MAX_WORKERS)
+                stats = text_statistics(doc, engine, BATCH_MAX_WORKERS)
+
+            chunks: List[str] = []
+            if chunk_size and limit == 0:
+                # One window of chunks per call: whole chunks up to the inline result size,
+                # the rest is read from the returned offset
+                budget = MAX_INLINE_RESULT_CHARS or len(text)
+                end = min(offset, len(text))
+                for chunk in text_chunks(text, min(chunk_size, budget), end):
+                    if end - offset + len(chunk) > budget:
+                        break
+                    chunks.append(chunk)
+                    end += len(chunk)
+            else:
+                end = len(text) if limit == 0 else min(offset + limit, len(text))
+                if chunk_size:
+                    chunks = list(text_chunks(text, chunk_size, offset, end))
+            has_more = end < len(text)
+
+            range_info = f"- 返回范围: 字符 {min(offset, len(text)):,} - {end:,} (共 {stats['chars']:,})"
+            if has_more:
+                range_info += f"\n- 剩余内容: 使用 offset={end} 继续读取"
+
+            summary = f"""✅ **文本提取成功**
 
 📄 **文件**: {doc_path.name}
 
 📊 **统计信息**:
-- 字符数: {char_count:,}
-- 单词数: {word_count:,}
-- 行数: {line_count:,}
+- 提取引擎: {engine if file_ext == '.pdf' else 'layout'}
+- 字符数: {stats['chars']:,}
+- 单词数: {stats['words']:,}
+- 行数: {stats['lines']:,}
+{range_info}
+"""
 
+            if chunk_size:
+                summary += f"\n📝 **提取的文本**: 分为 {len(chunks)} 段,见后续内容块"
+                return [types.TextContent(type="text", text=summary)] + [
+                    types.TextContent(type="text", text=chunk) for chunk in chunks
+                ]
+
+            return [types.TextContent(
+                type="text",
+                text=f"""{summary}
 📝 **提取的文本**:
 ```
-{text[:2000]}{'...' if len(text) > 2000 else ''}
+{text[offset:end]}{'...' if has_more else ''}
 ```
 
-💡 提示: 如需完整结构化解析,请使用 parse_docx_document, parse_pdf_document 或 parse_excel_document"""
+💡 提示: 使用 offset/limit 分段读取全文,或使用 chunk_size 分块返回;如需完整结构化解析,请使用 parse_docx_document, parse_pdf_document 或 parse_excel_document"""
             )]
 
         except Exception as e:
@@ -1716,127 +2444,18 @@ Use document IDs with the `delete_document` tool to remove documents."""
                 )]
 
             file_ext = doc_path.suffix.lower()
-            file_size_mb = doc_path.stat().st_size / (1024 * 1024)
 
-            metadata = {
-                "filename": doc_path.name,
-                "file_path": str(doc_path),
-                "file_size_mb": round(file_size_mb, 2),
-                "file_type": file_ext,
-            }
-
-            # Extract metadata based on file type
-            if file_ext == '.docx':
-                doc = Document(str(doc_path))
-                core_props = doc.core_properties
-
-                metadata.update({
-                    "author": core_props.author or "Unknown",
-                    "title": core_props.title or "",
-                    "subject": core_props.subject or "",
-                    "keywords": core_props.keywords or "",
-                    "created": core_props.created.isoformat() if core_props.created else None,
-                    "modified": core_props.modified.isoformat() if core_props.modified else None,
-                    "last_modified_by": core_props.last_modified_by or "",
-                    "revision": core_props.revision,
-                    "category": core_props.category or "",
-                    "comments": core_props.comments or "",
-                })
-
-                # Document statistics
-                metadata["statistics"] = {
-                    "paragraphs": len(doc.paragraphs),
-                    "tables": len(doc.tables),
-                    "sections": len(doc.sections)
-                }
-
-            elif file_ext == '.pdf':
-                with pdfplumber.open(str(doc_path)) as pdf:
-                    pdf_metadata = pdf.metadata or {}
-
-                    metadata.update({
-                        "pages": len(pdf.pages),
-                        "author": pdf_metadata.get('Author', 'Unknown'),
-                        "title": pdf_metadata.get('Title', ''),
-                        "subject": pdf_metadata.get('Subject', ''),
-                        "creator": pdf_metadata.get('Creator', ''),
-                        "producer": pdf_metadata.get('Producer', ''),
-                        "created": pdf_metadata.get('CreationDate', ''),
-                        "modified": pdf_metadata.get('ModDate', ''),
-                    })
-
-            elif file_ext in ['.xlsx', '.xls']:
-                wb = load_workbook(str(doc_path), data_only=True, read_only=True)
-
-                metadata.update({
-                    "sheets_count": len(wb.sheetnames),
-                    "sheet_names": wb.sheetnames,
-                })
-
-                # Add workbook properties if available
-                if wb.properties:
-                    props = wb.properties
-                    metadata.update({
-                        "creator": props.creator or "Unknown",
-                        "title": props.title or "",
-                        "subject": props.subject or "",
-                        "description": props.description or "",
-                        "keywords": props.keywords or "",
-                        "created": props.created.isoformat() if props.created else None,
-                        "modified": props.modified.isoformat() if props.modified else None,
-                        "last_modified_by": props.lastModifiedBy or "",
-                        "category": props.category or "",
-                    })
-
-                # Calculate statistics
-                total_cells = 0
-                for sheet_name in wb.sheetnames:
-                    ws = wb[sheet_name]
-                    if ws.max_row and ws.max_column:
-                        total_cells += ws.max_row * ws.max_column
-
-                metadata["statistics"] = {
-                    "total_cells": total_cells
-                }
-
-                wb.close()
-
-            elif file_ext == '.pptx':
-                prs = Presentation(str(doc_path))
-
-                metadata.update({
-                    "total_slides": len(prs.slides),
-                    "slide_width": prs.slide_width,
-                    "slide_height": prs.slide_height,
-                })
-
-                # Add core properties if available
-                if prs.core_properties:
-                    props = prs.core_properties
-                    metadata.update({
-                        "author": props.author or "Unknown",
-                        "title": props.title or "",
-                        "subject": props.subject or "",
-                        "created": props.created.isoformat() if props.created else None,
-                        "modified": props.modified.isoformat() if props.modified else None,
-                        "last_modified_by": props.last_modified_by or "",
-                    })
-
-                # Calculate statistics
-                total_shapes = sum(len(slide.shapes) for slide in prs.slides)
-                total_tables = sum(1 for slide in prs.slides for shape in slide.shapes if shape.has_table)
-
-                metadata["statistics"] = {
-                    "total_shapes": total_shapes,
-                    "total_tables": total_tables
-                }
-
-            else:
+            if file_ext not in SUPPORTED_EXTENSIONS:
                 return [types.TextContent(
                     type="text",
                     text=f"❌ 错误: 不支持的文件格式: {file_ext}\n仅支持 .docx, .pdf, .xlsx, .xls 和 .pptx 文件"
                 )]
 
+            # Extract metadata based on file type
+            with document_loader.open(doc_path) as doc:
+                metadata = dict(extract_metadata(doc))
+            metadata["file_path"] = str(doc_path)
+
             return [types.TextContent(
                 type="text",
                 text=f"""✅ **文档元数据**
@@ -1863,7 +2482,13 @@ Use document IDs with the `delete_document` tool to remove documents."""
         self,
         file_path: str,
         sheet_name: Optional[str] = None,
-        include_formulas: bool = True
+        include_formulas: bool = True,
+        columns: Optional[List[str]] = None,
+        header_row: Optional[int] = None,
+        where: Optional[List[Dict[str, Any]]] = None,
+        trim_empty: bool = False,
+        layout: str = "rows",
+        export_format: Optional[str] = None
     ) -> List[types.TextContent]:
         """Parse an Excel document and extract structured content"""
 
@@ -1892,101 +2517,74 @@ Use document IDs with the `delete_document` tool to remove documents."""
                     text=f"❌ 错误: 文件大小超过限制 ({MAX_FILE_SIZE_MB} MB)"
                 )]
 
-            # Load workbook (read_only=False to access merged_cells)
-            wb = load_workbook(str(excel_path), data_only=False, read_only=False)
-
-            # Extract metadata
-            metadata = {
-                "filename": excel_path.name,
-                "file_size_mb": round(file_size_mb, 2),
-                "sheets_count": len(wb.sheetnames),
-                "sheet_names": wb.sheetnames,
-            }
-
-            # Add workbook properties if available
-            if wb.properties:
-                props = wb.properties
-                metadata.update({
-                    "creator": props.creator or "Unknown",
-                    "title": props.title or "",
-                    "subject": props.subject or "",
-                    "description": props.description or "",
-                    "created": props.created.isoformat() if props.created else None,
-                    "modified": props.modified.isoformat() if props.modified else None,
-                })
-
-            # Determine which sheets to parse
-            if sheet_name:
-                if sheet_name not in wb.sheetnames:
-                    wb.close()
+            if export_format is not None:
+                if export_format not in EXPORT_FORMATS:
                     return [types.TextContent(
                         type="text",
-                        text=f"❌ 错误: 工作表 '{sheet_name}' 不存在\n可用工作表: {', '.join(wb.sheetnames)}"
+                        text=f"❌ 错误: 不支持的导出格式: {export_format} (可选: {', '.join(EXPORT_FORMATS)})"
                     )]
-                sheets_to_parse = [sheet_name]
-            else:
-                sheets_to_parse = wb.sheetnames
-
-            # Parse sheets
-            sheets_data = []
-            for ws_name in sheets_to_parse:
-                ws = wb[ws_name]
+                layout = "columnar"
 
-                # Get sheet dimensions
-                if ws.max_row is None or ws.max_column is None:
-                    continue
+            try:
+                query = SheetQuery(columns, header_row, where, trim_empty, layout)
+            except ValueError as e:
+                return [types.TextContent(
+                    type="text",
+                    text=f"❌ 错误: {str(e)}"
+                )]
 
-                # Extract cell data
-                data = []
-                for row in ws.iter_rows(min_row=1, max_row=ws.max_row, max_col=ws.max_column):
-                    row_data = []
-                    for cell in row:
-                        cell_value = cell.value
-                        # Convert datetime to ISO format string
-                        if isinstance(cell_value, (datetime, date)):
-                            cell_value = cell_value.isoformat()
-                        row_data.append(cell_value)
-                    data.append(row_data)
-
-                # Extract formulas if requested
-                formulas = {}
-                if include_formulas:
-                    for row in ws.iter_rows():
-                        for cell in row:
-                            if cell.value and isinstance(cell.value, str) and cell.value.startswith('='):
-                                cell_ref = f"{get_column_letter(cell.column)}{cell.row}"
-                                formulas[cell_ref] = cell.value
-
-                # Extract merged cells
-                merged_cells = []
-                if ws.merged_cells:
-                    merged_cells = [str(merged_range) for merged_range in ws.merged_cells.ranges]
-
-                sheet_info = {
-                    "name": ws_name,
-                    "rows": ws.max_row,
-                    "columns": ws.max_column,
-                    "data": data,
-                    "merged_cells": merged_cells,
-                }
+            with document_loader.open(excel_path) as doc:
+                # Determine which sheets to parse
+                available_sheets = sheet_names(doc)
+                if sheet_name:
+                    if sheet_name not in available_sheets:
+                        return [types.TextContent(
+                            type="text",
+                            text=f"❌ 错误: 工作表 '{sheet_name}' 不存在\n可用工作表: {', '.join(available_sheets)}"
+                        )]
+                    sheets_to_parse = [sheet_name]
+                else:
+                    sheets_to_parse = available_sheets
 
-                if formulas:
-                    sheet_info["formulas"] = formulas
+                # Sheets are exported and encoded one at a time; the summary keeps their sizes
+                sheets_data = []
 
-                sheets_data.append(sheet_info)
+                def count_sheet(sheet):
+                    sheets_data.append({
+                        "name": sheet["name"],
+                        "cells": sheet["rows"] * sheet["columns"],
+                        "formulas": len(sheet.get("formulas", {})),
+                        "export": sheet.get("export"),
+                    })
 
-            wb.close()
+                result = stream_excel(doc, sheets_to_parse, include_formulas, query)
+                if export_format is not None:
+                    result["sheets"] = (
+                        self._export_sheet(excel_path, sheet, export_format)
+                        for sheet in result["sheets"]
+                    )
+                result["sheets"] = observe(result["sheets"], count_sheet)
+                try:
+                    json_section = self._json_section('解析结果', result, 'parse_excel_document', excel_path)
+                except (ValueError, RuntimeError) as e:
+                    # Unknown column letters or header names, or pyarrow is not installed
+                    return [types.TextContent(
+                        type="text",
+                        text=f"❌ 错误: {str(e)}"
+                    )]
 
-            # Construct result
-            result = {
-                "metadata": metadata,
-                "sheets": sheets_data,
-                "total_sheets_parsed": len(sheets_data)
-            }
+            metadata = result["metadata"]
 
             # Calculate statistics
-            total_cells = sum(s["rows"] * s["columns"] for s in sheets_data)
-            total_formulas = sum(len(s.get("formulas", {})) for s in sheets_data)
+            total_cells = sum(s["cells"] for s in sheets_data)
+            total_formulas = sum(s["formulas"] for s in sheets_data)
+            export_lines = [
+                f"- {s['name']}: {s['export']['filename']} (`document://{s['export']['document_id']}`)"
+                for s in sheets_data if s["export"]
+            ]
+            export_section = ""
+            if export_lines:
+                export_section = "\n📦 **导出文件**:\n" + "\n".join(export_lines) + "\n"
 
             return [types.TextContent(
                 type="text",
@@ -2002,13 +2600,10 @@ Use document IDs with the `delete_document` tool to remove documents."""
 - 工作表名称: {', '.join([s['name'] for s in sheets_data])}
 - 总单元格数: {total_cells:,}
 - 公式数: {total_formulas}
+{export_section}
+{json_section}
 
-📋 **解析结果 (JSON)**:
-```json
-{json.dumps(result, indent=2, ensure_ascii=False)}
-```
-
-💡 提示: 可以使用 sheet_name 参数指定解析特定工作表"""
+💡 提示: 可以使用 sheet_name 参数指定解析特定工作表,使用 columns / header_row / where 只读取需要的列和行"""
             )]
 
         except Exception as e:
@@ -2018,6 +2613,34 @@ Use document IDs with the `delete_document` tool to remove documents."""
                 text=f"❌ **解析失败**: {str(e)}\n\n{traceback.format_exc()}"
             )]
 
+    def _export_sheet(self, excel_path: Path, sheet: Dict[str, Any], export_format: str) -> Dict[str, Any]:
+        """Write one columnar sheet to OUTPUT_DIR and register it as a generated document"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        sheet_slug = re.sub(r'[^\w.-]+', '_', sheet["name"]).strip('_') or "sheet"
+        output_filename = f"{excel_path.stem}_{sheet_slug}_{timestamp}{EXPORT_FORMATS[export_format]}"
+        output_path = write_columns(sheet, OUTPUT_DIR / output_filename, export_format)
+
+        doc_id = str(uuid.uuid4())[:8]
+        generated_documents[doc_id] = {
+            "id": doc_id,
+            "filename": output_filename,
+            "path": str(output_path),
+            "template": excel_path.name,
+            "created": datetime.now().isoformat(),
+            "size": output_path.stat().st_size,
+            "mime_type": EXPORT_MIME_TYPES[export_format]
+        }
+
+        # Parsed sheets may be shared with the part cache, so return a copy
+        exported = {key: value for key, value in sheet.items() if key != "values"}
+        exported["export"] = {
+            "document_id": doc_id,
+            "filename": output_filename,
+            "path": str(output_path),
+            "format": export_format
+        }
+        return exported
+
     async def parse_ppt_document(
         self,
         file_path: str,
@@ -2052,140 +2675,25 @@ Use document IDs with the `delete_document` tool to remove documents."""
                     text=f"❌ 错误: 文件大小超过限制 ({MAX_FILE_SIZE_MB} MB)"
                 )]
 
-            # Open presentation
-            prs = Presentation(str(ppt_path))
-
-            # Extract metadata
-            metadata = {
-                "filename": ppt_path.name,
-                "file_size_mb": round(file_size_mb, 2),
-                "total_slides": len(prs.slides),
-                "slide_width": prs.slide_width,
-                "slide_height": prs.slide_height,
-            }
-
-            # Add core properties if available
-            if prs.core_properties:
-                props = prs.core_properties
-                metadata.update({
-                    "author": props.author or "Unknown",
-                    "title": props.title or "",
-                    "subject": props.subject or "",
-                    "created": props.created.isoformat() if props.created else None,
-                    "modified": props.modified.isoformat() if props.modified else None,
-                    "last_modified_by": props.last_modified_by or "",
-                })
-
-            # Parse slide range
-            if slides == "all":
-                slide_indices = range(len(prs.slides))
-            else:
-                # Parse range like "1-5" or "1,3,5"
-                try:
-                    if '-' in slides:
-                        start, end = slides.split('-')
-                        slide_indices = range(int(start) - 1, int(end))
-                    elif ',' in slides:
-                        slide_indices = [int(s.strip()) - 1 for s in slides.split(',')]
-                    else:
-                        slide_indices = [int(slides) - 1]
-                except ValueError:
-                    return [types.TextContent(
-                        type="text",
-                        text=f"❌ 错误: 无效的幻灯片范围: {slides}"
-                    )]
-
-            # Extract content from slides
-            slides_data = []
-            total_tables = 0
-            total_images = 0
-            total_text_length = 0
+            with document_loader.open(ppt_path) as doc:
+                # Parse slide range
+                if slides == "all":
+                    slide_indices = None
+                else:
+                    # Parse range like "1-5" or "1,3,5"
+                    try:
+                        slide_indices = parse_index_range(slides)
+                    except ValueError:
+                        return [types.TextContent(
+                            type="text",
+                            text=f"❌ 错误: 无效的幻灯片范围: {slides}"
+                        )]
 
-            for idx in slide_indices:
-                if idx >= len(prs.slides) or idx < 0:
-                    continue
+                result = stream_pptx(doc, include_tables, include_images, slide_indices)
+                json_section = self._json_section('解析结果', result, 'parse_ppt_document', ppt_path)
 
-                slide = prs.slides[idx]
-                slide_info = {
-                    "slide_number": idx + 1,
-                    "title": "",
-                    "shapes": [],
-                    "tables": [],
-                    "images": []
-                }
-
-                # Extract title
-                if slide.shapes.title:
-                    slide_info["title"] = slide.shapes.title.text
-                    total_text_length += len(slide.shapes.title.text)
-
-                # Process all shapes
-                for shape in slide.shapes:
-                    # Skip title (already extracted)
-                    if shape == slide.shapes.title:
-                        continue
-
-                    # Extract text from text frames
-                    if shape.has_text_frame:
-                        text = shape.text_frame.text.strip()
-                        if text:
-                            shape_info = {
-                                "shape_type": "text",
-                                "text": text
-                            }
-                            slide_info["shapes"].append(shape_info)
-                            total_text_length += len(text)
-
-                    # Extract tables if requested
-                    if include_tables and shape.has_table:
-                        table = shape.table
-                        table_data = []
-                        for row in table.rows:
-                            row_data = [cell.text for cell in row.cells]
-                            table_data.append(row_data)
-
-                        table_info = {
-                            "rows": len(table.rows),
-                            "columns": len(table.columns),
-                            "data": table_data
-                        }
-                        slide_info["tables"].append(table_info)
-                        total_tables += 1
-
-                    # Extract image information if requested
-                    if include_images and shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
-                        image_info = {
-                            "shape_type": "picture",
-                            "width": shape.width,
-                            "height": shape.height,
-                            "left": shape.left,
-                            "top": shape.top
-                        }
-                        slide_info["images"].append(image_info)
-                        total_images += 1
-
-                # Extract notes if available
-                if slide.has_notes_slide:
-                    notes_text = slide.notes_slide.notes_text_frame.text.strip()
-                    if notes_text:
-                        slide_info["notes"] = notes_text
-                        total_text_length += len(notes_text)
-                else:
-                    slide_info["notes"] = ""
-
-                slides_data.append(slide_info)
-
-            # Construct result
-            result = {
-                "metadata": metadata,
-                "slides": slides_data,
-                "statistics": {
-                    "total_slides_parsed": len(slides_data),
-                    "total_text_length": total_text_length,
-                    "total_tables": total_tables,
-                    "total_images": total_images
-                }
-            }
+            metadata = result["metadata"]
+            statistics = resolve(result["statistics"])
 
             return [types.TextContent(
                 type="text",
@@ -2195,17 +2703,14 @@ Use document IDs with the `delete_document` tool to remove documents."""
 - 文件名: {metadata['filename']}
 - 大小: {metadata['file_size_mb']} MB
 - 总幻灯片数: {metadata['total_slides']}
-- 已解析: {len(slides_data)} 张
+- 已解析: {statistics['total_slides_parsed']} 张
 
 📝 **内容统计**:
-- 文本长度: {total_text_length:,} 字符
-- 表格数: {total_tables}
-- 图片数: {total_images}
+- 文本长度: {statistics['total_text_length']:,} 字符
+- 表格数: {statistics['total_tables']}
+- 图片数: {statistics['total_images']}
 
-📋 **解析结果 (JSON)**:
-```json
-{json.dumps(result, indent=2, ensure_ascii=False)}
-```
+{json_section}
 
 💡 提示: 可以使用 slides 参数指定解析特定幻灯片 (例如: "1-5" 或 "1,3,5")"""
             )]
@@ -2217,6 +2722,442 @@ Use document IDs with the `delete_document` tool to remove documents."""
                 text=f"❌ **解析失败**: {str(e)}\n\n{traceback.format_exc()}"
             )]
 
+    async def parse_documents_batch(
+        self,
+        paths: Optional[List[str]] = None,
+        directory: Optional[str] = None,
+        pattern: Optional[str] = None,
+        recursive: bool = False,
+        output_name: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        include_tables: bool = True,
+        include_formulas: bool = True,
+        include_images: bool = False
+    ) -> List[types.TextContent]:
+        """Parse many documents in parallel and stream results to NDJSON"""
+
+        try:
+            if not paths and not directory and not pattern:
+                return [types.TextContent(
+                    type="text",
+                    text="❌ 错误: 请提供 paths、directory 或 pattern 中的至少一个"
+                )]
+
+            if directory and not Path(directory).is_dir():
+                return [types.TextContent(
+                    type="text",
+                    text=f"❌ 错误: 目录不存在: {directory}"
+                )]
+
+            files = resolve_batch_paths(paths, directory, pattern, recursive)
+            if not files:
+                return [types.TextContent(
+                    type="text",
+                    text="⚠️ 没有找到可解析的文档 (支持 .docx, .pdf, .xlsx, .xls 和 .pptx)"
+                )]
+
+            if output_name:
+                output_filename = f"{output_name}.ndjson"
+            else:
+                output_filename = f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson"
+            output_path = OUTPUT_DIR / output_filename
+
+            options = {
+                "include_tables": include_tables,
+                "include_formulas": include_formulas,
+                "include_images": include_images,
+                "max_file_size_mb": MAX_FILE_SIZE_MB,
+            }
+
+            # Run the pool off the event loop so other requests keep being served
+            summary = await asyncio.to_thread(
+                run_batch, files, options, output_path, max_workers or BATCH_MAX_WORKERS
+            )
+
+            type_lines = [
+                f"- {file_type}: {counts['ok']} 成功, {counts['error']} 失败"
+                for file_type, counts in sorted(summary["by_type"].items())
+            ]
+            failure_lines = [
+                f"- {failure['file']}: {failure['error']}"
+                for failure in summary["failures"][:20]
+            ]
+            if len(summary["failures"]) > 20:
+                failure_lines.append(f"- ... 另有 {len(summary['failures']) - 20} 个失败,详见输出文件")
+
+            text = f"""✅ **批量解析完成**
+
+📊 **统计信息**:
+- 文件总数: {summary['total']}
+- 成功: {summary['succeeded']}
+- 失败: {summary['failed']}
+- 并行进程数: {summary['workers']}
+- 总耗时: {summary['total_seconds']} 秒
+
+📁 **按类型**:
+{chr(10).join(type_lines)}
+
+📄 **结果文件 (NDJSON, 每行一个文件)**: {summary['output_file']} ({summary['output_size_mb']} MB)
+"""
+            if failure_lines:
+                text += f"""
+❌ **失败文件**:
+{chr(10).join(failure_lines)}
+"""
+            text += "\n💡 提示: 每行包含 file、type、status、elapsed_ms 以及 result 或 error 字段"
+
+            return [types.TextContent(type="text", text=text)]
+
+        except Exception as e:
+            logger.error(f"批量解析时出错: {str(e)}")
+            return [types.TextContent(
+                type="text",
+                text=f"❌ **批量解析失败**: {str(e)}\n\n{traceback.format_exc()}"
+            )]
+
+    async def index_documents(
+        self,
+        paths: Optional[List[str]] = None,
+        directory: Optional[str] = None,
+        pattern: Optional[str] = None,
+        recursive: bool = False,
+        remove_missing: bool = False,
+        max_workers: Optional[int] = None
+    ) -> List[types.TextContent]:
+        """Add documents to the full-text search index"""
+
+        try:
+            if not paths and not directory and not pattern and not remove_missing:
+                return [types.TextContent(
+                    type="text",
+                    text="❌ 错误: 请提供 paths、directory 或 pattern 中的至少一个"
+                )]
+
+            if directory and not Path(directory).is_dir():
+                return [types.TextContent(
+                    type="text",
+                    text=f"❌ 错误: 目录不存在: {directory}"
+                )]
+
+            files = resolve_batch_paths(paths, directory, pattern, recursive)
+
+            summary = await asyncio.to_thread(
+                search_index.index_files, files, max_workers or BATCH_MAX_WORKERS, remove_missing
+            )
+
+            failure_lines = [
+                f"- {failure['file']}: {failure['error']}"
+                for failure in summary["failures"][:20]
+            ]
+            if len(summary["failures"]) > 20:
+                failure_lines.append(f"- ... 另有 {len(summary['failures']) - 20} 个失败")
+
+            text = f"""✅ **索引更新完成**
+
+📊 **统计信息**:
+- 文件总数: {summary['total']}
+- 新建/重建索引: {summary['indexed']}
+- 未变化 (已跳过): {summary['unchanged']}
+- 内容未变 (仅更新时间戳): {summary['touched']}
+- 失败: {summary['failed']}
+- 已移除的失效文件: {summary['removed']}
+- 新增文本片段: {summary['segments']}
+- 总耗时: {summary['total_seconds']} 秒
+
+🗂️ **索引**: {search_index.db_path} (共 {summary['documents_in_index']} 个文档)
+"""
+            if failure_lines:
+                text += f"""
+❌ **失败文件**:
+{chr(10).join(failure_lines)}
+"""
+            text += "\n💡 提示: 使用 search_documents 工具搜索已索引的文档"
+
+            return [types.TextContent(type="text", text=text)]
+
+        except Exception as e:
+            logger.error(f"建立索引时出错: {str(e)}")
+            return [types.TextContent(
+                type="text",
+                text=f"❌ **建立索引失败**: {str(e)}\n\n{traceback.format_exc()}"
+            )]
+
+    async def search_documents(
+        self,
+        query: str,
+        limit: int = 10,
+        file_types: Optional[List[str]] = None
+    ) -> List[types.TextContent]:
+        """Search the full-text index"""
+
+        try:
+            if not query or not query.strip():
+                return [types.TextContent(
+                    type="text",
+                    text="❌ 错误: 搜索词不能为空"
+                )]
+
+            results = await asyncio.to_thread(search_index.search, query, limit, file_types)
+
+            if not results:
+                stats = await asyncio.to_thread(search_index.stats)
+                text = f"🔍 没有找到与 \"{query}\" 匹配的内容 (索引中共 {stats['documents']} 个文档)"
+                if stats["documents"] == 0:
+                    text += "\n\n💡 提示: 请先使用 index_documents 工具建立索引"
+                return [types.TextContent(type="text", text=text)]
+
+            text = f"🔍 **搜索结果**: \"{query}\" (共 {len(results)} 条)\n\n"
+            for i, result in enumerate(results, 1):
+                snippet = " ".join(result["snippet"].split())
+                text += f"**{i}. {Path(result['file']).name}** - {format_location(result['location'])}\n"
+                text += f"   - 路径: {result['file']}\n"
+                text += f"   - 相关度: {result['score']}\n"
+                text += f"   - 摘要: {snippet}\n\n"
+
+            return [types.TextContent(type="text", text=text)]
+
+        except Exception as e:
+            logger.error(f"搜索文档时出错: {str(e)}")
+            return [types.TextContent(
+                type="text",
+                text=f"❌ **搜索失败**: {str(e)}\n\n{traceback.format_exc()}"
+            )]
+
+    async def query_formula_dependencies(
+        self,
+        file_path: str,
+        cell: str,
+        sheet_name: Optional[str] = None,
+        direction: str = "both",
+        depth: int = 1,
+        limit: int = 200
+    ) -> List[types.TextContent]:
+        """Look up precedents and dependents of one cell in the workbook's formula graph"""
+
+        try:
+            excel_path = Path(file_path)
+
+            if not excel_path.exists():
+                return [types.TextContent(
+                    type="text",
+                    text=f"❌ 错误: 文件不存在: {file_path}"
+                )]
+
+            if excel_path.suffix.lower() != '.xlsx':
+                return [types.TextContent(
+                    type="text",
+                    text=f"❌ 错误: 文件格式不正确。期望 .xlsx 文件,实际: {excel_path.suffix}"
+                )]
+
+            if direction not in FORMULA_DIRECTIONS:
+                return [types.TextContent(
+                    type="text",
+                    text=f"❌ 错误: 不支持的方向: {direction} (可选: {', '.join(FORMULA_DIRECTIONS)})"
+                )]
+
+            with document_loader.open(excel_path) as doc:
+                graph = await asyncio.to_thread(formula_graph, doc)
+
+            reference = parse_cell_reference(cell, sheet_name or (graph.sheets[0] if graph.sheets else None))
+            sheet = graph.canonical_sheet(reference[0]) if reference else None
+            if reference is None or sheet is None:
+                return [types.TextContent(
+                    type="text",
+                    text=f"❌ 错误: 无效的单元格引用: {cell}\n可用工作表: {', '.join(graph.sheets)}"
+                )]
+
+            result = graph.trace(sheet, reference[1], reference[2], direction, max(depth, 0), max(limit, 1))
+            summary = graph.summary()
+
+            text = f"""✅ **公式依赖查询**
+
+📍 **单元格**: {result['cell']}
+🧮 **公式**: {result['formula'] or '(无公式)'}
+"""
+            for key, title in (("precedents", "引用的单元格 (precedents)"), ("dependents", "依赖它的公式 (dependents)")):
+                if key not in result:
+                    continue
+                entries = result[key]
+                text += f"\n🔗 **{title}**: {len(entries)} 项"
+                if result[f"{key}_truncated"]:
+                    text += " (已截断,增大 limit 查看更多)"
+                text += "\n"
+                for entry in entries:
+                    indent = "  " * (entry["depth"] - 1)
+                    formula = f" `{entry['formula']}`" if "formula" in entry else ""
+                    text += f"{indent}- {entry['ref']}{formula}\n"
+
+            text += f"""
+📊 **工作簿公式统计**:
+- 公式单元格: {summary['formula_cells']:,}
+- 引用数: {summary['references']:,}
+
+{self._json_section('查询结果', result, 'query_formula_dependencies', excel_path)}"""
+            return [types.TextContent(type="text", text=text)]
+
+        except Exception as e:
+            logger.error(f"查询公式依赖时出错: {str(e)}")
+            return [types.TextContent(
+                type="text",
+                text=f"❌ **查询失败**: {str(e)}\n\n{traceback.format_exc()}"
+            )]
+
+    def _session_key(self) -> Optional[int]:
+        """Identifies the client session of the current request, for fair scheduling"""
+        try:
+            return id(self.server.request_context.session)
+        except LookupError:
+            return None
+
+    def _progress_notifier(self) -> Optional[ProgressNotifier]:
+        """Progress notifier of the current request, if its client asked for progress"""
+        try:
+            context = self.server.request_context
+        except LookupError:
+            return None
+        if context.meta is None or context.meta.progressToken is None:
+            return None
+        return ProgressNotifier(
+            context.session, context.meta.progressToken, asyncio.get_running_loop(), context.request_id
+        )
+
+    async def submit_job(
+        self,
+        tool: str,
+        arguments: Optional[Dict[str, Any]] = None
+    ) -> List[types.TextContent]:
+        """Start a tool call as a background job"""
+
+        if tool in JOB_TOOLS or tool not in {t.name for t in self.tool_definitions()}:
+            return [types.TextContent(
+                type="text",
+                text=f"Error: Tool cannot be run as a job: {tool}"
+            )]
+
+        arguments = dict(arguments or {})
+        arguments.pop("profile", None)
+
+        try:
+            job = job_manager.submit(
+                tool, arguments, lambda: self.execute_tool(tool, arguments),
+                tool_lane(tool), self._session_key()
+            )
+        except JobStoreFull as e:
+            return [types.TextContent(
+                type="text",
+                text=f"Error: {str(e)}. Collect or cancel finished jobs and try again."
+            )]
+
+        return [types.TextContent(
+            type="text",
+            text=f"""⏳ **Job submitted**
+
+**Job ID**: {job.id}
+**Tool**: {tool}
+**State**: {job.state}
+
+Use `get_job_status` to follow progress and `get_job_result` to collect the output."""
+        )]
+
+    async def get_job_status(self, job_id: Optional[str] = None) -> List[types.TextContent]:
+        """Show the state and progress of one job or of all jobs"""
+
+        if job_id:
+            job = job_manager.get(job_id)
+            if job is None:
+                return [types.TextContent(
+                    type="text",
+                    text=f"Error: Job not found: {job_id}"
+                )]
+            statuses = [job.status()]
+        else:
+            statuses = [job.status() for job in job_manager.jobs()]
+            if not statuses:
+                return [types.TextContent(
+                    type="text",
+                    text="No jobs. Use the `submit_job` tool to start one."
+                )]
+
+        lines = []
+        for status in statuses:
+            progress = f"{status['progress']:g}"
+            if status["total"]:
+                progress += f"/{status['total']:g}"
+            line = f"- **{status['job_id']}** ({status['tool']}): {status['state']}, progress {progress}"
+            if status["message"]:
+                line += f" - {status['message']}"
+            lines.append(line)
+
+        return [types.TextContent(
+            type="text",
+            text=f"""📋 **Jobs** ({len(statuses)}):
+
+{chr(10).join(lines)}
+
+```json
+{json.dumps(statuses if not job_id else statuses[0], indent=2, ensure_ascii=False)}
+```"""
+        )]
+
+    async def get_job_result(self, job_id: str, wait_seconds: float = 0) -> List[types.TextContent]:
+        """Return the output of a finished job, optionally waiting for it"""
+
+        job = job_manager.get(job_id)
+        if job is None:
+            return [types.TextContent(
+                type="text",
+                text=f"Error: Job not found: {job_id}"
+            )]
+
+        # Forward the job's progress to this request while it waits
+        notifier = self._progress_notifier()
+        if notifier is not None and not job.done:
+            job.add_listener(notifier)
+        try:
+            await job.wait(max(float(wait_seconds or 0), 0))
+        finally:
+            if notifier is not None:
+                job.remove_listener(notifier)
+
+        if job.state == "succeeded":
+            return job.result
+        if job.state == "failed":
+            return [types.TextContent(
+                type="text",
+                text=f"Error: Job {job.id} failed: {job.error}"
+            )]
+        if job.state == "cancelled":
+            return [types.TextContent(
+                type="text",
+                text=f"Error: Job {job.id} was cancelled"
+            )]
+
+        progress = f"{job.progress:g}" + (f"/{job.total:g}" if job.total else "")
+        return [types.TextContent(
+            type="text",
+            text=f"⏳ Job {job.id} is still {job.state} (progress {progress}). Call `get_job_result` again later."
+        )]
+
+    async def cancel_job(self, job_id: str) -> List[types.TextContent]:
+        """Cancel a queued or running job"""
+
+        job = job_manager.cancel(job_id)
+        if job is None:
+            return [types.TextContent(
+                type="text",
+                text=f"Error: Job not found: {job_id}"
+            )]
+        if job.done and not job.cancel_requested:
+            return [types.TextContent(
+                type="text",
+                text=f"Job {job.id} already finished ({job.state})"
+            )]
+
+        return [types.TextContent(
+            type="text",
+            text=f"✅ Cancellation requested for job {job.id}"
+        )]
+
     async def run(self):
         """Run the MCP server"""
         async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
@@ -2233,6 +3174,10 @@ Use document IDs with the `delete_document` tool to remove documents."""
             logger.info(f"Template directory: {TEMPLATE_DIR}")
             logger.info(f"Output directory: {OUTPUT_DIR}")
 
+            if worker_pool is not None:
+                # Start preloading workers while the client initializes
+                await asyncio.to_thread(worker_pool.warm_up)
+
             await self.server.run(
                 read_stream,
                 write_stream,
@@ -2247,5 +3192,9 @@ async def main():
 
 
 if __name__ == "__main__":
-    import asyncio
-    asyncio.run(main())
\ No newline at end of file
+    # Started as "python -m src.server": hand over to src/__main__.py, so the
+    # functions sent to worker processes resolve to src.server and use the
+    # state the forkserver preloaded, rather than a copy of this module that
+    # every worker would import again
+    import runpy
+    runpy.run_module("src", run_name="__main__", alter_sys=True)
\ No newline at end of file
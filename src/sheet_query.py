@@ -0,0 +1,295 @@
+"""
+Column projection and row filtering for Excel sheets.
+
+A SheetQuery describes which columns of a sheet to read, an optional header
+row that turns rows into records, and simple row predicates. Queried sheets
+are read through openpyxl's streaming read-only mode restricted to the span
+of the selected columns, so cells outside the projection are never
+materialized or serialized. With the "columnar" layout the rows come back
+as one typed array per column (see ``columnar``).
+"""
+
+import re
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from openpyxl.utils import column_index_from_string, get_column_letter
+
+from .columnar import build_columns
+
+_COLUMN_LETTERS = re.compile(r"^[A-Za-z]{1,3}$")
+
+PREDICATE_OPERATORS = ("eq", "ne", "gt", "ge", "lt", "le", "contains", "empty", "not_empty")
+
+SHEET_LAYOUTS = ("rows", "columnar")
+
+
+def _cell_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _as_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _compare(op: str, value: Any, target: Any) -> bool:
+    if op == "empty":
+        return value is None or value == ""
+    if op == "not_empty":
+        return value is not None and value != ""
+    if value is None:
+        return op == "ne" and target is not None
+    if op == "contains":
+        return str(target).lower() in str(value).lower()
+
+    left, right = _as_number(value), _as_number(target)
+    if left is None or right is None:
+        left, right = str(value), str(target)
+    if op == "eq":
+        return left == right
+    if op == "ne":
+        return left != right
+    if isinstance(left, str) != isinstance(right, str):
+        return False
+    if op == "gt":
+        return left > right
+    if op == "ge":
+        return left >= right
+    if op == "lt":
+        return left < right
+    return left <= right
+
+
+class SheetQuery:
+    """
+    Projection, header and filter options for parse_excel.
+
+    ``columns`` items are column letters ("A"), letter ranges ("C:F") or,
+    when ``header_row`` is set, header cell texts. ``where`` is a list of
+    ``{"column": ..., "op": ..., "value": ...}`` predicates that must all
+    hold. ``trim_empty`` drops trailing rows and columns without values.
+    ``layout`` is "rows" (lists or records) or "columnar" (typed arrays per
+    column).
+    """
+
+    def __init__(
+        self,
+        columns: Optional[List[str]] = None,
+        header_row: Optional[int] = None,
+        where: Optional[List[Dict[str, Any]]] = None,
+        trim_empty: bool = False,
+        layout: str = "rows"
+    ):
+        if layout not in SHEET_LAYOUTS:
+            raise ValueError(f"Unknown layout: {layout} (expected one of {', '.join(SHEET_LAYOUTS)})")
+        if header_row is not None and header_row < 1:
+            raise ValueError("header_row must be 1 or greater")
+        for predicate in where or []:
+            if predicate.get("op", "eq") not in PREDICATE_OPERATORS:
+                raise ValueError(
+                    f"Unknown operator: {predicate.get('op')} (expected one of {', '.join(PREDICATE_OPERATORS)})"
+                )
+            if "column" not in predicate:
+                raise ValueError("Every where condition needs a column")
+
+        self.columns = list(columns) if columns else None
+        self.header_row = header_row
+        self.where = [dict(p) for p in where or []]
+        self.trim_empty = trim_empty
+        self.layout = layout
+
+    @property
+    def streams(self) -> bool:
+        """Whether the sheet is read through the streaming projection path"""
+        return bool(self.columns or self.header_row or self.where or self.layout == "columnar")
+
+    def cache_key(self) -> Hashable:
+        return (
+            tuple(self.columns or ()),
+            self.header_row,
+            tuple((p["column"], p.get("op", "eq"), repr(p.get("value"))) for p in self.where),
+            self.trim_empty,
+            self.layout,
+        )
+
+    # ------------------------------------------------------------------
+    # Column resolution
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _letter_index(spec: str) -> Optional[int]:
+        if _COLUMN_LETTERS.match(spec):
+            return column_index_from_string(spec.upper())
+        return None
+
+    def _resolve(self, spec: str, header: Dict[str, int]) -> List[int]:
+        """1-based column indices for one column spec"""
+        if spec in header:
+            return [header[spec]]
+        if ':' in spec:
+            first, last = (self._letter_index(part.strip()) for part in spec.split(':', 1))
+            if first is not None and last is not None and first <= last:
+                return list(range(first, last + 1))
+        else:
+            index = self._letter_index(spec.strip())
+            if index is not None:
+                return [index]
+        raise ValueError(f"Unknown column: {spec}")
+
+    def _header_row_values(self, ws) -> Dict[str, int]:
+        header: Dict[str, int] = {}
+        if self.header_row is None:
+            return header
+        for row in ws.iter_rows(min_row=self.header_row, max_row=self.header_row, values_only=True):
+            for index, value in enumerate(row, start=1):
+                if value is not None and str(value) not in header:
+                    header[str(value)] = index
+        return header
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def run(
+        self,
+        ws,
+        formula_cells: bool = True,
+        used: Optional[Tuple[int, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Read the projected, filtered rows of a read-only worksheet.
+
+        ``used`` is the sheet's used range (rows, columns); rows below it are
+        not streamed, and without a projection neither are columns past it.
+        """
+        header = self._header_row_values(ws)
+
+        selected: Optional[List[int]] = None
+        if self.columns:
+            selected = []
+            for spec in self.columns:
+                for index in self._resolve(spec, header):
+                    if index not in selected:
+                        selected.append(index)
+
+        predicates: List[Tuple[int, Callable[[Any], bool]]] = []
+        for predicate in self.where:
+            index = self._resolve(str(predicate["column"]), header)[0]
+            op, target = predicate.get("op", "eq"), predicate.get("value")
+            predicates.append((index, lambda value, op=op, target=target: _compare(op, value, target)))
+
+        # Only the span of the selected and filtered columns is streamed
+        needed = (selected or []) + [index for index, _ in predicates]
+        min_col = min(needed) if selected else 1
+        max_col = max(needed) if selected else None
+        max_row = None
+        if used is not None:
+            max_row = used[0]
+            if max_col is None:
+                max_col = max(used[1], max(needed, default=1))
+        first_row = (self.header_row or 0) + 1
+
+        rows: List[List[Any]] = []
+        row_numbers: List[int] = []
+        formulas: Dict[str, str] = {}
+        width = 0
+        for row_number, row in enumerate(
+            ws.iter_rows(min_row=first_row, max_row=max_row, min_col=min_col, max_col=max_col, values_only=True),
+            start=first_row
+        ):
+            def value_at(index: int) -> Any:
+                offset = index - min_col
+                return row[offset] if 0 <= offset < len(row) else None
+
+            if not all(check(_cell_value(value_at(index))) for index, check in predicates):
+                continue
+
+            if selected is None:
+                values = list(row)
+                width = max(width, len(values))
+                columns = range(min_col, min_col + len(values))
+            else:
+                values = [value_at(index) for index in selected]
+                columns = selected
+
+            if formula_cells:
+                for index, value in zip(columns, values):
+                    if isinstance(value, str) and value.startswith('='):
+                        formulas[f"{get_column_letter(index)}{row_number}"] = value
+
+            rows.append(values)
+            row_numbers.append(row_number)
+
+        if selected is None:
+            selected = list(range(1, width + 1))
+            rows = [values + [None] * (width - len(values)) for values in rows]
+
+        if self.trim_empty:
+            rows, row_numbers, selected = self._trim(rows, row_numbers, selected, explicit=bool(self.columns))
+
+        letters = [get_column_letter(index) for index in selected]
+        result: Dict[str, Any] = {
+            "rows": len(rows),
+            "columns": len(selected),
+            "column_letters": letters,
+        }
+
+        if self.header_row is not None:
+            by_index = {index: name for name, index in header.items()}
+            keys = []
+            for index, letter in zip(selected, letters):
+                key = by_index.get(index, letter)
+                keys.append(key if key not in keys else f"{key} ({letter})")
+        else:
+            keys = letters
+
+        if self.layout == "columnar":
+            result["layout"] = "columnar"
+            result.update(build_columns(keys, letters, rows))
+        elif self.header_row is not None:
+            result["header"] = keys
+            result["records"] = [dict(zip(keys, map(_cell_value, values))) for values in rows]
+        else:
+            result["data"] = [[_cell_value(value) for value in values] for values in rows]
+        result["row_numbers"] = row_numbers
+
+        if formulas:
+            result["formulas"] = formulas
+        return result
+
+    @staticmethod
+    def _trim(
+        rows: List[List[Any]],
+        row_numbers: List[int],
+        columns: List[int],
+        explicit: bool
+    ) -> Tuple[List[List[Any]], List[int], List[int]]:
+        """Drop trailing all-empty rows, and trailing empty columns unless chosen explicitly"""
+        while rows and all(value is None for value in rows[-1]):
+            rows.pop()
+            row_numbers.pop()
+        if not explicit:
+            width = max((i + 1 for values in rows for i, v in enumerate(values) if v is not None), default=0)
+            rows = [values[:width] for values in rows]
+            columns = columns[:width]
+        return rows, row_numbers, columns
+
+
+def trim_rows(data: Iterable[List[Any]]) -> List[List[Any]]:
+    """Row-major data without trailing empty rows and columns"""
+    data = list(data)
+    while data and all(value is None for value in data[-1]):
+        data.pop()
+    width = max((i + 1 for row in data for i, v in enumerate(row) if v is not None), default=0)
+    return [row[:width] for row in data]
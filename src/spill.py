@@ -0,0 +1,69 @@
+"""
+Spill oversized tool results to disk.
+
+Parse tools return their full result as JSON inside the response. For a
+large workbook or a long PDF that is tens of megabytes in one message, and
+the encoded string is held in memory next to the result itself. Above a
+size limit the result is instead encoded incrementally straight into a
+file, and the response carries only its summary and a resource URI.
+"""
+
+import os
+from pathlib import Path
+from typing import Any, Iterator, List, Optional
+
+from .streaming import iterencode
+
+# Pieces produced by the encoder are joined into blocks of this size
+WRITE_BLOCK = 64 * 1024
+
+
+def _blocks(pieces: Iterator[str]) -> Iterator[str]:
+    block: List[str] = []
+    size = 0
+    for piece in pieces:
+        block.append(piece)
+        size += len(piece)
+        if size >= WRITE_BLOCK:
+            joined = "".join(block)
+            block = []
+            size = 0
+            yield joined
+    if block:
+        yield "".join(block)
+
+
+def encode_or_spill(obj: Any, limit: int, path: Path) -> Optional[str]:
+    """
+    JSON of ``obj`` (indented, non-ASCII kept) when it is at most ``limit``
+    characters long, else None after writing it to ``path``.
+
+    ``obj`` may hold generators and Deferred values (see streaming); they
+    are consumed as the JSON is produced, and only about ``limit``
+    characters of it are ever held in memory. The file is written under a
+    ``.partial`` name and renamed once complete. ``limit`` 0 never spills.
+    """
+    blocks = _blocks(iterencode(obj))
+    head: List[str] = []
+    size = 0
+    for block in blocks:
+        head.append(block)
+        size += len(block)
+        if limit and size > limit:
+            break
+    else:
+        return "".join(head)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + ".partial")
+    try:
+        with open(partial, "w", encoding="utf-8") as f:
+            f.writelines(head)
+            head = []
+            for block in blocks:
+                f.write(block)
+        os.replace(partial, path)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    return None
@@ -0,0 +1,121 @@
+"""
+Results produced record by record.
+
+A parser can return its result with the long lists (pages, slides,
+sheets, paragraphs) as generators that yield one record at a time, and
+the totals that follow them wrapped in Deferred, since they are only
+known once the records have been produced. iterencode writes such a
+result as JSON piece by piece, so the records never need to be in memory
+together; materialize turns it into the plain structure.
+
+Generators and Deferred values may appear anywhere in the dicts of a
+result; the records a generator yields are plain data.
+"""
+
+import json
+from collections.abc import Iterator
+from typing import Any, Callable, Iterable, Optional
+
+# Marks an exhausted generator
+_END = object()
+
+
+class Deferred:
+    """A value computed when first needed, i.e. after the records before it"""
+
+    __slots__ = ("_compute", "_value", "_done")
+
+    def __init__(self, compute: Callable[[], Any]):
+        self._compute = compute
+        self._value = None
+        self._done = False
+
+    @property
+    def value(self) -> Any:
+        if not self._done:
+            self._value = self._compute()
+            self._done = True
+        return self._value
+
+
+def resolve(value: Any) -> Any:
+    """The value behind a Deferred, anything else as is"""
+    return value.value if isinstance(value, Deferred) else value
+
+
+def observe(records: Iterable[Any], callback: Callable[[Any], None]) -> Iterator:
+    """Pass each record to ``callback`` as it goes by, e.g. to add up totals"""
+    for record in records:
+        callback(record)
+        yield record
+
+
+def materialize(value: Any) -> Any:
+    """The result with its generators turned into lists and Deferred values computed, in order"""
+    value = resolve(value)
+    if isinstance(value, dict):
+        return {key: materialize(item) for key, item in value.items()}
+    if isinstance(value, Iterator):
+        return list(value)
+    return value
+
+
+class _Records(list):
+    """
+    A generator posing as a list for the JSON encoder.
+
+    JSONEncoder.iterencode (as opposed to encode) always runs the
+    pure-Python encoder, which only tests a list for emptiness and
+    iterates over it; the first record is fetched ahead for the test.
+    """
+
+    def __init__(self, records: Iterator):
+        super().__init__()
+        self._records = records
+        self._first = next(records, _END)
+
+    def __bool__(self) -> bool:
+        return self._first is not _END
+
+    def __iter__(self) -> Iterator:
+        if self._first is not _END:
+            first, self._first = self._first, _END
+            yield first
+            yield from self._records
+
+
+class _Encoder(json.JSONEncoder):
+    def __init__(self, fallback: Optional[Callable[[Any], Any]] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._fallback = fallback
+
+    def default(self, o: Any) -> Any:
+        if isinstance(o, Deferred):
+            return o.value
+        if isinstance(o, Iterator):
+            return _Records(o)
+        if self._fallback is not None:
+            return self._fallback(o)
+        return super().default(o)
+
+
+_encoder = _Encoder(indent=2, ensure_ascii=False)
+_line_encoder = _Encoder(str, ensure_ascii=False)
+
+
+def iterencode(value: Any) -> Iterator[str]:
+    """
+    JSON of ``value`` in small pieces, the same text as ``json.dumps(value,
+    indent=2, ensure_ascii=False)`` of its materialized form. Generators
+    are consumed as their records are written.
+    """
+    return _encoder.iterencode(value)
+
+
+def iterencode_line(value: Any) -> Iterator[str]:
+    """
+    One-line JSON of ``value`` in small pieces, the same text as
+    ``json.dumps(value, ensure_ascii=False, default=str)`` of its
+    materialized form, as written to NDJSON files.
+    """
+    return _line_encoder.iterencode(value)
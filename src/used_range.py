@@ -0,0 +1,74 @@
+"""
+Used-range detection for worksheets.
+
+openpyxl's ``max_row`` / ``max_column`` include cells that only carry
+formatting, so one styled cell at XFD1048576 makes a sheet look like 17
+billion cells. The used range here only counts cells with a value, an
+inline string or a formula. It is computed by streaming the worksheet XML
+straight from the zip package, without building any cell objects.
+"""
+
+import zipfile
+from pathlib import Path
+from typing import Optional, Tuple
+
+from lxml import etree
+from openpyxl.utils.cell import coordinate_from_string, column_index_from_string
+
+_S_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_ROW = f"{_S_NS}row"
+_CELL = f"{_S_NS}c"
+_CONTENT_TAGS = (f"{_S_NS}v", f"{_S_NS}is", f"{_S_NS}f")
+
+
+def _has_content(cell) -> bool:
+    for child in cell:
+        if child.tag in _CONTENT_TAGS and (child.text or len(child) or child.attrib):
+            return True
+    return False
+
+
+def scan_used_range(path: Path, part: str) -> Optional[Tuple[int, int]]:
+    """
+    (last row, last column) of the cells with content in one worksheet part,
+    both 1-based, or None when the sheet has no content.
+
+    The range always starts at A1, matching how the parse tools lay out
+    rows and columns.
+    """
+    max_row = 0
+    max_col = 0
+    row_number = 0
+    col_number = 0
+
+    with zipfile.ZipFile(path) as zf, zf.open(part) as stream:
+        for event, element in etree.iterparse(stream, events=("start", "end"), tag=(_ROW, _CELL)):
+            if element.tag == _ROW:
+                if event == "start":
+                    # Rows and cells may omit their reference; then they follow the previous one
+                    row_number = int(element.get("r") or row_number + 1)
+                    col_number = 0
+                else:
+                    element.clear()
+                    while element.getprevious() is not None:
+                        del element.getparent()[0]
+                continue
+
+            if event == "start":
+                continue
+
+            reference = element.get("r")
+            if reference:
+                letters, row = coordinate_from_string(reference)
+                col_number = column_index_from_string(letters)
+                row_number = row
+            else:
+                col_number += 1
+
+            if _has_content(element):
+                max_row = max(max_row, row_number)
+                max_col = max(max_col, col_number)
+
+    if max_row == 0:
+        return None
+    return max_row, max_col
@@ -0,0 +1,24 @@
+"""
+Preloaded by the forkserver that starts worker processes.
+
+Importing this module imports the parsing and rendering libraries, sets up
+the tool server and loads and compiles every template in TEMPLATE_DIR, once.
+Workers are forked from the forkserver afterwards and share all of it
+copy-on-write, so none of them pays for the imports or the template warm-up.
+"""
+
+import logging
+
+import docx  # noqa: F401
+import docxtpl  # noqa: F401
+import openpyxl  # noqa: F401
+import pdfplumber  # noqa: F401
+import pptx  # noqa: F401
+
+from .server import prepare_worker
+
+try:
+    prepare_worker()
+except Exception as e:
+    # Workers still start without warm templates; the forkserver must not die here
+    logging.getLogger(__name__).warning(f"Worker preload failed: {e}")
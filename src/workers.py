@@ -0,0 +1,357 @@
+"""
+Killable worker processes for tool calls.
+
+A tool call sent to the pool runs in a long-lived worker process. When the
+call passes its deadline, or the request waiting for it is cancelled, the
+worker is killed together with any processes it started and a fresh one
+takes its place on the next call, so a runaway parse cannot keep a core
+and its memory.
+
+Progress reported in the worker (``report_progress``) is sent back over
+the worker's pipe and reported again in the calling context.
+
+Parsers leave fragmented heaps behind, so after every task the worker
+collects garbage and hands free heap memory back to the OS, then reports
+its resident set size. A worker that has run ``max_tasks`` tasks or whose
+RSS is above ``max_rss_mb`` is stopped after its task and replaced.
+
+With the forkserver start method, the modules in ``preload`` are imported
+once by the forkserver, and every worker is forked from it with those
+modules (and whatever they set up) already in memory.
+"""
+
+import asyncio
+import atexit
+import ctypes
+import gc
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+from .progress import progress_reporter, report_progress
+from .scheduler import LaneScheduler
+
+logger = logging.getLogger(__name__)
+
+# Affinity keys remembered by a pool; the least recently used are forgotten
+_MAX_AFFINITY_KEYS = 1024
+
+try:
+    _malloc_trim = ctypes.CDLL("libc.so.6").malloc_trim
+except (OSError, AttributeError):
+    # Not glibc
+    _malloc_trim = None
+
+
+class WorkerTimeout(Exception):
+    """Raised when a call runs past its deadline; its worker has been killed"""
+
+
+class WorkerCrashed(Exception):
+    """Raised when a worker process exits before returning a result"""
+
+
+def trim_heap():
+    """Collect garbage and return free heap pages to the OS where glibc allows it"""
+    gc.collect()
+    if _malloc_trim is not None:
+        _malloc_trim(0)
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _worker_main(conn, parent_conn):
+    if parent_conn is not None:
+        parent_conn.close()
+    if hasattr(os, "setpgrp"):
+        # Own process group, so killing the worker also stops process pools it started
+        os.setpgrp()
+
+    def send_progress(progress, total, message):
+        conn.send(("progress", progress, total, message))
+
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+
+        func, args = task
+        try:
+            with progress_reporter(send_progress):
+                result = func(*args)
+        except Exception as e:
+            # Format the traceback first, then drop the frames so the task's data can be freed below
+            remote_traceback = traceback.format_exc()
+            message = ("error", e.with_traceback(None), remote_traceback)
+            remote_traceback = None
+        else:
+            message = ("result", result)
+        task = func = args = result = None
+        trim_heap()
+
+        try:
+            conn.send(message + (current_rss(),))
+        except Exception as e:
+            # The result or exception could not be pickled
+            conn.send(("error", RuntimeError(f"{type(e).__name__}: {e}"), traceback.format_exc(), current_rss()))
+        message = None
+
+
+class Worker:
+    """One worker process and the parent's end of its pipe"""
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, self.conn if context.get_start_method() == "fork" else None),
+            name="docxtpl-mcp-worker"
+        )
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+        self.rss: Optional[int] = None
+
+    def send(self, func: Callable, args: tuple):
+        self.tasks += 1
+        self.conn.send((func, args))
+
+    def receive(self, deadline: Optional[float]) -> Any:
+        """Wait for the result of the current task; runs in a thread"""
+        while True:
+            wait = 0.5
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    raise WorkerTimeout()
+            try:
+                if not self.conn.poll(wait):
+                    if not self.process.is_alive():
+                        raise WorkerCrashed(f"Worker process exited with code {self.process.exitcode}")
+                    continue
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                self.process.join(1)
+                raise WorkerCrashed(f"Worker process exited with code {self.process.exitcode}")
+
+            kind = message[0]
+            if kind == "progress":
+                report_progress(*message[1:])
+            elif kind == "result":
+                self.rss = message[2]
+                return message[1]
+            else:
+                error, remote_traceback, self.rss = message[1], message[2], message[3]
+                logger.debug(f"Worker task failed:\n{remote_traceback}")
+                raise error
+
+    def kill(self):
+        if self.process.is_alive():
+            try:
+                if hasattr(os, "killpg"):
+                    os.killpg(self.process.pid, signal.SIGKILL)
+                else:
+                    self.process.kill()
+            except (ProcessLookupError, PermissionError):
+                self.process.kill()
+        self.process.join(5)
+        self.conn.close()
+
+    def stop(self, timeout: float = 2):
+        """Ask an idle worker to exit, killing it if it does not"""
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        self.kill()
+
+
+class WorkerPool:
+    """
+    Runs functions in at most ``max_workers`` worker processes.
+
+    Workers start on first use and are reused between calls. Calls wait
+    for a worker in their priority lane (see LaneScheduler); ``lane_limits``
+    caps how many workers a lane may hold. Usable from any event loop,
+    including the private loops background jobs run on.
+
+    Calls with the same ``affinity`` key (e.g. the file they read) go to
+    the worker that last ran one when it is idle, so state the worker kept
+    from that call, such as a loaded document, is reused. When that worker
+    is busy the call takes any other one rather than wait.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        start_method: str = "spawn",
+        max_tasks: int = 0,
+        max_rss_mb: float = 0,
+        preload: Sequence[str] = (),
+        lane_limits: Optional[Dict[str, int]] = None
+    ):
+        self.max_workers = max(1, max_workers)
+        self.max_tasks = max_tasks
+        self.max_rss = int(max_rss_mb * 1024 * 1024)
+        self._context = multiprocessing.get_context(start_method)
+        if start_method == "forkserver" and preload:
+            self._context.set_forkserver_preload(list(preload))
+        self.lanes = LaneScheduler(self.max_workers, lane_limits)
+        self._lock = threading.Lock()
+        self._idle: List[Worker] = []
+        self._busy: List[Worker] = []
+        # Affinity key -> worker that last ran a call with it
+        self._homes: "OrderedDict[Hashable, Worker]" = OrderedDict()
+        self._registered = False
+        self.started = 0
+        self.killed = 0
+        self.recycled = 0
+        self.affinity_hits = 0
+
+    def _checkout(self, affinity: Hashable = None) -> Worker:
+        with self._lock:
+            home = self._homes.get(affinity) if affinity is not None else None
+            if home is not None and home in self._idle:
+                # Last one first, so the home worker is the next one popped
+                self._idle.remove(home)
+                self._idle.append(home)
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.process.is_alive():
+                    break
+                worker.kill()
+            else:
+                if not self._registered:
+                    atexit.register(self.shutdown)
+                    self._registered = True
+                worker = Worker(self._context)
+                self.started += 1
+            self._busy.append(worker)
+            if affinity is not None:
+                if worker is home:
+                    self.affinity_hits += 1
+                self._homes[affinity] = worker
+                self._homes.move_to_end(affinity)
+                while len(self._homes) > _MAX_AFFINITY_KEYS:
+                    self._homes.popitem(last=False)
+            return worker
+
+    def _worn_out(self, worker: Worker) -> bool:
+        if self.max_tasks and worker.tasks >= self.max_tasks:
+            return True
+        return bool(self.max_rss and worker.rss and worker.rss > self.max_rss)
+
+    def _checkin(self, worker: Worker, keep: bool) -> str:
+        """Return a worker after a call: "idle", or "recycle" / "kill" when it has to go"""
+        with self._lock:
+            self._busy.remove(worker)
+            if keep and not self._worn_out(worker):
+                self._idle.append(worker)
+                return "idle"
+            if keep:
+                self.recycled += 1
+                return "recycle"
+            self.killed += 1
+            return "kill"
+
+    async def run(
+        self,
+        func: Callable,
+        *args,
+        timeout: Optional[float] = None,
+        lane: str = "interactive",
+        session: Hashable = None,
+        affinity: Hashable = None
+    ) -> Any:
+        """
+        Call ``func(*args)`` in a worker process and return its result.
+
+        ``func`` and its arguments must be picklable. The call waits for a
+        worker in ``lane``, taking turns with other sessions, and prefers
+        the worker that last ran a call with the same ``affinity``. Raises
+        WorkerTimeout when the call takes longer than ``timeout`` seconds
+        (not counting the wait); on timeout and on cancellation the worker
+        is killed.
+        """
+        await self.lanes.acquire(lane, session)
+        try:
+            worker = self._checkout(affinity)
+            deadline = time.monotonic() + timeout if timeout else None
+            keep = False
+            try:
+                worker.send(func, args)
+                result = await asyncio.to_thread(worker.receive, deadline)
+                keep = True
+            except (WorkerTimeout, WorkerCrashed):
+                raise
+            except Exception:
+                # The task raised in the worker; the worker itself is fine
+                keep = worker.process.is_alive()
+                raise
+            finally:
+                state = self._checkin(worker, keep)
+                if state == "recycle":
+                    # Worn out: let it exit on its own, without holding up the caller's loop
+                    logger.info(
+                        f"Recycling worker {worker.process.pid} after {worker.tasks} tasks "
+                        f"(RSS {(worker.rss or 0) / (1024 * 1024):.0f} MB)"
+                    )
+                    threading.Thread(target=worker.stop, daemon=True).start()
+                elif state == "kill":
+                    # Joining the killed process can take a while; keep the loop serving meanwhile
+                    await asyncio.to_thread(worker.kill)
+            return result
+        finally:
+            self.lanes.release(lane)
+
+    def warm_up(self):
+        """
+        Start the forkserver now, so it has preloaded by the first call.
+
+        The forkserver is started on first use otherwise. Does nothing for
+        other start methods.
+        """
+        if self._context.get_start_method() == "forkserver":
+            from multiprocessing import forkserver
+            forkserver.ensure_running()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "idle": len(self._idle),
+                "busy": len(self._busy),
+                "started": self.started,
+                "killed": self.killed,
+                "recycled": self.recycled,
+                "affinity_hits": self.affinity_hits,
+                "lanes": self.lanes.stats(),
+                "rss_mb": [
+                    round(worker.rss / (1024 * 1024), 1)
+                    for worker in self._idle + self._busy if worker.rss
+                ],
+            }
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._idle = self._idle + self._busy, []
+            self._busy = []
+        for worker in workers:
+            worker.stop()
@@ -38,4 +38,4 @@ echo "================================"
 echo ""
 
 # 运行服务器
-python -m src.server
\ No newline at end of file
+python -m src
\ No newline at end of file
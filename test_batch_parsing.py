@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+"""
+测试批量文档解析功能
+
+此脚本使用语料生成器创建一组测试文档,然后测试 parse_documents_batch
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# 添加 src 目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from create_corpus import build_corpus
+import src.batch as batch
+from src.batch import parse_file
+from src.extractors import parse_pdf
+from src.loader import DocumentLoader
+from src.server import DocxTemplateServer
+
+
+def create_test_corpus():
+    """创建小规模测试语料"""
+    corpus_dir = Path("output") / "batch_corpus"
+    build_corpus(
+        corpus_dir,
+        seed=1,
+        count=2,
+        pdf_pages=3,
+        xlsx_rows=20,
+        pptx_slides=3,
+        docx_tables=2,
+    )
+    return corpus_dir
+
+
+def read_records(output_file):
+    """读取 NDJSON 结果文件"""
+    with open(output_file, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+async def test_batch_directory(server, corpus_dir):
+    """测试按目录批量解析"""
+    print("\n" + "="*60)
+    print("测试 1: 按目录批量解析")
+    print("="*60)
+
+    result = await server.parse_documents_batch(
+        directory=str(corpus_dir),
+        output_name="test_batch_directory",
+        max_workers=2
+    )
+    print(result[0].text)
+
+    records = read_records(Path("output") / "test_batch_directory.ndjson")
+    ok = [r for r in records if r["status"] == "ok"]
+    print(f"   - 记录数: {len(records)}, 成功: {len(ok)}")
+    return len(records) == 8 and len(ok) == 8
+
+
+async def test_batch_glob_and_paths(server, corpus_dir):
+    """测试 glob 模式和显式路径 (包含不存在的文件)"""
+    print("\n" + "="*60)
+    print("测试 2: glob 模式 + 显式路径")
+    print("="*60)
+
+    result = await server.parse_documents_batch(
+        paths=["/tmp/nonexistent_batch_file.pdf"],
+        pattern=str(corpus_dir / "*.pdf"),
+        output_name="test_batch_glob"
+    )
+    print(result[0].text)
+
+    records = read_records(Path("output") / "test_batch_glob.ndjson")
+    failed = [r for r in records if r["status"] == "error"]
+    pages = [len(r["result"]["pages"]) for r in records if r["status"] == "ok"]
+    print(f"   - 记录数: {len(records)}, 失败: {len(failed)}, 每个 PDF 页数: {pages}")
+    return len(records) == 3 and len(failed) == 1 and pages == [3, 3]
+
+
+async def test_batch_empty(server):
+    """测试没有输入时的错误提示"""
+    print("\n" + "="*60)
+    print("测试 3: 缺少输入参数")
+    print("="*60)
+
+    result = await server.parse_documents_batch()
+    print(result[0].text)
+    return "错误" in result[0].text
+
+
+async def test_spooled_records(corpus_dir):
+    """测试工作进程直接写出结果行,只把状态返回给父进程"""
+    print("\n" + "="*60)
+    print("测试 4: 结果由工作进程直接写出")
+    print("="*60)
+
+    spool_dir = Path("output") / "batch_spool_test"
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    pdf_path = sorted(corpus_dir.glob("*.pdf"))[0]
+    record = parse_file(str(pdf_path), {}, str(spool_dir / "ok.ndjson"))
+    line = read_records(spool_dir / "ok.ndjson")[0]
+    with DocumentLoader().open(pdf_path) as doc:
+        expected = parse_pdf(doc)
+
+    # 解析到一半失败时,已写出的部分被错误记录替换
+    def broken_stream(doc, file_type, options):
+        def pages():
+            yield {"page_number": 1, "text": "内容 " * 10000}
+            raise ValueError("第 2 页损坏")
+        return {"pages": pages()}
+
+    original = batch._stream
+    batch._stream = broken_stream
+    try:
+        broken = parse_file(str(pdf_path), {}, str(spool_dir / "broken.ndjson"))
+    finally:
+        batch._stream = original
+    broken_lines = read_records(spool_dir / "broken.ndjson")
+
+    leftovers = [p.name for p in Path("output").glob(".test_batch_*")]
+    print(f"   - 返回的记录: {sorted(record)}")
+    print(f"   - 解析中途失败: {broken['error']}")
+    print(f"   - 残留的临时目录: {leftovers}")
+    return (
+        "result" not in record
+        and line["result"] == expected
+        and line["elapsed_ms"] == record["elapsed_ms"]
+        and broken["status"] == "error"
+        and broken_lines == [broken]
+        and not leftovers
+    )
+
+
+async def main():
+    """主测试函数"""
+    print("🧪 批量文档解析功能测试")
+    print("="*60)
+
+    corpus_dir = create_test_corpus()
+    server = DocxTemplateServer()
+
+    results = {
+        "按目录批量解析": await test_batch_directory(server, corpus_dir),
+        "glob 模式 + 显式路径": await test_batch_glob_and_paths(server, corpus_dir),
+        "缺少输入参数": await test_batch_empty(server),
+        "结果由工作进程直接写出": await test_spooled_records(corpus_dir),
+    }
+
+    print("\n" + "="*60)
+    print("📊 测试结果摘要")
+    print("="*60)
+    for test_name, passed in results.items():
+        print(f"{test_name}: {'✅ 通过' if passed else '❌ 失败'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
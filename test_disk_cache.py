@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+"""
+测试磁盘缓存: 分部件解析结果压缩后存入磁盘,新的工作进程可以直接加载,
+解析器版本变化时旧结果失效,超过大小上限时删除最久未使用的文件
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+# 添加 src 目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from create_corpus import build_corpus
+from src.disk_cache import DiskCache
+from src.extractors import RESULT_SCHEMA, parse_excel, parse_pptx
+from src.loader import DocumentLoader
+from src.parts import PartCache
+
+CACHE_DIR = Path("output") / "disk_cache_test"
+
+
+def create_test_corpus():
+    """创建测试用的 PPTX 和 XLSX"""
+    corpus_dir = Path("output") / "disk_cache_corpus"
+    build_corpus(corpus_dir, seed=11, kinds=("pptx", "xlsx"), pptx_slides=60, xlsx_rows=2000)
+    return next(corpus_dir.glob("*.pptx")), next(corpus_dir.glob("*.xlsx"))
+
+
+def parse_with(cache, path, parse):
+    """用新的加载器解析,模拟新启动的工作进程"""
+    loader = DocumentLoader(part_cache=cache)
+    start = time.perf_counter()
+    with loader.open(path) as doc:
+        result = parse(doc)
+    return result, time.perf_counter() - start
+
+
+def test_cold_reload(files):
+    """测试新进程从磁盘加载解析结果,结果一致且快于重新解析"""
+    print("\n" + "="*60)
+    print("测试 1: 从磁盘重新加载")
+    print("="*60)
+
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+    passed = True
+    for path, parse in zip(files, (parse_pptx, parse_excel)):
+        first, parse_seconds = parse_with(PartCache(disk=DiskCache(CACHE_DIR, 64 * 1024 * 1024, RESULT_SCHEMA)), path, parse)
+        disk = DiskCache(CACHE_DIR, 64 * 1024 * 1024, RESULT_SCHEMA)
+        reloaded, reload_seconds = parse_with(PartCache(disk=disk), path, parse)
+
+        same = json.dumps(first, ensure_ascii=False, default=str) == json.dumps(reloaded, ensure_ascii=False, default=str)
+        print(f"   - {path.suffix}: 解析 {parse_seconds * 1000:.0f}ms, 从磁盘加载 {reload_seconds * 1000:.0f}ms, "
+              f"命中 {disk.hits}/{disk.hits + disk.misses}, 结果{'一致' if same else '不一致'}")
+        passed = passed and same and disk.misses == 0 and reload_seconds < parse_seconds / 2
+
+    json_size = sum(
+        len(json.dumps(parse_with(None, path, parse)[0], ensure_ascii=False, default=str).encode("utf-8"))
+        for path, parse in zip(files, (parse_pptx, parse_excel))
+    )
+    disk_size = DiskCache(CACHE_DIR, 0).size
+    print(f"   - JSON: {json_size / 1024:.0f} KB, 磁盘缓存: {disk_size / 1024:.0f} KB")
+    return passed and disk_size < json_size / 2
+
+
+def test_schema_change(files):
+    """测试解析器版本变化后旧的缓存文件失效并被删除"""
+    print("\n" + "="*60)
+    print("测试 2: 解析器版本变化")
+    print("="*60)
+
+    before = DiskCache(CACHE_DIR, 0).size
+    disk = DiskCache(CACHE_DIR, 64 * 1024 * 1024, RESULT_SCHEMA + 1)
+    parse_with(PartCache(disk=disk), files[0], parse_pptx)
+    stale = DiskCache(CACHE_DIR, 64 * 1024 * 1024, RESULT_SCHEMA)
+    parse_with(PartCache(disk=stale), files[0], parse_pptx)
+
+    print(f"   - 新版本命中 {disk.hits}, 未命中 {disk.misses}")
+    print(f"   - 切换回旧版本后命中 {stale.hits}, 未命中 {stale.misses}")
+    print(f"   - 缓存大小: {before / 1024:.0f} KB -> {DiskCache(CACHE_DIR, 0).size / 1024:.0f} KB")
+    return disk.hits == 0 and disk.misses > 0 and stale.hits == 0
+
+
+def test_corrupt_file():
+    """测试损坏或截断的缓存文件视为未命中"""
+    print("\n" + "="*60)
+    print("测试 3: 损坏的缓存文件")
+    print("="*60)
+
+    disk = DiskCache(CACHE_DIR / "corrupt", 1024 * 1024)
+    disk.put(("slide", 1), {"text": os.urandom(4096).hex()})
+    path = next((CACHE_DIR / "corrupt").glob("*/*.bin"))
+    data = path.read_bytes()
+    path.write_bytes(data[:len(data) // 2])
+    truncated = disk.get(("slide", 1))
+    path.write_bytes(b"")
+    disk.put(("slide", 2), {"text": "其他"})
+    empty = disk.get(("slide", 1))
+    other = disk.get(("slide", 2))
+
+    print(f"   - 截断: {truncated}, 空文件: {empty}, 其他条目: {other}")
+    return truncated is None and empty is None and other == {"text": "其他"}
+
+
+def test_size_eviction():
+    """测试超过大小上限时删除最久未使用的文件"""
+    print("\n" + "="*60)
+    print("测试 4: 按大小淘汰")
+    print("="*60)
+
+    limit = 256 * 1024
+    disk = DiskCache(CACHE_DIR / "eviction", limit)
+    disk.put("recent", list(range(2000)))
+    for i in range(200):
+        disk.put(("sheet", i), os.urandom(4096).hex())
+        # 最近使用过的条目不会被淘汰
+        disk.get("recent")
+
+    print(f"   - 写入约 {200 * 4 * 2} KB, 缓存大小: {disk.size / 1024:.0f} KB (上限 {limit / 1024:.0f} KB)")
+    return disk.size <= limit and disk.get("recent") == list(range(2000)) and disk.get(("sheet", 0)) is None
+
+
+def test_private_directory():
+    """测试缓存目录只允许当前用户写入,其他用户可写的目录和文件不会被读取"""
+    print("\n" + "="*60)
+    print("测试 5: 缓存目录权限")
+    print("="*60)
+
+    private_dir = CACHE_DIR / "private"
+    disk = DiskCache(private_dir, 1024 * 1024)
+    disk.put("slide", {"text": "内容"})
+    mode = oct(private_dir.stat().st_mode & 0o777)
+
+    # 其他用户可写的缓存文件视为未命中并被删除
+    path = next(private_dir.glob("*/*.bin"))
+    path.chmod(0o666)
+    writable_file = DiskCache(private_dir, 1024 * 1024).get("slide")
+    removed = not path.exists()
+
+    # 其他用户可写的目录: 不读取也不写入
+    DiskCache(private_dir, 1024 * 1024).put("slide", {"text": "内容"})
+    shared_dir = CACHE_DIR / "shared"
+    shutil.copytree(private_dir, shared_dir)
+    shared_dir.chmod(0o777)
+    shared = DiskCache(shared_dir, 1024 * 1024)
+    shared_value = shared.get("slide")
+    shared.put("other", {"text": "其他"})
+
+    print(f"   - 新建目录权限: {mode}")
+    print(f"   - 其他用户可写的文件: {writable_file}, 已删除: {removed}")
+    print(f"   - 其他用户可写的目录: 读取 {shared_value}, 写入 {len(list(shared_dir.glob('*/*.bin')))} 个文件")
+    return (
+        mode == "0o700"
+        and writable_file is None
+        and removed
+        and shared_value is None
+        and len(list(shared_dir.glob("*/*.bin"))) == 1
+    )
+
+
+async def main():
+    """主测试函数"""
+    print("🧪 磁盘缓存测试")
+    print("="*60)
+
+    files = create_test_corpus()
+
+    results = {
+        "从磁盘重新加载": test_cold_reload(files),
+        "解析器版本变化": test_schema_change(files),
+        "损坏的缓存文件": test_corrupt_file(),
+        "按大小淘汰": test_size_eviction(),
+        "缓存目录权限": test_private_directory(),
+    }
+
+    print("\n" + "="*60)
+    print("📊 测试结果摘要")
+    print("="*60)
+    for test_name, passed in results.items():
+        print(f"{test_name}: {'✅ 通过' if passed else '❌ 失败'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""
+测试 Excel 列式输出、类型推断和 CSV / Arrow 导出
+"""
+
+import asyncio
+import csv
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# 添加 src 目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from openpyxl import Workbook
+
+from src.server import DocxTemplateServer, generated_documents
+
+
+def create_test_workbook():
+    """创建包含整数、小数、日期、文本和混合类型列的工作簿"""
+    output_dir = Path("output")
+    output_dir.mkdir(exist_ok=True)
+    path = output_dir / "test_excel_columnar.xlsx"
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "订单"
+    ws.append(["编号", "金额", "日期", "客户", "备注"])
+    ws.append([1, 99.5, datetime(2024, 1, 5), "甲公司", 3])
+    ws.append([2, 120, datetime(2024, 2, 9), "乙公司", "加急"])
+    ws.append([3, 15.25, datetime(2024, 3, 1), "丙公司", None])
+    wb.save(path)
+    return str(path)
+
+
+def parse_json(text):
+    return json.loads(text.split("```json\n")[1].split("\n```")[0])
+
+
+async def test_columnar_layout(server, path):
+    """测试按列返回并推断类型"""
+    print("\n" + "="*60)
+    print("测试 1: 列式输出 + 类型推断")
+    print("="*60)
+
+    result = await server.parse_excel_document(path, header_row=1, layout="columnar")
+    sheet = parse_json(result[0].text)["sheets"][0]
+    dtypes = {field["name"]: field["dtype"] for field in sheet["fields"]}
+    print(f"   - 列类型: {dtypes}")
+    print(f"   - 金额: {sheet['values']['金额']}")
+    return (
+        dtypes == {"编号": "int64", "金额": "float64", "日期": "datetime", "客户": "string", "备注": "mixed"}
+        and sheet["values"]["金额"] == [99.5, 120.0, 15.25]
+        and sheet["values"]["日期"][0] == "2024-01-05T00:00:00"
+        and sheet["values"]["备注"] == ["3", "加急", None]
+    )
+
+
+async def test_csv_export(server, path):
+    """测试导出 CSV 并注册为生成文档"""
+    print("\n" + "="*60)
+    print("测试 2: CSV 导出")
+    print("="*60)
+
+    result = await server.parse_excel_document(path, header_row=1, columns=["编号", "客户"], export_format="csv")
+    sheet = parse_json(result[0].text)["sheets"][0]
+    export = sheet["export"]
+    with open(export["path"], encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f))
+    print(f"   - 文件: {export['filename']}")
+    print(f"   - 内容: {rows}")
+    return (
+        "values" not in sheet
+        and rows == [["编号", "客户"], ["1", "甲公司"], ["2", "乙公司"], ["3", "丙公司"]]
+        and generated_documents[export["document_id"]]["mime_type"] == "text/csv"
+    )
+
+
+async def test_arrow_export(server, path):
+    """测试导出 Arrow IPC (需要 pyarrow)"""
+    print("\n" + "="*60)
+    print("测试 3: Arrow 导出")
+    print("="*60)
+
+    try:
+        import pyarrow.ipc
+    except ImportError:
+        result = await server.parse_excel_document(path, header_row=1, export_format="arrow")
+        print("   - 未安装 pyarrow, 检查错误提示")
+        return "pyarrow" in result[0].text and "错误" in result[0].text
+
+    result = await server.parse_excel_document(path, header_row=1, export_format="arrow")
+    export = parse_json(result[0].text)["sheets"][0]["export"]
+    table = pyarrow.ipc.open_file(export["path"]).read_all()
+    print(f"   - 结构: {table.schema}")
+    return table.num_rows == 3 and str(table.schema.field("金额").type) == "double"
+
+
+async def main():
+    """主测试函数"""
+    print("🧪 Excel 列式输出测试")
+    print("="*60)
+
+    path = create_test_workbook()
+    server = DocxTemplateServer()
+
+    results = {
+        "列式输出 + 类型推断": await test_columnar_layout(server, path),
+        "CSV 导出": await test_csv_export(server, path),
+        "Arrow 导出": await test_arrow_export(server, path),
+    }
+
+    print("\n" + "="*60)
+    print("📊 测试结果摘要")
+    print("="*60)
+    for test_name, passed in results.items():
+        print(f"{test_name}: {'✅ 通过' if passed else '❌ 失败'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
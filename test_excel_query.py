@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""
+测试 Excel 列投影、表头记录、行过滤、空行空列裁剪和已用区域检测
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加 src 目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from openpyxl import Workbook
+from openpyxl.styles import Font
+
+from src.server import DocxTemplateServer
+
+
+def create_test_workbook():
+    """创建包含表头、数据和远处格式化空单元格的工作簿"""
+    output_dir = Path("output")
+    output_dir.mkdir(exist_ok=True)
+    path = output_dir / "test_excel_query.xlsx"
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "销售"
+    ws.append(["地区", "产品", "数量", "单价", "备注"])
+    rows = [
+        ["华东", "笔记本", 12, 5999, None],
+        ["华北", "显示器", 30, 1299, "促销"],
+        ["华东", "键盘", 85, 199, None],
+        ["华南", "笔记本", 7, 6299, None],
+    ]
+    for row in rows:
+        ws.append(row)
+    ws["D6"] = "=AVERAGE(D2:D5)"
+    # 只有格式、没有值的远处单元格会撑大 max_row / max_column
+    ws["J40"].font = Font(bold=True)
+    wb.save(path)
+    return str(path)
+
+
+async def test_projection_and_records(server, path):
+    """测试按表头名称投影并返回记录"""
+    print("\n" + "="*60)
+    print("测试 1: 列投影 + 表头记录 + 行过滤")
+    print("="*60)
+
+    result = await server.parse_excel_document(
+        path,
+        columns=["地区", "C:D"],
+        header_row=1,
+        where=[{"column": "地区", "op": "eq", "value": "华东"}, {"column": "数量", "op": "gt", "value": 10}]
+    )
+    text = result[0].text
+    print(text[text.index('"sheets"'):][:600])
+    return '"地区": "华东"' in text and '"数量": 85' in text and "华北" not in text.split('"sheets"')[1]
+
+
+async def test_trim_empty(server, path):
+    """测试裁剪末尾空行空列"""
+    print("\n" + "="*60)
+    print("测试 2: 裁剪末尾空行空列")
+    print("="*60)
+
+    full = await server.parse_excel_document(path)
+    trimmed = await server.parse_excel_document(path, trim_empty=True)
+    full_cells = full[0].text.split("总单元格数: ")[1].split("\n")[0]
+    trimmed_cells = trimmed[0].text.split("总单元格数: ")[1].split("\n")[0]
+    print(f"   - 总单元格数: {full_cells} -> {trimmed_cells}")
+    return trimmed_cells == "30"
+
+
+async def test_used_range(server):
+    """测试远处只有格式的单元格不会撑大单元格统计"""
+    print("\n" + "="*60)
+    print("测试 4: 已用区域检测")
+    print("="*60)
+
+    path = Path("output") / "test_used_range.xlsx"
+    wb = Workbook()
+    ws = wb.active
+    for row in range(1, 6):
+        ws.append([row, f"item {row}", row * 1.5])
+    ws["XFD1048576"].font = Font(bold=True)
+    wb.save(path)
+
+    metadata = await server.get_document_metadata(str(path))
+    parsed = await server.parse_excel_document(str(path))
+    metadata_cells = metadata[0].text.split('"total_cells": ')[1].split("\n")[0].strip()
+    parsed_cells = parsed[0].text.split("总单元格数: ")[1].split("\n")[0]
+    print(f"   - 元数据单元格数: {metadata_cells}, 解析单元格数: {parsed_cells}")
+    return metadata_cells == "15" and parsed_cells == "15"
+
+
+async def test_invalid_arguments(server, path):
+    """测试无效列名和运算符"""
+    print("\n" + "="*60)
+    print("测试 3: 无效参数")
+    print("="*60)
+
+    unknown_column = await server.parse_excel_document(path, columns=["价格"], header_row=1)
+    unknown_op = await server.parse_excel_document(path, where=[{"column": "A", "op": "like", "value": "华"}])
+    print(unknown_column[0].text)
+    print(unknown_op[0].text)
+    return "错误" in unknown_column[0].text and "错误" in unknown_op[0].text
+
+
+async def main():
+    """主测试函数"""
+    print("🧪 Excel 查询功能测试")
+    print("="*60)
+
+    path = create_test_workbook()
+    server = DocxTemplateServer()
+
+    results = {
+        "列投影 + 表头记录 + 行过滤": await test_projection_and_records(server, path),
+        "裁剪末尾空行空列": await test_trim_empty(server, path),
+        "已用区域检测": await test_used_range(server),
+        "无效参数": await test_invalid_arguments(server, path),
+    }
+
+    print("\n" + "="*60)
+    print("📊 测试结果摘要")
+    print("="*60)
+    for test_name, passed in results.items():
+        print(f"{test_name}: {'✅ 通过' if passed else '❌ 失败'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+"""
+测试文件指纹: stat 指纹识别文件替换,内容哈希按版本缓存,模板修改检测
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+# 添加 src 目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+import src.fingerprint as fingerprint_module
+from src.fingerprint import FileFingerprint, FingerprintService
+from src.loader import DocumentLoader
+from src.mail_merge import prepared_template
+
+TEST_DIR = Path("output") / "fingerprint_test"
+
+
+def replace_keeping_stat(path, data):
+    """写入新内容后原子替换,保持相同的大小和修改时间"""
+    stat = path.stat()
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.utime(tmp, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(tmp, path)
+
+
+def count_reads():
+    """统计实际读取文件计算哈希的次数"""
+    reads = []
+    original = fingerprint_module._hash_file
+
+    def counting(path, size):
+        reads.append(path)
+        return original(path, size)
+
+    fingerprint_module._hash_file = counting
+    return reads, original
+
+
+def test_replaced_file():
+    """测试大小和修改时间相同的原子替换也会改变指纹"""
+    print("\n" + "="*60)
+    print("测试 1: 识别原子替换")
+    print("="*60)
+
+    path = TEST_DIR / "data.bin"
+    path.write_bytes(b"a" * 4096)
+    before = FileFingerprint.of(path)
+    replace_keeping_stat(path, b"b" * 4096)
+    after = FileFingerprint.of(path)
+
+    print(f"   - 替换前: {before}")
+    print(f"   - 替换后: {after}")
+    return before.size == after.size and before.mtime_ns == after.mtime_ns and before != after
+
+
+def test_memoized_hash():
+    """测试内容哈希每个版本只读取一次,touch 后内容哈希不变"""
+    print("\n" + "="*60)
+    print("测试 2: 内容哈希缓存")
+    print("="*60)
+
+    service = FingerprintService()
+    path = TEST_DIR / "large.bin"
+    path.write_bytes(os.urandom(1024 * 1024) * 50)
+
+    reads, original = count_reads()
+    try:
+        start = time.perf_counter()
+        first = service.content_hash(path)
+        first_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        second = service.content_hash(path)
+        second_seconds = time.perf_counter() - start
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+        touched = service.content_hash(path)
+        with open(path, "r+b") as f:
+            f.write(b"changed")
+        modified = service.content_hash(path)
+    finally:
+        fingerprint_module._hash_file = original
+
+    start = time.perf_counter()
+    hashlib.sha256(path.read_bytes()).hexdigest()
+    sha_seconds = time.perf_counter() - start
+
+    print(f"   - 首次: {first_seconds * 1000:.1f}ms ({first.split(':')[0]}), 缓存命中: {second_seconds * 1000:.3f}ms")
+    print(f"   - SHA-256 对比: {sha_seconds * 1000:.1f}ms")
+    print(f"   - 读取次数: {len(reads)}")
+    return (
+        first == second == touched
+        and modified != first
+        and len(reads) == 3
+        and second_seconds < first_seconds / 10
+    )
+
+
+def test_loader_reload():
+    """测试文档加载器在文件被替换后重新加载"""
+    print("\n" + "="*60)
+    print("测试 3: 加载器识别替换")
+    print("="*60)
+
+    path = TEST_DIR / "letter.docx"
+    shutil.copy("templates/letter.docx", path)
+    loader = DocumentLoader()
+    with loader.open(path) as first:
+        pass
+    with loader.open(path) as same:
+        pass
+    replace_keeping_stat(path, path.read_bytes())
+    with loader.open(path) as replaced:
+        pass
+
+    print(f"   - 同一文件复用: {first is same}, 替换后重新加载: {replaced is not first}")
+    return first is same and replaced is not first
+
+
+def test_template_changes():
+    """测试模板 touch 后复用已加载的模板,内容修改后重新加载"""
+    print("\n" + "="*60)
+    print("测试 4: 模板修改检测")
+    print("="*60)
+
+    path = TEST_DIR / "template.docx"
+    shutil.copy("templates/letter.docx", path)
+    with prepared_template(path) as first:
+        pass
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+    with prepared_template(path) as touched:
+        pass
+    shutil.copy("templates/invoice.docx", path)
+    with prepared_template(path) as edited:
+        pass
+
+    print(f"   - touch 后复用: {touched is first}, 修改后重新加载: {edited is not first}")
+    return touched is first and edited is not first
+
+
+async def main():
+    """主测试函数"""
+    print("🧪 文件指纹测试")
+    print("="*60)
+
+    TEST_DIR.mkdir(parents=True, exist_ok=True)
+
+    results = {
+        "识别原子替换": test_replaced_file(),
+        "内容哈希缓存": test_memoized_hash(),
+        "加载器识别替换": test_loader_reload(),
+        "模板修改检测": test_template_changes(),
+    }
+
+    print("\n" + "="*60)
+    print("📊 测试结果摘要")
+    print("="*60)
+    for test_name, passed in results.items():
+        print(f"{test_name}: {'✅ 通过' if passed else '❌ 失败'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+"""
+测试 Excel 公式依赖图: 引用单元格、依赖公式、跨表引用、定义名称和整列区域
+"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+# 添加 src 目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from openpyxl import Workbook
+from openpyxl.workbook.defined_name import DefinedName
+
+from src.server import DocxTemplateServer
+
+
+def create_test_workbook():
+    """创建包含跨表引用、定义名称和整列求和的财务模型"""
+    output_dir = Path("output")
+    output_dir.mkdir(exist_ok=True)
+    path = output_dir / "test_formula_graph.xlsx"
+
+    wb = Workbook()
+    inputs = wb.active
+    inputs.title = "输入"
+    inputs["A1"] = "税率"
+    inputs["B1"] = 0.13
+    wb.defined_names["TaxRate"] = DefinedName("TaxRate", attr_text="'输入'!$B$1")
+
+    model = wb.create_sheet("模型")
+    for row in range(1, 6):
+        model[f"A{row}"] = row * 100
+        model[f"B{row}"] = f"=A{row}*(1+TaxRate)"
+    model["C1"] = "=SUM(B1:B5)"
+    model["C2"] = "=SUM(A:A)"
+    model["C3"] = "=C1-C2"
+
+    summary = wb.create_sheet("汇总")
+    summary["A1"] = "='模型'!C3*2"
+    wb.save(path)
+    return str(path)
+
+
+def parse_json(text):
+    return json.loads(text.split("```json\n")[1].split("\n```")[0])
+
+
+def refs(entries):
+    return {entry["ref"] for entry in entries}
+
+
+async def test_direct_precedents(server, path):
+    """测试直接引用,定义名称解析为单元格"""
+    print("\n" + "="*60)
+    print("测试 1: 直接引用 (precedents)")
+    print("="*60)
+
+    result = parse_json((await server.query_formula_dependencies(path, "B2", "模型", "precedents"))[0].text)
+    print(f"   - {result['cell']} {result['formula']}: {refs(result['precedents'])}")
+    return refs(result["precedents"]) == {"模型!A2", "输入!B1"}
+
+
+async def test_dependents(server, path):
+    """测试依赖公式,包括区域和整列引用"""
+    print("\n" + "="*60)
+    print("测试 2: 依赖公式 (dependents)")
+    print("="*60)
+
+    direct = parse_json((await server.query_formula_dependencies(path, "模型!A3", direction="dependents"))[0].text)
+    chain = parse_json((await server.query_formula_dependencies(path, "输入!B1", direction="dependents", depth=0))[0].text)
+    print(f"   - 模型!A3 的直接依赖: {refs(direct['dependents'])}")
+    print(f"   - 输入!B1 的全部依赖: {sorted(refs(chain['dependents']))}")
+    return (
+        refs(direct["dependents"]) == {"模型!B3", "模型!C2"}
+        and {"模型!B1", "模型!B5", "模型!C1", "模型!C3", "汇总!A1"} <= refs(chain["dependents"])
+    )
+
+
+async def test_transitive_precedents(server, path):
+    """测试跨表多层引用"""
+    print("\n" + "="*60)
+    print("测试 3: 多层跨表引用")
+    print("="*60)
+
+    result = parse_json((await server.query_formula_dependencies(path, "汇总!A1", direction="precedents", depth=0))[0].text)
+    found = refs(result["precedents"])
+    print(f"   - 汇总!A1 的全部引用: {sorted(found)}")
+    return {"模型!C3", "模型!C1", "模型!C2", "模型!B1:B5", "模型!A:A", "输入!B1"} <= found
+
+
+async def test_large_model(server):
+    """测试大量公式时的查询速度"""
+    print("\n" + "="*60)
+    print("测试 4: 大量公式")
+    print("="*60)
+
+    path = Path("output") / "test_formula_graph_large.xlsx"
+    wb = Workbook()
+    ws = wb.active
+    rows = 20000
+    for row in range(1, rows + 1):
+        ws.append([row, f"=A{row}*2", f"=B{row}+C{row - 1}" if row > 1 else "=B1"])
+    wb.save(path)
+
+    start = time.time()
+    first = await server.query_formula_dependencies(str(path), "A10", direction="dependents")
+    build_time = time.time() - start
+
+    start = time.time()
+    second = await server.query_formula_dependencies(str(path), "C19999", direction="both")
+    lookup_time = time.time() - start
+
+    result = parse_json(second[0].text)
+    print(f"   - 建立依赖图: {build_time:.2f}s, 再次查询: {lookup_time * 1000:.1f}ms")
+    return (
+        refs(parse_json(first[0].text)["dependents"]) == {"Sheet!B10"}
+        and refs(result["precedents"]) == {"Sheet!B19999", "Sheet!C19998"}
+        and refs(result["dependents"]) == {"Sheet!C20000"}
+        and lookup_time < build_time
+    )
+
+
+async def test_invalid_arguments(server, path):
+    """测试无效单元格和方向"""
+    print("\n" + "="*60)
+    print("测试 5: 无效参数")
+    print("="*60)
+
+    bad_cell = await server.query_formula_dependencies(path, "不存在!A1")
+    bad_direction = await server.query_formula_dependencies(path, "A1", direction="up")
+    print(bad_cell[0].text.splitlines()[0])
+    print(bad_direction[0].text)
+    return "错误" in bad_cell[0].text and "错误" in bad_direction[0].text
+
+
+async def main():
+    """主测试函数"""
+    print("🧪 公式依赖图测试")
+    print("="*60)
+
+    path = create_test_workbook()
+    server = DocxTemplateServer()
+
+    results = {
+        "直接引用": await test_direct_precedents(server, path),
+        "依赖公式": await test_dependents(server, path),
+        "多层跨表引用": await test_transitive_precedents(server, path),
+        "大量公式": await test_large_model(server),
+        "无效参数": await test_invalid_arguments(server, path),
+    }
+
+    print("\n" + "="*60)
+    print("📊 测试结果摘要")
+    print("="*60)
+    for test_name, passed in results.items():
+        print(f"{test_name}: {'✅ 通过' if passed else '❌ 失败'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
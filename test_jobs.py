@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+"""
+测试后台任务: 提交、查询进度、取回结果、取消以及任务存储的上限和过期
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# 添加 src 目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.jobs import JobManager, JobStoreFull
+from src.progress import ProgressNotifier
+from src.server import DocxTemplateServer, job_manager
+
+
+def letter_contexts(count):
+    """count 封信的数据"""
+    return [
+        {
+            "sender_name": "李四",
+            "letter_date": "2024-03-01",
+            "recipient_name": f"客户{i:04d}",
+            "salutation": "王总",
+            "subject": "关于合作提案的函",
+            "body_paragraphs": ["期待您的回复。"],
+            "closing": "此致敬礼",
+        }
+        for i in range(count)
+    ]
+
+
+def job_id_of(result):
+    return result[0].text.split("**Job ID**: ")[1].split("\n")[0]
+
+
+class RecordingSession:
+    """记录收到的进度通知"""
+
+    def __init__(self):
+        self.notifications = []
+
+    async def send_progress_notification(self, token, progress, total=None, message=None, related_request_id=None):
+        self.notifications.append((token, progress, total, message))
+
+
+async def test_submit_and_collect(server):
+    """测试提交批量生成任务,轮询进度并取回结果"""
+    print("\n" + "="*60)
+    print("测试 1: 提交任务并取回结果")
+    print("="*60)
+
+    count = 300
+    submitted = await server.submit_job(
+        "generate_documents_batch",
+        {"template_name": "letter.docx", "contexts": letter_contexts(count)}
+    )
+    job_id = job_id_of(submitted)
+    print(submitted[0].text)
+
+    # 提交后立即返回,任务在后台运行
+    seen_progress = set()
+    job = job_manager.get(job_id)
+    while not job.done:
+        seen_progress.add(job.progress)
+        await asyncio.sleep(0.05)
+
+    status = await server.get_job_status(job_id)
+    result = await server.get_job_result(job_id)
+    print(status[0].text.splitlines()[2])
+    print(f"   - 轮询到的进度值: {len(seen_progress)} 个")
+    return (
+        job.state == "succeeded"
+        and job.progress == count and job.total == count
+        and len(seen_progress) > 1
+        and "Documents generated successfully" in result[0].text
+    )
+
+
+async def test_progress_notifications(server):
+    """测试等待任务时转发 MCP 进度通知"""
+    print("\n" + "="*60)
+    print("测试 2: 进度通知")
+    print("="*60)
+
+    session = RecordingSession()
+    submitted = await server.submit_job(
+        "generate_documents_batch",
+        {"template_name": "letter.docx", "contexts": letter_contexts(200), "output_mode": "zip"}
+    )
+    job = job_manager.get(job_id_of(submitted))
+    job.add_listener(ProgressNotifier(session, "token-1", asyncio.get_running_loop(), interval=0.05))
+    await job.wait(60)
+    await asyncio.sleep(0.1)
+
+    progress = [n[1] for n in session.notifications]
+    print(f"   - 通知数: {len(progress)}, 最后一条: {session.notifications[-1] if progress else None}")
+    return (
+        job.state == "succeeded"
+        and len(progress) > 1
+        and progress == sorted(progress)
+        and session.notifications[-1][1:3] == (200, 200)
+        and all(n[0] == "token-1" for n in session.notifications)
+    )
+
+
+async def test_cancel(server):
+    """测试取消运行中的任务,不留下半成品文件"""
+    print("\n" + "="*60)
+    print("测试 3: 取消任务")
+    print("="*60)
+
+    submitted = await server.submit_job(
+        "generate_documents_batch",
+        {"template_name": "letter.docx", "contexts": letter_contexts(5000), "output_name": "test_job_cancelled"}
+    )
+    job = job_manager.get(job_id_of(submitted))
+    while job.progress < 10 and not job.done:
+        await asyncio.sleep(0.02)
+
+    start = time.time()
+    cancelled = await server.cancel_job(job.id)
+    await job.wait(10)
+    elapsed = time.time() - start
+    result = await server.get_job_result(job.id)
+    print(cancelled[0].text)
+    print(f"   - 状态: {job.state}, 进度: {job.progress}/{job.total}, 停止耗时: {elapsed:.2f}s")
+    return (
+        job.state == "cancelled"
+        and job.progress < 5000
+        and "cancelled" in result[0].text
+        and not (Path("output") / "test_job_cancelled.docx").exists()
+    )
+
+
+async def test_store_bounds():
+    """测试任务存储上限和结果过期"""
+    print("\n" + "="*60)
+    print("测试 4: 存储上限与过期")
+    print("="*60)
+
+    async def quick():
+        return ["done"]
+
+    release = asyncio.Event()
+
+    async def blocked():
+        await release.wait()
+        return ["done"]
+
+    manager = JobManager(max_jobs=3, ttl=3600, max_running=3)
+    first = manager.submit("quick", {}, quick)
+    await first.wait(5)
+    running = [manager.submit("blocked", {}, blocked) for _ in range(2)]
+    # 满了时先丢弃已完成的任务
+    third = manager.submit("blocked", {}, blocked)
+    try:
+        manager.submit("blocked", {}, blocked)
+        full = False
+    except JobStoreFull:
+        full = True
+    evicted = manager.get(first.id) is None
+
+    release.set()
+    for job in running + [third]:
+        await job.wait(5)
+    manager.ttl = 0
+    expired = manager.jobs() == []
+    print(f"   - 丢弃已完成任务: {evicted}, 存储已满: {full}, 过期清理: {expired}")
+    return evicted and full and expired and third.result == ["done"]
+
+
+async def test_invalid_requests(server):
+    """测试无效工具和不存在的任务"""
+    print("\n" + "="*60)
+    print("测试 5: 无效请求")
+    print("="*60)
+
+    unknown = await server.submit_job("no_such_tool", {})
+    nested = await server.submit_job("submit_job", {"tool": "list_templates"})
+    missing = await server.get_job_result("missing")
+    print(unknown[0].text)
+    print(missing[0].text)
+    return all("Error" in r[0].text for r in (unknown, nested, missing))
+
+
+async def main():
+    """主测试函数"""
+    print("🧪 后台任务测试")
+    print("="*60)
+
+    server = DocxTemplateServer()
+
+    results = {
+        "提交任务并取回结果": await test_submit_and_collect(server),
+        "进度通知": await test_progress_notifications(server),
+        "取消任务": await test_cancel(server),
+        "存储上限与过期": await test_store_bounds(),
+        "无效请求": await test_invalid_requests(server),
+    }
+
+    print("\n" + "="*60)
+    print("📊 测试结果摘要")
+    print("="*60)
+    for test_name, passed in results.items():
+        print(f"{test_name}: {'✅ 通过' if passed else '❌ 失败'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
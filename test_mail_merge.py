@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+"""
+测试批量生成: 同一模板渲染多条记录,合并为一个 DOCX 或打包为 zip
+"""
+
+import asyncio
+import io
+import json
+import sys
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+# 添加 src 目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from docx import Document
+from docx.shared import Inches
+from PIL import Image
+
+from src.mail_merge import render_merged
+from src.server import DocxTemplateServer, generated_documents, template_environment
+
+
+def letter_context(index):
+    """第 index 封信的数据"""
+    return {
+        "sender_name": "李四",
+        "sender_address": "北京市海淀区中关村大街1号",
+        "sender_city": "北京",
+        "sender_state": "北京",
+        "sender_zip": "100080",
+        "sender_email": "lisi@example.com",
+        "sender_phone": "010-12345678",
+        "letter_date": datetime.now().date().isoformat(),
+        "recipient_name": f"客户{index:04d}",
+        "recipient_title": "总经理",
+        "recipient_company": "示例公司",
+        "recipient_address": "上海市黄浦区南京东路100号",
+        "recipient_city": "上海",
+        "recipient_state": "上海",
+        "recipient_zip": "200001",
+        "salutation": "王总",
+        "subject": "关于合作提案的函",
+        "body_paragraphs": ["很高兴有机会向贵公司提出这份合作提案。", "期待您的回复。"],
+        "closing": "此致敬礼",
+        "sender_title": "业务发展经理"
+    }
+
+
+def create_list_template():
+    """创建带编号列表和图片的模板"""
+    output_dir = Path("output")
+    output_dir.mkdir(exist_ok=True)
+    path = output_dir / "test_merge_template.docx"
+
+    image = io.BytesIO()
+    Image.new("RGB", (40, 20), (200, 30, 30)).save(image, format="PNG")
+    image.seek(0)
+
+    doc = Document()
+    doc.add_paragraph("致 {{ name }}")
+    doc.add_picture(image, width=Inches(1))
+    num_id = doc.styles["List Number"].element.pPr.numPr.numId.val
+    for item in ("第一项", "第二项"):
+        numPr = doc.add_paragraph(item, style="List Number")._p.get_or_add_pPr().get_or_add_numPr()
+        numPr.get_or_add_ilvl().val = 0
+        numPr.get_or_add_numId().val = num_id
+    doc.save(path)
+    return path
+
+
+async def test_merge_letters(server):
+    """测试合并 200 封信"""
+    print("\n" + "="*60)
+    print("测试 1: 合并 200 封信")
+    print("="*60)
+
+    count = 200
+    before = len(generated_documents)
+    start = time.time()
+    result = await server.generate_documents_batch("letter.docx", [letter_context(i) for i in range(count)])
+    elapsed = time.time() - start
+    print(result[0].text)
+
+    path = Path(result[0].text.split("**Location**: ")[1].split("\n")[0])
+    doc = Document(str(path))
+    text = "\n".join(p.text for p in doc.paragraphs)
+    sections = len(doc.sections)
+    print(f"   - 耗时: {elapsed:.2f}s, 节数: {sections}")
+    return (
+        len(generated_documents) == before + 1
+        and sections == count
+        and all(f"客户{i:04d}" in text for i in range(count))
+    )
+
+
+async def test_shared_parts():
+    """测试图片去重、编号重新开始和 docPr 编号唯一"""
+    print("\n" + "="*60)
+    print("测试 2: 共享部件与编号")
+    print("="*60)
+
+    template = create_list_template()
+    output = Path("output") / "test_merge_lists.docx"
+    summary = render_merged(template, [{"name": f"用户{i}"} for i in range(3)], output, template_environment())
+
+    with zipfile.ZipFile(output) as zf:
+        media = [name for name in zf.namelist() if name.startswith("word/media/")]
+        document_xml = zf.read("word/document.xml").decode("utf-8")
+    doc = Document(str(output))
+    num_ids = {
+        p._p.pPr.numPr.numId.val
+        for p in doc.paragraphs
+        if p._p.pPr is not None and p._p.pPr.numPr is not None
+    }
+    docpr_ids = [int(v.split('"')[0]) for v in document_xml.split('<wp:docPr id="')[1:]]
+    print(f"   - 记录数: {summary['records']}, 图片部件: {media}")
+    print(f"   - 列表编号实例: {sorted(num_ids)}, docPr: {docpr_ids}")
+    return (
+        len(media) == 1
+        and summary["parts_added"] == 0
+        and len(num_ids) == 3
+        and len(docpr_ids) == 3 and len(set(docpr_ids)) == 3
+        and "用户2" in document_xml
+    )
+
+
+async def test_zip_archive(server):
+    """测试打包为 zip: 每条记录一个 DOCX,不在输出目录单独写文件"""
+    print("\n" + "="*60)
+    print("测试 3: 打包为 zip")
+    print("="*60)
+
+    count = 50
+    docx_before = set(Path("output").glob("*.docx"))
+    result = await server.generate_documents_batch(
+        "letter.docx", [letter_context(i) for i in range(count)], output_mode="zip", name_field="recipient_name"
+    )
+    print(result[0].text)
+    path = Path(result[0].text.split("**Location**: ")[1].split("\n")[0])
+    doc_id = result[0].text.split("**Document ID**: ")[1].split("\n")[0]
+
+    with zipfile.ZipFile(path) as zf:
+        manifest = json.loads(zf.read("manifest.json"))
+        members = manifest["members"]
+        texts = [
+            "\n".join(p.text for p in Document(io.BytesIO(zf.read(member["name"]))).paragraphs)
+            for member in members
+        ]
+    print(f"   - 成员: {members[0]['name']} ... {members[-1]['name']}")
+    return (
+        manifest["records"] == count
+        and members[3]["name"] == "00004_客户0003.docx"
+        and all(f"客户{i:04d}" in text and f"客户{i - 1:04d}" not in text for i, text in enumerate(texts))
+        and set(Path("output").glob("*.docx")) == docx_before
+        and generated_documents[doc_id]["mime_type"] == "application/zip"
+        and len(generated_documents[doc_id]["members"]) == count
+    )
+
+
+async def test_invalid_arguments(server):
+    """测试无效参数"""
+    print("\n" + "="*60)
+    print("测试 4: 无效参数")
+    print("="*60)
+
+    empty = await server.generate_documents_batch("letter.docx", [])
+    missing = await server.generate_documents_batch("不存在.docx", [{}])
+    print(empty[0].text)
+    print(missing[0].text)
+
+    # 同名重新生成失败时,之前成功生成并已登记的文档保持不变
+    good = await server.generate_documents_batch("letter.docx", [letter_context(0)], output_name="test_merge_rerun")
+    output_path = Path("output") / "test_merge_rerun.docx"
+    before = output_path.read_bytes()
+    bad_context = dict(letter_context(1), body_paragraphs=5)
+    failed = await server.generate_documents_batch(
+        "letter.docx", [letter_context(0), bad_context], output_name="test_merge_rerun"
+    )
+    print(failed[0].text)
+    kept = output_path.exists() and output_path.read_bytes() == before
+    print(f"   - 之前的文档保留: {kept}")
+
+    return (
+        "Error" in empty[0].text
+        and "Error" in missing[0].text
+        and "successfully" in good[0].text
+        and "Error" in failed[0].text
+        and kept
+        and not output_path.with_name(output_path.name + ".partial").exists()
+    )
+
+
+async def main():
+    """主测试函数"""
+    print("🧪 批量生成测试")
+    print("="*60)
+
+    server = DocxTemplateServer()
+
+    results = {
+        "合并 200 封信": await test_merge_letters(server),
+        "共享部件与编号": await test_shared_parts(),
+        "打包为 zip": await test_zip_archive(server),
+        "无效参数": await test_invalid_arguments(server),
+    }
+
+    print("\n" + "="*60)
+    print("📊 测试结果摘要")
+    print("="*60)
+    for test_name, passed in results.items():
+        print(f"{test_name}: {'✅ 通过' if passed else '❌ 失败'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+"""
+测试 OOXML 分部件缓存
+
+修改演示文稿中的一张幻灯片或工作簿中的一个工作表后重新解析,
+只有被修改的部件需要重新处理,其余部件直接使用缓存结果
+"""
+
+import sys
+import time
+import zipfile
+from pathlib import Path
+
+# 添加 src 目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from pptx import Presentation
+
+from create_corpus import build_corpus
+from src.extractors import parse_excel, parse_pptx
+from src.loader import DocumentLoader
+from src.parts import PartCache
+
+
+def create_test_corpus():
+    """创建测试用的 PPTX 和 XLSX"""
+    corpus_dir = Path("output") / "part_cache_corpus"
+    build_corpus(corpus_dir, seed=11, kinds=("pptx", "xlsx"), pptx_slides=40, xlsx_rows=200)
+    return corpus_dir
+
+
+def replace_member(path, name, transform):
+    """重写 zip 包中的一个成员,其他成员保持原样"""
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with zipfile.ZipFile(path) as src, zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as dst:
+        for info in src.infolist():
+            data = src.read(info.filename)
+            if info.filename == name:
+                data = transform(data)
+            dst.writestr(info, data)
+    tmp_path.replace(path)
+
+
+def test_pptx_one_slide_changed(corpus_dir):
+    """测试修改一张幻灯片后只重新解析该幻灯片"""
+    print("\n" + "="*60)
+    print("测试 1: 修改一张幻灯片")
+    print("="*60)
+
+    pptx_path = next(corpus_dir.glob("*.pptx"))
+    cache = PartCache()
+    loader = DocumentLoader(part_cache=cache)
+
+    start = time.perf_counter()
+    with loader.open(pptx_path) as doc:
+        first = parse_pptx(doc)
+    cold = time.perf_counter() - start
+
+    # 用 python-pptx 修改第 5 张幻灯片的标题并保存
+    prs = Presentation(str(pptx_path))
+    prs.slides[4].shapes.title.text = "Changed title"
+    prs.save(str(pptx_path))
+
+    misses_before = cache.misses
+    start = time.perf_counter()
+    with loader.open(pptx_path) as doc:
+        second = parse_pptx(doc)
+        loaded = list(doc._objects)
+    warm = time.perf_counter() - start
+
+    reparsed = cache.misses - misses_before
+    print(f"   - 首次解析: {cold:.3f} 秒, 修改后重新解析: {warm:.3f} 秒")
+    print(f"   - 重新解析的幻灯片数: {reparsed}")
+
+    same_elsewhere = all(
+        a == b for i, (a, b) in enumerate(zip(first["slides"], second["slides"])) if i != 4
+    )
+    return (
+        reparsed == 1
+        and second["slides"][4]["title"] == "Changed title"
+        and same_elsewhere
+        and loaded == ["pptx"]
+    )
+
+
+def test_pptx_unchanged_skips_loading(corpus_dir):
+    """测试文件未变化时不需要加载演示文稿"""
+    print("\n" + "="*60)
+    print("测试 2: 所有部件已缓存时不加载文件")
+    print("="*60)
+
+    pptx_path = next(corpus_dir.glob("*.pptx"))
+    loader = DocumentLoader(part_cache=PartCache())
+    with loader.open(pptx_path) as doc:
+        first = parse_pptx(doc, slide_indices=range(0, 10))
+
+    loader.invalidate()
+    with loader.open(pptx_path) as doc:
+        second = parse_pptx(doc, slide_indices=range(0, 10))
+        loaded = list(doc._objects)
+
+    print(f"   - 第二次解析加载的对象: {loaded}")
+    return first == second and loaded == []
+
+
+def test_xlsx_one_sheet_changed(corpus_dir):
+    """测试修改一个工作表后只重新解析该工作表"""
+    print("\n" + "="*60)
+    print("测试 3: 修改一个工作表")
+    print("="*60)
+
+    xlsx_path = next(corpus_dir.glob("*.xlsx"))
+    cache = PartCache()
+    loader = DocumentLoader(part_cache=cache)
+    with loader.open(xlsx_path) as doc:
+        first = parse_excel(doc)
+
+    replace_member(
+        xlsx_path,
+        "xl/worksheets/sheet2.xml",
+        lambda data: data.replace(b"<v>1</v>", b"<v>12345</v>", 1)
+    )
+
+    misses_before = cache.misses
+    with loader.open(xlsx_path) as doc:
+        second = parse_excel(doc)
+
+    # 被修改的工作表需要重新计算已用区域和解析结果,各一次缓存未命中
+    reparsed = cache.misses - misses_before
+    print(f"   - 工作表数: {len(second['sheets'])}, 缓存未命中数: {reparsed}")
+    return (
+        reparsed == 2
+        and first["sheets"][0] == second["sheets"][0]
+        and first["sheets"][1] != second["sheets"][1]
+    )
+
+
+def test_pptx_layout_changed(corpus_dir):
+    """测试修改版式后使用该版式的幻灯片重新解析"""
+    print("\n" + "="*60)
+    print("测试 4: 修改幻灯片版式")
+    print("="*60)
+
+    pptx_path = next(corpus_dir.glob("*.pptx"))
+    cache = PartCache()
+    loader = DocumentLoader(part_cache=cache)
+    with loader.open(pptx_path) as doc:
+        parse_pptx(doc)
+        package = doc.package
+        layout = package.layouts[package.slides[0]]
+        using = sum(1 for slide in package.slides if package.layouts.get(slide) == layout)
+
+    replace_member(pptx_path, layout, lambda data: data.replace(b"</p:sldLayout>", b"<!-- changed --></p:sldLayout>"))
+
+    misses_before = cache.misses
+    with loader.open(pptx_path) as doc:
+        parse_pptx(doc)
+    reparsed = cache.misses - misses_before
+
+    print(f"   - 版式: {layout}, 母版: {package.masters.get(layout)}")
+    print(f"   - 使用该版式的幻灯片: {using}/{len(package.slides)}, 重新解析: {reparsed}")
+    return layout in package.slide_parts(0) and package.masters.get(layout) in package.slide_parts(0) and reparsed == using
+
+
+def test_memory_limit():
+    """测试内存中的缓存按估算的大小淘汰"""
+    print("\n" + "="*60)
+    print("测试 5: 按大小限制内存")
+    print("="*60)
+
+    cache = PartCache(max_bytes=64 * 1024)
+    for i in range(100):
+        cache.put(("slide", i), {"text": "x" * 1024})
+    cache.put(("sheet", "large"), {"cells": "x" * 1024 * 1024})
+
+    print(f"   - 内存中的条目: {len(cache._entries)}, 估算大小: {cache.size / 1024:.0f} KB (上限 64 KB)")
+    return (
+        cache.size <= 64 * 1024
+        and cache.get(("slide", 99)) is not None
+        and cache.get(("slide", 0)) is None
+        and cache.get(("sheet", "large")) is None
+    )
+
+
+def main():
+    """主测试函数"""
+    print("🧪 OOXML 分部件缓存测试")
+    print("="*60)
+
+    corpus_dir = create_test_corpus()
+
+    results = {
+        "修改一张幻灯片": test_pptx_one_slide_changed(corpus_dir),
+        "所有部件已缓存时不加载文件": test_pptx_unchanged_skips_loading(corpus_dir),
+        "修改一个工作表": test_xlsx_one_sheet_changed(corpus_dir),
+        "修改幻灯片版式": test_pptx_layout_changed(corpus_dir),
+        "按大小限制内存": test_memory_limit(),
+    }
+
+    print("\n" + "="*60)
+    print("📊 测试结果摘要")
+    print("="*60)
+    for test_name, passed in results.items():
+        print(f"{test_name}: {'✅ 通过' if passed else '❌ 失败'}")
+
+
+if __name__ == "__main__":
+    main()
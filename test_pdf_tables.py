@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+测试 PDF 表格检测预过滤和 table_pages 参数
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加 src 目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from create_corpus import build_corpus
+from src.extractors import page_may_have_tables, parse_pdf
+from src.loader import DocumentLoader
+from src.server import DocxTemplateServer
+
+
+def create_test_pdf():
+    """创建每 4 页包含一个表格的 PDF"""
+    corpus_dir = Path("output") / "pdf_tables_corpus"
+    manifest = build_corpus(corpus_dir, seed=4, kinds=("pdf",), pdf_pages=20, pdf_tables_every=4)
+    return corpus_dir / manifest["files"][0]["file"]
+
+
+def test_precheck(pdf_path):
+    """测试只有包含表格线的页面会执行表格提取"""
+    print("\n" + "="*60)
+    print("测试 1: 表格检测预过滤")
+    print("="*60)
+
+    with DocumentLoader().open(pdf_path) as doc:
+        candidates = [i for i, page in enumerate(doc.pdf.pages) if page_may_have_tables(page)]
+        result = parse_pdf(doc)
+
+    with_tables = [p["page_number"] - 1 for p in result["pages"] if p["tables"]]
+    print(f"   - 候选页面: {candidates}")
+    print(f"   - 含表格页面: {with_tables}, 检测页数: {result['table_pages_scanned']}")
+    return candidates == with_tables and result["table_pages_scanned"] == len(candidates)
+
+
+def test_table_pages_option(pdf_path):
+    """测试 table_pages 只在指定页面检测表格"""
+    print("\n" + "="*60)
+    print("测试 2: table_pages 参数")
+    print("="*60)
+
+    with DocumentLoader().open(pdf_path) as doc:
+        result = parse_pdf(doc, table_pages=[3])
+
+    with_tables = [p["page_number"] for p in result["pages"] if p["tables"]]
+    print(f"   - 含表格页面: {with_tables}")
+    return with_tables == [4] and result["table_pages_scanned"] == 1
+
+
+async def test_tool(pdf_path):
+    """测试工具参数和错误提示"""
+    print("\n" + "="*60)
+    print("测试 3: parse_pdf_document 工具")
+    print("="*60)
+
+    server = DocxTemplateServer()
+    result = await server.parse_pdf_document(str(pdf_path), pages="1-8", table_pages="4,8")
+    ok = "检测表格的页数: 2" in result[0].text
+    result = await server.parse_pdf_document(str(pdf_path), table_pages="x-y")
+    print(result[0].text)
+    return ok and "错误" in result[0].text
+
+
+def main():
+    """主测试函数"""
+    print("🧪 PDF 表格检测测试")
+    print("="*60)
+
+    pdf_path = create_test_pdf()
+
+    results = {
+        "表格检测预过滤": test_precheck(pdf_path),
+        "table_pages 参数": test_table_pages_option(pdf_path),
+        "parse_pdf_document 工具": asyncio.run(test_tool(pdf_path)),
+    }
+
+    print("\n" + "="*60)
+    print("📊 测试结果摘要")
+    print("="*60)
+    for test_name, passed in results.items():
+        print(f"{test_name}: {'✅ 通过' if passed else '❌ 失败'}")
+
+
+if __name__ == "__main__":
+    main()
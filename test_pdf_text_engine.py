@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+测试 PDF 文本提取引擎 (layout / fast)
+
+比较两种引擎在同一个 PDF 上的耗时和提取出的词语
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# 添加 src 目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from create_corpus import build_corpus
+from src.extractors import extract_text
+from src.loader import DocumentLoader
+from src.pdf_text import fast_pdf_text
+from src.server import DocxTemplateServer
+
+
+def create_test_pdf():
+    """创建测试用的 PDF"""
+    corpus_dir = Path("output") / "pdf_engine_corpus"
+    manifest = build_corpus(corpus_dir, seed=5, kinds=("pdf",), pdf_pages=250)
+    return corpus_dir / manifest["files"][0]["file"]
+
+
+def test_engines_agree(pdf_path):
+    """测试两种引擎提取出相同的词语"""
+    print("\n" + "="*60)
+    print("测试 1: layout 与 fast 引擎对比")
+    print("="*60)
+
+    timings = {}
+    texts = {}
+    for engine in ("layout", "fast"):
+        loader = DocumentLoader()
+        start = time.perf_counter()
+        with loader.open(pdf_path) as doc:
+            texts[engine] = extract_text(doc, engine)
+        timings[engine] = time.perf_counter() - start
+        print(f"   - {engine}: {timings[engine]:.2f} 秒, {len(texts[engine]):,} 字符")
+
+    return texts["layout"].split() == texts["fast"].split() and timings["fast"] < timings["layout"]
+
+
+def test_parallel_chunks(pdf_path):
+    """测试按页分块并行提取的结果与串行一致"""
+    print("\n" + "="*60)
+    print("测试 2: 分块并行提取")
+    print("="*60)
+
+    serial = fast_pdf_text(pdf_path, max_workers=1)
+    parallel = fast_pdf_text(pdf_path, max_workers=3)
+    print(f"   - 串行: {len(serial):,} 字符, 并行: {len(parallel):,} 字符")
+    return serial == parallel
+
+
+async def test_invalid_engine(pdf_path):
+    """测试无效引擎的错误提示"""
+    print("\n" + "="*60)
+    print("测试 3: 无效的引擎参数")
+    print("="*60)
+
+    server = DocxTemplateServer()
+    result = await server.extract_text_from_document(str(pdf_path), engine="ocr")
+    print(result[0].text)
+    return "错误" in result[0].text
+
+
+def main():
+    """主测试函数"""
+    print("🧪 PDF 文本提取引擎测试")
+    print("="*60)
+
+    pdf_path = create_test_pdf()
+
+    results = {
+        "layout 与 fast 引擎对比": test_engines_agree(pdf_path),
+        "分块并行提取": test_parallel_chunks(pdf_path),
+        "无效的引擎参数": asyncio.run(test_invalid_engine(pdf_path)),
+    }
+
+    print("\n" + "="*60)
+    print("📊 测试结果摘要")
+    print("="*60)
+    for test_name, passed in results.items():
+        print(f"{test_name}: {'✅ 通过' if passed else '❌ 失败'}")
+
+
+if __name__ == "__main__":
+    main()
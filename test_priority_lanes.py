@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+"""
+测试优先级通道: 交互式调用优先于批量任务,同一通道内各会话轮流执行
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+# 添加 src 目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.jobs import JobManager
+from src.scheduler import LaneScheduler
+from src.server import DocxTemplateServer, worker_pool
+
+
+def letter_contexts(count):
+    """count 封信的数据"""
+    return [
+        {
+            "sender_name": "李四",
+            "letter_date": "2024-03-01",
+            "recipient_name": f"客户{i:04d}",
+            "salutation": "王总",
+            "subject": "关于合作提案的函",
+            "body_paragraphs": ["期待您的回复。"],
+            "closing": "此致敬礼",
+        }
+        for i in range(count)
+    ]
+
+
+async def run_slot(scheduler, lane, session, name, order, hold=0.05):
+    """占用一个执行位,记录获得执行位的顺序"""
+    await scheduler.acquire(lane, session)
+    order.append(name)
+    try:
+        await asyncio.sleep(hold)
+    finally:
+        scheduler.release(lane)
+
+
+async def test_priority():
+    """测试空出的执行位先交给交互式调用,批量通道不超过上限"""
+    print("\n" + "="*60)
+    print("测试 1: 交互式优先")
+    print("="*60)
+
+    scheduler = LaneScheduler(2, {"bulk": 1})
+    order = []
+    tasks = [asyncio.create_task(run_slot(scheduler, "bulk", "a", f"bulk{i}", order)) for i in range(3)]
+    await asyncio.sleep(0.01)
+    # 批量任务排队时,交互式调用立即执行
+    interactive_started = time.perf_counter()
+    await run_slot(scheduler, "interactive", "b", "interactive0", order, hold=0)
+    interactive_wait = time.perf_counter() - interactive_started
+    stats = scheduler.stats()
+
+    # 执行位全部占满后,排队的交互式调用先于批量调用
+    blockers = [asyncio.create_task(run_slot(scheduler, "interactive", "c", f"blocker{i}", order)) for i in range(2)]
+    await asyncio.sleep(0.01)
+    late = asyncio.create_task(run_slot(scheduler, "interactive", "b", "interactive1", order))
+    await asyncio.gather(*tasks, *blockers, late)
+
+    print(f"   - 交互式等待: {interactive_wait * 1000:.1f}ms, 批量通道: {stats['bulk']}")
+    print(f"   - 执行顺序: {order}")
+    return (
+        interactive_wait < 0.01
+        and stats["bulk"] == {"running": 1, "waiting": 2, "limit": 1}
+        and order.index("interactive1") < order.index("bulk2")
+    )
+
+
+async def test_session_fairness():
+    """测试同一通道内各会话轮流获得执行位"""
+    print("\n" + "="*60)
+    print("测试 2: 会话公平")
+    print("="*60)
+
+    scheduler = LaneScheduler(1)
+    order = []
+    tasks = [asyncio.create_task(run_slot(scheduler, "bulk", "a", f"a{i}", order, hold=0.01)) for i in range(4)]
+    await asyncio.sleep(0)
+    tasks += [asyncio.create_task(run_slot(scheduler, "bulk", "b", f"b{i}", order, hold=0.01)) for i in range(2)]
+    await asyncio.gather(*tasks)
+
+    print(f"   - 执行顺序: {order}")
+    return order == ["a0", "a1", "b0", "a2", "b1", "a3"]
+
+
+async def test_cancel_waiting():
+    """测试取消排队中的调用不占用执行位"""
+    print("\n" + "="*60)
+    print("测试 3: 取消排队中的调用")
+    print("="*60)
+
+    scheduler = LaneScheduler(1)
+    order = []
+    holder = asyncio.create_task(run_slot(scheduler, "bulk", "a", "holder", order, hold=0.1))
+    await asyncio.sleep(0)
+    waiting = asyncio.create_task(run_slot(scheduler, "bulk", "b", "cancelled", order))
+    await asyncio.sleep(0.01)
+    waiting.cancel()
+    after = asyncio.create_task(run_slot(scheduler, "bulk", "c", "after", order))
+    await asyncio.gather(holder, after, waiting, return_exceptions=True)
+    stats = scheduler.stats()
+
+    print(f"   - 执行顺序: {order}, 统计: {stats['bulk']}")
+    return order == ["holder", "after"] and stats["bulk"]["running"] == 0 and stats["bulk"]["waiting"] == 0
+
+
+async def test_closed_loop_waiter():
+    """测试排队调用所在的事件循环已关闭时,执行位交给下一个调用"""
+    print("\n" + "="*60)
+    print("测试 4: 事件循环已关闭的排队调用")
+    print("="*60)
+
+    scheduler = LaneScheduler(1)
+    await scheduler.acquire("bulk", "a")
+
+    def queue_and_close():
+        # 后台任务的私有事件循环: 排队后循环被关闭
+        loop = asyncio.new_event_loop()
+        loop.create_task(scheduler.acquire("bulk", "b"))
+        loop.run_until_complete(asyncio.sleep(0.01))
+        loop.close()
+
+    thread = threading.Thread(target=queue_and_close)
+    thread.start()
+    thread.join()
+    after = asyncio.create_task(scheduler.acquire("bulk", "c"))
+    await asyncio.sleep(0.01)
+
+    try:
+        scheduler.release("bulk")
+        error = None
+    except RuntimeError as e:
+        error = e
+    try:
+        await asyncio.wait_for(after, 1)
+        granted = True
+    except asyncio.TimeoutError:
+        granted = False
+    scheduler.release("bulk")
+    stats = scheduler.stats()
+
+    print(f"   - 释放时异常: {error}, 下一个调用获得执行位: {granted}, 统计: {stats['bulk']}")
+    return error is None and granted and stats["bulk"]["running"] == 0 and stats["bulk"]["waiting"] == 0
+
+
+async def test_interactive_under_bulk_load(server):
+    """测试批量生成运行时,交互式解析不必等待"""
+    print("\n" + "="*60)
+    print("测试 5: 批量负载下的交互式延迟")
+    print("="*60)
+
+    idle_start = time.perf_counter()
+    await server.execute_tool("list_templates", {})
+    await server.execute_tool("get_document_metadata", {"file_path": "templates/letter.docx"})
+    idle_latency = time.perf_counter() - idle_start
+
+    bulk = [
+        asyncio.create_task(server.execute_tool(
+            "generate_documents_batch", {"template_name": "letter.docx", "contexts": letter_contexts(1500)}
+        ))
+        for _ in range(2)
+    ]
+    await asyncio.sleep(1)
+    lanes = worker_pool.stats()["lanes"]
+
+    start = time.perf_counter()
+    result = await server.execute_tool("get_document_metadata", {"file_path": "templates/letter.docx"})
+    loaded_latency = time.perf_counter() - start
+    bulk_results = await asyncio.gather(*bulk)
+
+    print(f"   - 空闲时: {idle_latency:.2f}s, 批量运行时: {loaded_latency:.2f}s")
+    print(f"   - 批量运行时的通道: {lanes}")
+    return (
+        lanes["bulk"]["running"] == 1 and lanes["bulk"]["waiting"] == 1
+        and loaded_latency < 2
+        and "错误" not in result[0].text
+        and all("Documents generated successfully" in r[0].text for r in bulk_results)
+    )
+
+
+async def test_job_lanes():
+    """测试交互式后台任务不必等待批量任务"""
+    print("\n" + "="*60)
+    print("测试 6: 后台任务通道")
+    print("="*60)
+
+    # 任务在各自的事件循环中运行,用线程事件放行
+    release = threading.Event()
+
+    async def bulk_work():
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+        return ["bulk"]
+
+    async def quick():
+        return ["quick"]
+
+    manager = JobManager(max_running=2, lane_limits={"bulk": 1})
+    bulk_jobs = [manager.submit("generate_documents_batch", {}, bulk_work, "bulk") for _ in range(3)]
+    interactive = manager.submit("validate_template", {}, quick)
+    finished = await interactive.wait(2)
+    states = [job.state for job in bulk_jobs]
+    release.set()
+    for job in bulk_jobs:
+        await job.wait(5)
+
+    print(f"   - 交互式任务完成: {finished}, 批量任务状态: {states}")
+    return (
+        finished and interactive.result == ["quick"]
+        and states == ["running", "queued", "queued"]
+        and interactive.status()["lane"] == "interactive"
+        and all(job.state == "succeeded" for job in bulk_jobs)
+    )
+
+
+async def main():
+    """主测试函数"""
+    print("🧪 优先级通道测试")
+    print("="*60)
+
+    server = DocxTemplateServer()
+
+    results = {
+        "交互式优先": await test_priority(),
+        "会话公平": await test_session_fairness(),
+        "取消排队中的调用": await test_cancel_waiting(),
+        "事件循环已关闭的排队调用": await test_closed_loop_waiter(),
+        "后台任务通道": await test_job_lanes(),
+    }
+    if worker_pool is not None and worker_pool.max_workers > 1:
+        results["批量负载下的交互式延迟"] = await test_interactive_under_bulk_load(server)
+        worker_pool.shutdown()
+
+    print("\n" + "="*60)
+    print("📊 测试结果摘要")
+    print("="*60)
+    for test_name, passed in results.items():
+        print(f"{test_name}: {'✅ 通过' if passed else '❌ 失败'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
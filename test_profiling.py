@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+测试工具调用的性能分析: 工作进程中运行的工具在工作进程中分析,同样受超时限制
+"""
+
+import asyncio
+import pstats
+import re
+import sys
+import time
+from pathlib import Path
+
+# 添加 src 目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from create_corpus import build_corpus
+import src.server as server_module
+from src.server import DocxTemplateServer, worker_pool
+
+
+def create_test_pdf():
+    """创建 12 页的 PDF"""
+    corpus_dir = Path("output") / "profiling_corpus"
+    manifest = build_corpus(corpus_dir, seed=7, kinds=("pdf",), pdf_pages=12, pdf_tables_every=4)
+    return str(corpus_dir / manifest["files"][0]["file"])
+
+
+def worker_tasks():
+    return sum(worker.tasks for worker in worker_pool._idle + worker_pool._busy)
+
+
+def profile_functions(result):
+    """从响应末尾取出统计文件,返回其中出现的函数名"""
+    match = re.search(r"🔬 \*\*Profile\*\*: `([^`]+)`", result[-1].text)
+    if match is None:
+        return None, set()
+    stats = pstats.Stats(match.group(1))
+    return match.group(1), {function for _, _, function in stats.stats}
+
+
+async def test_profile_in_worker(server, pdf_path):
+    """测试工作进程工具的分析结果来自工作进程"""
+    print("\n" + "="*60)
+    print("测试 1: 在工作进程中分析")
+    print("="*60)
+
+    tasks_before = worker_tasks()
+    result = await server.execute_tool("parse_pdf_document", {"file_path": pdf_path}, profile=True)
+    path, functions = profile_functions(result)
+
+    print(f"   - 统计文件: {path}, 函数数: {len(functions)}")
+    print(f"   - 工作进程调用次数: {tasks_before} -> {worker_tasks()}")
+    return (
+        path is not None
+        and "parse_pdf_document" in functions
+        and worker_tasks() == tasks_before + 1
+        and "PDF" in result[0].text
+    )
+
+
+async def test_profile_deadline(server):
+    """测试分析的调用超过期限时同样被结束"""
+    print("\n" + "="*60)
+    print("测试 2: 分析的调用受超时限制")
+    print("="*60)
+
+    server_module.TOOL_TIMEOUTS["generate_documents_batch"] = 1
+    contexts = [
+        {
+            "sender_name": "李四",
+            "letter_date": "2024-03-01",
+            "recipient_name": f"客户{i:04d}",
+            "salutation": "王总",
+            "subject": "关于合作提案的函",
+            "body_paragraphs": ["期待您的回复。"],
+            "closing": "此致敬礼",
+        }
+        for i in range(20000)
+    ]
+    try:
+        start = time.time()
+        result = await server.execute_tool(
+            "generate_documents_batch",
+            {"template_name": "letter.docx", "contexts": contexts, "output_name": "test_profile_timeout"},
+            profile=True
+        )
+        elapsed = time.time() - start
+    finally:
+        del server_module.TOOL_TIMEOUTS["generate_documents_batch"]
+
+    print(result[0].text)
+    print(f"   - 耗时: {elapsed:.2f}s")
+    return "did not finish within 1 seconds" in result[0].text and elapsed < 5
+
+
+async def test_profile_in_process(server):
+    """测试主进程中运行的工具仍在主进程中分析"""
+    print("\n" + "="*60)
+    print("测试 3: 主进程工具的分析")
+    print("="*60)
+
+    result = await server.execute_tool("list_templates", {}, profile=True)
+    path, functions = profile_functions(result)
+
+    print(f"   - 统计文件: {path}, 函数数: {len(functions)}")
+    return path is not None and "list_templates" in functions
+
+
+async def main():
+    """主测试函数"""
+    print("🧪 性能分析测试")
+    print("="*60)
+
+    server = DocxTemplateServer()
+    results = {}
+    if worker_pool is not None:
+        pdf_path = create_test_pdf()
+        results["在工作进程中分析"] = await test_profile_in_worker(server, pdf_path)
+        results["分析的调用受超时限制"] = await test_profile_deadline(server)
+    results["主进程工具的分析"] = await test_profile_in_process(server)
+    if worker_pool is not None:
+        worker_pool.shutdown()
+
+    print("\n" + "="*60)
+    print("📊 测试结果摘要")
+    print("="*60)
+    for test_name, passed in results.items():
+        print(f"{test_name}: {'✅ 通过' if passed else '❌ 失败'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+"""
+测试超大解析结果写入文件: 超过内联上限时只返回摘要和 parsed:// 资源
+"""
+
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+# 工作进程从同一环境启动,需在导入服务器前设置
+os.environ["MAX_INLINE_RESULT_KB"] = "64"
+
+# 添加 src 目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+import mcp.types as types
+
+from create_corpus import build_corpus
+from src.server import DocxTemplateServer, parsed_results, worker_pool
+from src.spill import encode_or_spill
+
+
+def create_test_files():
+    """创建 60 页的 PDF 和一个小型 PPT"""
+    corpus_dir = Path("output") / "spill_corpus"
+    pdf = build_corpus(corpus_dir, seed=3, kinds=("pdf",), pdf_pages=60, pdf_tables_every=5)
+    pptx = build_corpus(corpus_dir, seed=3, kinds=("pptx",), pptx_slides=3)
+    return str(corpus_dir / pdf["files"][0]["file"]), str(corpus_dir / pptx["files"][0]["file"])
+
+
+async def read_resource(server, uri):
+    """通过 MCP 处理器读取资源"""
+    request = types.ReadResourceRequest(method="resources/read", params=types.ReadResourceRequestParams(uri=uri))
+    result = await server.server.request_handlers[types.ReadResourceRequest](request)
+    return result.root.contents[0].text
+
+
+async def list_resource_uris(server):
+    request = types.ListResourcesRequest(method="resources/list")
+    result = await server.server.request_handlers[types.ListResourcesRequest](request)
+    return [str(resource.uri) for resource in result.root.resources]
+
+
+def test_encoder():
+    """测试增量编码与直接 json.dumps 结果一致"""
+    print("\n" + "="*60)
+    print("测试 1: 增量编码")
+    print("="*60)
+
+    data = {"rows": [{"行": i, "文本": f"单元格 {i}", "值": i * 1.5, "空": None} for i in range(5000)]}
+    expected = json.dumps(data, indent=2, ensure_ascii=False)
+    path = Path("output") / "spill_test" / "rows.json"
+
+    inline = encode_or_spill(data, 0, path)
+    spilled = encode_or_spill(data, 1024, path)
+    written = path.read_text(encoding="utf-8")
+    print(f"   - JSON 长度: {len(expected):,}, 文件: {path.stat().st_size:,} 字节")
+    return (
+        inline == expected
+        and spilled is None
+        and written == expected
+        and not path.with_name(path.name + ".partial").exists()
+    )
+
+
+async def test_small_inline(server, pptx_path):
+    """测试小结果仍然内联返回"""
+    print("\n" + "="*60)
+    print("测试 2: 小结果内联")
+    print("="*60)
+
+    before = len(parsed_results)
+    result = await server.execute_tool("parse_ppt_document", {"file_path": pptx_path})
+    text = result[0].text
+    print(f"   - 响应长度: {len(text):,}")
+    return "```json" in text and "parsed://" not in text and len(parsed_results) == before
+
+
+async def test_large_spilled(server, pdf_path):
+    """测试大结果写入文件,响应只含摘要,资源返回完整结果"""
+    print("\n" + "="*60)
+    print("测试 3: 大结果写入文件")
+    print("="*60)
+
+    result = await server.execute_tool("parse_pdf_document", {"file_path": pdf_path})
+    text = result[0].text
+    result_id = text.split("parsed://")[1].split("`")[0]
+    full = json.loads(await read_resource(server, f"parsed://{result_id}"))
+    uris = await list_resource_uris(server)
+    info = parsed_results.get(result_id, {})
+
+    print(f"   - 响应长度: {len(text):,}, 结果文件: {info.get('size', 0):,} 字节")
+    print(text.split("📋")[1][:300])
+    return (
+        "```json" not in text
+        and len(text) < 4000
+        and "总页数: 60" in text
+        and info.get("tool") == "parse_pdf_document"
+        and f"parsed://{result_id}" in uris
+        and len(full["pages"]) == 60
+        and info["size"] > 64 * 1024
+    )
+
+
+async def test_unknown_resource(server):
+    """测试不存在的 parsed:// 资源"""
+    print("\n" + "="*60)
+    print("测试 4: 不存在的资源")
+    print("="*60)
+
+    text = await read_resource(server, "parsed://missing")
+    print(f"   - {text}")
+    return "Parse result not found" in text
+
+
+async def main():
+    """主测试函数"""
+    print("🧪 超大解析结果写入文件测试")
+    print("="*60)
+
+    pdf_path, pptx_path = create_test_files()
+    server = DocxTemplateServer()
+
+    results = {
+        "增量编码": test_encoder(),
+        "小结果内联": await test_small_inline(server, pptx_path),
+        "大结果写入文件": await test_large_spilled(server, pdf_path),
+        "不存在的资源": await test_unknown_resource(server),
+    }
+    if worker_pool is not None:
+        worker_pool.shutdown()
+
+    print("\n" + "="*60)
+    print("📊 测试结果摘要")
+    print("="*60)
+    for test_name, passed in results.items():
+        print(f"{test_name}: {'✅ 通过' if passed else '❌ 失败'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""
+测试全文搜索索引功能
+
+此脚本使用语料生成器创建一组测试文档,然后测试 index_documents 和 search_documents
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# 添加 src 目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from create_corpus import build_corpus
+from src.search_index import SearchIndex
+
+
+def create_test_corpus():
+    """创建小规模测试语料"""
+    corpus_dir = Path("output") / "search_corpus"
+    build_corpus(
+        corpus_dir,
+        seed=3,
+        count=1,
+        pdf_pages=3,
+        xlsx_rows=20,
+        pptx_slides=3,
+        docx_tables=2,
+    )
+    return corpus_dir
+
+
+def test_incremental_index(index, corpus_dir):
+    """测试增量索引: 第二次索引应跳过所有文件"""
+    print("\n" + "="*60)
+    print("测试 1: 增量索引")
+    print("="*60)
+
+    files = sorted(p for p in corpus_dir.iterdir() if p.suffix != ".json")
+    first = index.index_files(files)
+    second = index.index_files(files)
+    print(f"   - 第一次: 索引 {first['indexed']} 个文件, {first['segments']} 个片段")
+    print(f"   - 第二次: 跳过 {second['unchanged']} 个文件")
+
+    # 只修改时间戳, 内容不变
+    os.utime(files[0], ns=(files[0].stat().st_atime_ns, files[0].stat().st_mtime_ns + 10**9))
+    third = index.index_files(files)
+    print(f"   - 修改时间戳后: 仅更新 {third['touched']} 个文件")
+
+    return first["indexed"] == len(files) and second["unchanged"] == len(files) and third["touched"] == 1
+
+
+def test_search_locations(index):
+    """测试搜索结果包含文件位置"""
+    print("\n" + "="*60)
+    print("测试 2: 搜索并返回位置")
+    print("="*60)
+
+    results = index.search("Row", limit=5)
+    for result in results:
+        print(f"   - {Path(result['file']).name} {result['location']} {result['score']}")
+    pdf_only = index.search("Page", file_types=["pdf"])
+    print(f"   - 仅 PDF: {len(pdf_only)} 条")
+
+    return bool(results) and bool(pdf_only) and all(r["file_type"] == ".pdf" for r in pdf_only) \
+        and all("page" in r["location"] for r in pdf_only)
+
+
+def test_remove_missing(index, corpus_dir):
+    """测试移除已删除的文件"""
+    print("\n" + "="*60)
+    print("测试 3: 移除已删除的文件")
+    print("="*60)
+
+    victim = next(corpus_dir.glob("*.pptx"))
+    victim.unlink()
+    summary = index.index_files([], remove_missing=True)
+    remaining = index.search("slide", file_types=["pptx"])
+    print(f"   - 移除 {summary['removed']} 个文件, 剩余 PPTX 结果 {len(remaining)} 条")
+    return summary["removed"] == 1 and not remaining
+
+
+def main():
+    """主测试函数"""
+    print("🧪 全文搜索索引功能测试")
+    print("="*60)
+
+    corpus_dir = create_test_corpus()
+    db_path = Path("output") / "test_search_index.db"
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+    index = SearchIndex(db_path)
+
+    results = {
+        "增量索引": test_incremental_index(index, corpus_dir),
+        "搜索并返回位置": test_search_locations(index),
+        "移除已删除的文件": test_remove_missing(index, corpus_dir),
+    }
+
+    print("\n" + "="*60)
+    print("📊 测试结果摘要")
+    print("="*60)
+    for test_name, passed in results.items():
+        print(f"{test_name}: {'✅ 通过' if passed else '❌ 失败'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""
+测试逐条生成的解析结果: 页面、幻灯片和工作表边解析边编码,不必同时留在内存中
+"""
+
+import asyncio
+import json
+import sys
+import tracemalloc
+from pathlib import Path
+
+# 添加 src 目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from create_corpus import build_corpus
+from src.extractors import parse_docx, parse_excel, parse_pdf, parse_pptx, stream_docx, stream_excel, stream_pdf, stream_pptx
+from src.loader import DocumentLoader
+from src.spill import encode_or_spill
+from src.streaming import Deferred, iterencode
+
+
+def create_corpus():
+    """每种类型各一个文件"""
+    corpus_dir = Path("output") / "streaming_corpus"
+    manifest = build_corpus(corpus_dir, seed=11, kinds=("docx", "pdf", "xlsx", "pptx"))
+    return {Path(f["file"]).suffix: corpus_dir / f["file"] for f in manifest["files"]}
+
+
+def test_same_json(files):
+    """测试逐条编码的 JSON 与解析完整结果后 json.dumps 的结果一致"""
+    print("\n" + "="*60)
+    print("测试 1: 与完整结果的 JSON 一致")
+    print("="*60)
+
+    parsers = {
+        ".docx": (parse_docx, stream_docx),
+        ".pdf": (parse_pdf, stream_pdf),
+        ".xlsx": (parse_excel, stream_excel),
+        ".pptx": (parse_pptx, stream_pptx),
+    }
+    passed = True
+    for suffix, (parse, stream) in parsers.items():
+        with DocumentLoader().open(files[suffix]) as doc:
+            expected = json.dumps(parse(doc), indent=2, ensure_ascii=False)
+        with DocumentLoader().open(files[suffix]) as doc:
+            streamed = "".join(iterencode(stream(doc)))
+        same = streamed == expected
+        passed = passed and same
+        print(f"   - {suffix}: {len(expected):,} 字符, {'一致' if same else '不一致'}")
+    return passed
+
+
+def test_bounded_memory():
+    """测试写入文件时内存峰值与结果大小无关"""
+    print("\n" + "="*60)
+    print("测试 2: 写入文件时的内存峰值")
+    print("="*60)
+
+    def pages(count):
+        for i in range(count):
+            yield {"page_number": i + 1, "text": f"第 {i + 1} 页 " + "内容 " * 500, "tables": []}
+
+    def result(count):
+        return {"metadata": {"pages": count}, "pages": pages(count), "total_pages_parsed": Deferred(lambda: count)}
+
+    path = Path("output") / "streaming_test" / "pages.json"
+    peaks = {}
+    for count in (2000, 8000):
+        tracemalloc.start()
+        encode_or_spill(result(count), 64 * 1024, path)
+        peaks[count] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    size = path.stat().st_size
+    written = json.loads(path.read_text(encoding="utf-8"))
+
+    print(f"   - 结果文件: {size / 1024 / 1024:.1f} MB")
+    print(f"   - 内存峰值: 2000 页 {peaks[2000] / 1024:.0f} KB, 8000 页 {peaks[8000] / 1024:.0f} KB")
+    return (
+        len(written["pages"]) == 8000
+        and written["total_pages_parsed"] == 8000
+        and peaks[8000] < size / 20
+        and peaks[8000] < peaks[2000] * 2
+    )
+
+
+def test_error_while_streaming():
+    """测试编码过程中解析出错时不留下不完整的文件"""
+    print("\n" + "="*60)
+    print("测试 3: 编码过程中出错")
+    print("="*60)
+
+    def pages():
+        for i in range(1000):
+            if i == 900:
+                raise ValueError("第 901 页损坏")
+            yield {"page_number": i + 1, "text": "内容 " * 100}
+
+    path = Path("output") / "streaming_test" / "broken.json"
+    try:
+        encode_or_spill({"pages": pages()}, 1024, path)
+        raised = False
+    except ValueError as e:
+        raised = True
+        print(f"   - 异常: {e}")
+    return raised and not path.exists() and not path.with_name(path.name + ".partial").exists()
+
+
+async def main():
+    """主测试函数"""
+    print("🧪 逐条生成解析结果测试")
+    print("="*60)
+
+    files = create_corpus()
+
+    results = {
+        "与完整结果的 JSON 一致": test_same_json(files),
+        "写入文件时的内存峰值": test_bounded_memory(),
+        "编码过程中出错": test_error_while_streaming(),
+    }
+
+    print("\n" + "="*60)
+    print("📊 测试结果摘要")
+    print("="*60)
+    for test_name, passed in results.items():
+        print(f"{test_name}: {'✅ 通过' if passed else '❌ 失败'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""
+测试 extract_text_from_document 的分段读取 (offset/limit) 和分块返回 (chunk_size)
+"""
+
+import asyncio
+import re
+import sys
+import time
+from pathlib import Path
+
+# 添加 src 目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from create_corpus import build_corpus
+import src.server as server_module
+from src.server import DocxTemplateServer
+
+
+def create_test_document():
+    """创建测试用的 DOCX"""
+    corpus_dir = Path("output") / "text_window_corpus"
+    manifest = build_corpus(corpus_dir, seed=9, kinds=("docx",), docx_tables=30)
+    return str(corpus_dir / manifest["files"][0]["file"])
+
+
+async def test_read_all_windows(server, doc_path):
+    """测试按 offset 依次读取可以拼出全文"""
+    print("\n" + "="*60)
+    print("测试 1: 按 offset/limit 依次读取全文")
+    print("="*60)
+
+    full = (await server.extract_text_from_document(doc_path, limit=0, chunk_size=10**9))[1].text
+
+    pieces = []
+    offset = 0
+    start = time.perf_counter()
+    while True:
+        result = await server.extract_text_from_document(doc_path, offset=offset, limit=3000, chunk_size=3000)
+        pieces.extend(block.text for block in result[1:])
+        if "剩余内容" not in result[0].text:
+            break
+        offset += 3000
+    elapsed = time.perf_counter() - start
+
+    print(f"   - 全文 {len(full):,} 字符, 分 {offset // 3000 + 1} 次读取, 耗时 {elapsed:.3f} 秒")
+    return "".join(pieces) == full
+
+
+async def test_chunk_mode(server, doc_path):
+    """测试分块返回时每块不超过 chunk_size"""
+    print("\n" + "="*60)
+    print("测试 2: chunk_size 分块返回")
+    print("="*60)
+
+    result = await server.extract_text_from_document(doc_path, limit=10000, chunk_size=1000)
+    sizes = [len(block.text) for block in result[1:]]
+    print(f"   - 块数: {len(sizes)}, 块大小: {sizes}")
+    return sum(sizes) == 10000 and max(sizes) <= 1000
+
+
+async def test_default_window(server, doc_path):
+    """测试默认只返回前 2000 个字符"""
+    print("\n" + "="*60)
+    print("测试 3: 默认窗口")
+    print("="*60)
+
+    result = await server.extract_text_from_document(doc_path)
+    print(result[0].text[:400])
+    return len(result) == 1 and "offset=2000" in result[0].text
+
+
+async def test_chunk_windows(server, doc_path):
+    """测试 limit=0 分块返回时每次最多返回一个窗口,按返回的 offset 继续读取"""
+    print("\n" + "="*60)
+    print("测试 4: 分块返回的窗口上限")
+    print("="*60)
+
+    full = (await server.extract_text_from_document(doc_path, limit=0, chunk_size=10**9))[1].text
+
+    original = server_module.MAX_INLINE_RESULT_CHARS
+    server_module.MAX_INLINE_RESULT_CHARS = 5 * 1024
+    pieces = []
+    sizes = []
+    offset = 0
+    try:
+        while True:
+            result = await server.extract_text_from_document(doc_path, offset=offset, limit=0, chunk_size=1000)
+            blocks = [block.text for block in result[1:]]
+            pieces.extend(blocks)
+            sizes.append(sum(len(block) for block in blocks))
+            cursor = re.search(r"offset=(\d+)", result[0].text)
+            if cursor is None:
+                break
+            offset = int(cursor.group(1))
+    finally:
+        server_module.MAX_INLINE_RESULT_CHARS = original
+
+    print(f"   - 全文 {len(full):,} 字符, 分 {len(sizes)} 次读取, 每次最多 {max(sizes):,} 字符")
+    return "".join(pieces) == full and max(sizes) <= 5 * 1024 and len(sizes) > 1
+
+
+async def main():
+    """主测试函数"""
+    print("🧪 文本分段读取测试")
+    print("="*60)
+
+    doc_path = create_test_document()
+    server = DocxTemplateServer()
+
+    results = {
+        "按 offset/limit 依次读取全文": await test_read_all_windows(server, doc_path),
+        "chunk_size 分块返回": await test_chunk_mode(server, doc_path),
+        "默认窗口": await test_default_window(server, doc_path),
+        "分块返回的窗口上限": await test_chunk_windows(server, doc_path),
+    }
+
+    print("\n" + "="*60)
+    print("📊 测试结果摘要")
+    print("="*60)
+    for test_name, passed in results.items():
+        print(f"{test_name}: {'✅ 通过' if passed else '❌ 失败'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+测试工作进程的文件亲和性: 同一文件的调用交给已加载该文件的工作进程,
+元数据、文本和解析工具复用同一个已加载的文档
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# 添加 src 目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.server import DocxTemplateServer, tool_affinity, worker_pool
+
+
+def loaded_document(path, hold=0.05):
+    """在工作进程中打开文档,返回进程号、已加载文档的标识和上次使用时间"""
+    from src.server import document_loader
+
+    previous = document_loader._entries.get(str(Path(path).resolve()))
+    last_used = previous.last_used if previous is not None else None
+    with document_loader.open(path) as doc:
+        time.sleep(hold)
+        return os.getpid(), id(doc), last_used
+
+
+async def probe(path):
+    return await worker_pool.run(loaded_document, path, affinity=tool_affinity({"file_path": path}))
+
+
+async def test_same_worker():
+    """测试并发调用时,每个文件总是交给同一个工作进程"""
+    print("\n" + "="*60)
+    print("测试 1: 同一文件交给同一工作进程")
+    print("="*60)
+
+    paths = ["templates/letter.docx", "templates/invoice.docx"]
+    seen = {path: set() for path in paths}
+    for round_index in range(6):
+        # 每轮调换提交顺序,完成顺序也随之变化
+        order = paths if round_index % 2 == 0 else paths[::-1]
+        results = await asyncio.gather(*(probe(path) for path in order))
+        for path, (pid, doc_id, _) in zip(order, results):
+            seen[path].add((pid, doc_id))
+
+    for path, workers in seen.items():
+        print(f"   - {path}: (进程, 文档) {sorted(workers)}")
+    pids = {pid for workers in seen.values() for pid, _ in workers}
+    return all(len(workers) == 1 for workers in seen.values()) and len(pids) == 2
+
+
+async def test_tools_share_document(server):
+    """测试元数据和文本工具复用工作进程中已加载的文档"""
+    print("\n" + "="*60)
+    print("测试 2: 工具调用复用已加载的文档")
+    print("="*60)
+
+    path = "templates/letter.docx"
+    pid, doc_id, _ = await probe(path)
+    hits_before = worker_pool.stats()["affinity_hits"]
+    await asyncio.gather(
+        server.execute_tool("get_document_metadata", {"file_path": path}),
+        probe("templates/invoice.docx"),
+    )
+    await server.execute_tool("extract_text_from_document", {"file_path": path})
+    after_pid, after_doc_id, last_used = await probe(path)
+    hits = worker_pool.stats()["affinity_hits"] - hits_before
+
+    print(f"   - 工作进程: {pid} -> {after_pid}, 文档复用: {doc_id == after_doc_id}")
+    print(f"   - 亲和命中: {hits}")
+    return pid == after_pid and doc_id == after_doc_id and last_used is not None and hits >= 3
+
+
+async def main():
+    """主测试函数"""
+    print("🧪 工作进程文件亲和性测试")
+    print("="*60)
+
+    server = DocxTemplateServer()
+
+    results = {}
+    if worker_pool is not None and worker_pool.max_workers > 1:
+        results["同一文件交给同一工作进程"] = await test_same_worker()
+        results["工具调用复用已加载的文档"] = await test_tools_share_document(server)
+        worker_pool.shutdown()
+
+    print("\n" + "="*60)
+    print("📊 测试结果摘要")
+    print("="*60)
+    for test_name, passed in results.items():
+        print(f"{test_name}: {'✅ 通过' if passed else '❌ 失败'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+"""
+测试工作进程回收: 按调用次数和常驻内存上限替换工作进程,调用后归还堆内存
+"""
+
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+
+# 添加 src 目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.workers import WorkerPool, current_rss
+
+MB = 1024 * 1024
+
+# 工作进程中保留的内存,模拟解析后无法释放的缓存
+_held = []
+
+
+def worker_pid():
+    return os.getpid()
+
+
+def hold_memory(mb):
+    """在工作进程中保留 mb MB 内存"""
+    block = bytearray(mb * MB)
+    block[::4096] = b"x" * len(block[::4096])
+    _held.append(block)
+    return os.getpid()
+
+
+def fragment_heap():
+    """分配大量小对象后释放,返回释放前的 RSS"""
+    rows = [{"row": i, "text": f"单元格内容 {i}" * 4} for i in range(600000)]
+    peak = current_rss()
+    del rows
+    return peak
+
+
+def parse_broken_cell():
+    """在工作进程中抛出异常"""
+    raise ValueError("单元格损坏")
+
+
+async def test_max_tasks():
+    """测试处理固定次数后替换工作进程"""
+    print("\n" + "="*60)
+    print("测试 1: 按调用次数回收")
+    print("="*60)
+
+    pool = WorkerPool(1, max_tasks=3)
+    pids = [await pool.run(worker_pid) for _ in range(7)]
+    stats = pool.stats()
+    pool.shutdown()
+    print(f"   - 进程: {pids}")
+    print(f"   - 统计: {stats}")
+    return (
+        len(set(pids[0:3])) == 1 and len(set(pids[3:6])) == 1
+        and len(set(pids)) == 3
+        and stats["started"] == 3 and stats["recycled"] == 2 and stats["killed"] == 0
+    )
+
+
+async def test_rss_ceiling():
+    """测试常驻内存超过上限时替换工作进程"""
+    print("\n" + "="*60)
+    print("测试 2: 按内存上限回收")
+    print("="*60)
+
+    pool = WorkerPool(1, max_rss_mb=300)
+    small = [await pool.run(hold_memory, 20) for _ in range(3)]
+    big = await pool.run(hold_memory, 400)
+    after = await pool.run(worker_pid)
+    stats = pool.stats()
+    pool.shutdown()
+    print(f"   - 小内存调用进程: {set(small)}, 大内存调用进程: {big}, 之后: {after}")
+    print(f"   - 统计: {stats}")
+    return (
+        len(set(small)) == 1 and big == small[0]
+        and after != big
+        and stats["recycled"] == 1
+    )
+
+
+async def test_heap_trim():
+    """测试调用结束后归还堆内存"""
+    print("\n" + "="*60)
+    print("测试 3: 调用后归还堆内存")
+    print("="*60)
+
+    pool = WorkerPool(1)
+    baseline = (await pool.run(worker_pid), pool._idle[0].rss)[1]
+    peak = await pool.run(fragment_heap)
+    trimmed = pool._idle[0].rss
+    pool.shutdown()
+    if peak is None or trimmed is None:
+        print("   - 无法读取 RSS (/proc 不可用), 跳过")
+        return True
+    print(f"   - 初始: {baseline / MB:.0f} MB, 峰值: {peak / MB:.0f} MB, 调用后: {trimmed / MB:.0f} MB")
+    return peak - baseline > 100 * MB and trimmed - baseline < (peak - baseline) / 4
+
+
+async def test_remote_traceback():
+    """测试任务出错时父进程收到完整的调用栈"""
+    print("\n" + "="*60)
+    print("测试 4: 工作进程中的异常调用栈")
+    print("="*60)
+
+    messages = []
+    handler = logging.Handler(logging.DEBUG)
+    handler.emit = lambda record: messages.append(record.getMessage())
+    logger = logging.getLogger("src.workers")
+    logger.addHandler(handler)
+    level = logger.level
+    logger.setLevel(logging.DEBUG)
+
+    pool = WorkerPool(1)
+    try:
+        await pool.run(parse_broken_cell)
+        raised = None
+    except ValueError as e:
+        raised = e
+    finally:
+        pool.shutdown()
+        logger.removeHandler(handler)
+        logger.setLevel(level)
+
+    remote = next((m for m in messages if "Worker task failed" in m), "")
+    print(f"   - 异常: {raised!r}")
+    print(f"   - 调用栈:\n{remote}")
+    return raised is not None and "parse_broken_cell" in remote and 'File "' in remote
+
+
+async def main():
+    """主测试函数"""
+    print("🧪 工作进程回收测试")
+    print("="*60)
+
+    results = {
+        "按调用次数回收": await test_max_tasks(),
+        "按内存上限回收": await test_rss_ceiling(),
+        "调用后归还堆内存": await test_heap_trim(),
+        "工作进程中的异常调用栈": await test_remote_traceback(),
+    }
+
+    print("\n" + "="*60)
+    print("📊 测试结果摘要")
+    print("="*60)
+    for test_name, passed in results.items():
+        print(f"{test_name}: {'✅ 通过' if passed else '❌ 失败'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+"""
+测试预加载的工作进程启动: forkserver 预先导入解析库并加载模板,替换工作进程几乎不耗时
+"""
+
+import asyncio
+import os
+import pstats
+import re
+import sys
+import time
+from pathlib import Path
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+# 添加 src 目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.server import TEMPLATE_DIR, run_tool_in_worker
+from src.workers import WorkerPool
+
+PRELOAD = ["src.worker_preload"]
+
+
+async def time_recycled_calls(pool, func, *args, calls=4):
+    """每次调用都启动新的工作进程 (max_tasks=1),返回首次和之后的平均耗时"""
+    start = time.perf_counter()
+    await pool.run(func, *args)
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        await pool.run(func, *args)
+    return first, (time.perf_counter() - start) / calls
+
+
+async def test_recycle_latency():
+    """测试 forkserver 与 spawn 启动新工作进程的耗时"""
+    print("\n" + "="*60)
+    print("测试 1: 工作进程启动耗时")
+    print("="*60)
+
+    spawn_pool = WorkerPool(1, "spawn", max_tasks=1)
+    spawn_first, spawn_avg = await time_recycled_calls(spawn_pool, run_tool_in_worker, "list_templates", {})
+    spawn_pool.shutdown()
+
+    fork_pool = WorkerPool(1, "forkserver", max_tasks=1, preload=PRELOAD)
+    fork_first, fork_avg = await time_recycled_calls(fork_pool, run_tool_in_worker, "list_templates", {})
+    stats = fork_pool.stats()
+    fork_pool.shutdown()
+
+    print(f"   - spawn: 首次 {spawn_first:.2f}s, 之后每次 {spawn_avg:.3f}s")
+    print(f"   - forkserver: 首次 {fork_first:.2f}s (含预加载), 之后每次 {fork_avg:.3f}s")
+    print(f"   - 统计: {stats}")
+    return stats["started"] == 5 and fork_avg < spawn_avg / 3
+
+
+async def test_preloaded_state():
+    """测试工作进程继承已导入的模块和已编译的模板"""
+    print("\n" + "="*60)
+    print("测试 2: 预加载的模块和模板")
+    print("="*60)
+
+    pool = WorkerPool(1, "forkserver", preload=PRELOAD)
+    modules = await pool.run(
+        eval, "[m for m in ('pdfplumber', 'openpyxl', 'pptx', 'docxtpl') if m in __import__('sys').modules]"
+    )
+    prepared = await pool.run(
+        eval, "sorted(__import__('pathlib').Path(k[0]).name for k in __import__('src.mail_merge').mail_merge._prepared)"
+    )
+    compiled = await pool.run(
+        eval, "len(__import__('src.server').server.template_environment()._compiled_templates)"
+    )
+    pool.shutdown()
+
+    templates = sorted(path.name for path in TEMPLATE_DIR.glob("*.docx"))
+    print(f"   - 已导入: {modules}")
+    print(f"   - 已加载模板: {prepared}, 已编译源: {compiled}")
+    return len(modules) == 4 and prepared == templates and compiled >= len(templates)
+
+
+async def profiled_batch_functions(module):
+    """以 python -m 启动服务,在工作进程中分析一次批量生成,返回分析结果中的函数"""
+    env = dict(os.environ, TOOL_WORKERS="1", WORKER_START_METHOD="forkserver")
+    params = StdioServerParameters(command=sys.executable, args=["-m", module], env=env, cwd=os.getcwd())
+    async with stdio_client(params) as (read_stream, write_stream):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            result = await session.call_tool("generate_documents_batch", {
+                "template_name": "letter.docx",
+                "contexts": [{
+                    "sender_name": "李四",
+                    "letter_date": "2024-03-01",
+                    "recipient_name": "客户0001",
+                    "salutation": "王总",
+                    "subject": "关于合作提案的函",
+                    "body_paragraphs": ["期待您的回复。"],
+                    "closing": "此致敬礼",
+                }],
+                "output_name": "test_worker_entry",
+                "profile": True,
+            })
+    match = re.search(r"Profile\*\*: `([^`]+)`", result.content[-1].text)
+    if match is None:
+        return set()
+    return {(Path(filename).name, function) for filename, _, function in pstats.Stats(match.group(1)).stats}
+
+
+async def test_module_entry():
+    """测试以 python -m 启动时,工作进程使用 forkserver 预加载的模板环境"""
+    print("\n" + "="*60)
+    print("测试 3: python -m 启动时使用预加载的状态")
+    print("="*60)
+
+    passed = True
+    for module in ("src", "src.server"):
+        functions = await profiled_batch_functions(module)
+        # 预加载的模板环境已建好,调用中不应再创建
+        cold = sorted(function for function in functions if function[1] in ("template_environment", "cache_templates"))
+        ran = ("server.py", "generate_documents_batch") in functions
+        print(f"   - python -m {module}: 分析到批量生成 {ran}, 调用中创建模板环境 {cold}")
+        passed = passed and ran and not cold
+    return passed
+
+
+async def main():
+    """主测试函数"""
+    print("🧪 预加载工作进程测试")
+    print("="*60)
+
+    results = {
+        "工作进程启动耗时": await test_recycle_latency(),
+        "预加载的模块和模板": await test_preloaded_state(),
+        "python -m 启动时使用预加载的状态": await test_module_entry(),
+    }
+
+    print("\n" + "="*60)
+    print("📊 测试结果摘要")
+    print("="*60)
+    for test_name, passed in results.items():
+        print(f"{test_name}: {'✅ 通过' if passed else '❌ 失败'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+"""
+测试工具调用的超时与取消: 在工作进程中运行,超时或取消时结束工作进程并重新启动
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# 添加 src 目录到路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from create_corpus import build_corpus
+import src.server as server_module
+from src.progress import progress_reporter
+from src.server import DocxTemplateServer, generated_documents, job_manager, worker_pool
+
+
+def letter_contexts(count):
+    """count 封信的数据"""
+    return [
+        {
+            "sender_name": "李四",
+            "letter_date": "2024-03-01",
+            "recipient_name": f"客户{i:04d}",
+            "salutation": "王总",
+            "subject": "关于合作提案的函",
+            "body_paragraphs": ["期待您的回复。"],
+            "closing": "此致敬礼",
+        }
+        for i in range(count)
+    ]
+
+
+def create_test_pdf():
+    """创建 12 页的 PDF"""
+    corpus_dir = Path("output") / "worker_corpus"
+    manifest = build_corpus(corpus_dir, seed=7, kinds=("pdf",), pdf_pages=12, pdf_tables_every=4)
+    return str(corpus_dir / manifest["files"][0]["file"])
+
+
+def alive(pid):
+    """进程是否仍在运行 (已退出但未回收的僵尸进程视为已结束)"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split(")")[-1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+def worker_pids():
+    return {worker.process.pid for worker in worker_pool._idle + worker_pool._busy}
+
+
+async def test_same_result(server, pdf_path):
+    """测试工作进程中的结果与直接调用一致,进度传回调用方"""
+    print("\n" + "="*60)
+    print("测试 1: 工作进程中解析 PDF")
+    print("="*60)
+
+    progress = []
+    with progress_reporter(lambda done, total, message: progress.append((done, total))):
+        isolated = await server.execute_tool("parse_pdf_document", {"file_path": pdf_path})
+    direct = await server.dispatch_tool("parse_pdf_document", {"file_path": pdf_path})
+    print(f"   - 进度: {progress[:3]} ... {progress[-1] if progress else None}")
+    print(f"   - 工作进程: {worker_pool.stats()}")
+    return (
+        isolated[0].text == direct[0].text
+        and progress[-1] == (12, 12)
+        and worker_pool.stats()["started"] >= 1
+    )
+
+
+async def test_timeout(server):
+    """测试超过期限的调用被结束,工作进程被替换"""
+    print("\n" + "="*60)
+    print("测试 2: 调用超时")
+    print("="*60)
+
+    server_module.TOOL_TIMEOUTS["generate_documents_batch"] = 1
+    try:
+        await server.execute_tool("list_templates", {})
+        before = worker_pool.stats()
+        start = time.time()
+        task = asyncio.create_task(server.execute_tool(
+            "generate_documents_batch",
+            {"template_name": "letter.docx", "contexts": letter_contexts(20000), "output_name": "test_worker_timeout"}
+        ))
+        await asyncio.sleep(0.5)
+        pids = worker_pids()
+        result = await task
+        elapsed = time.time() - start
+    finally:
+        del server_module.TOOL_TIMEOUTS["generate_documents_batch"]
+
+    print(result[0].text)
+    print(f"   - 耗时: {elapsed:.2f}s, 工作进程: {worker_pool.stats()}")
+    recovered = await server.execute_tool("get_document_metadata", {"file_path": create_test_pdf()})
+    return (
+        "did not finish within 1 seconds" in result[0].text
+        and elapsed < 5
+        and worker_pool.stats()["killed"] == before["killed"] + 1
+        and not any(alive(pid) for pid in pids - worker_pids())
+        and "错误" not in recovered[0].text
+    )
+
+
+async def test_cancel_request(server, pdf_path):
+    """测试取消请求时结束工作进程"""
+    print("\n" + "="*60)
+    print("测试 3: 取消请求")
+    print("="*60)
+
+    before = worker_pool.stats()
+    task = asyncio.create_task(server.execute_tool(
+        "generate_documents_batch",
+        {"template_name": "letter.docx", "contexts": letter_contexts(20000)}
+    ))
+    await asyncio.sleep(1)
+    pids = worker_pids()
+    task.cancel()
+    try:
+        await task
+        cancelled = False
+    except asyncio.CancelledError:
+        cancelled = True
+    await asyncio.sleep(0.2)
+
+    print(f"   - 已取消: {cancelled}, 工作进程: {worker_pool.stats()}")
+    return (
+        cancelled
+        and worker_pool.stats()["killed"] == before["killed"] + 1
+        and not any(alive(pid) for pid in pids - worker_pids())
+    )
+
+
+async def test_job_in_worker(server):
+    """测试后台任务在工作进程中运行,生成的文档登记到主进程"""
+    print("\n" + "="*60)
+    print("测试 4: 后台任务与文档登记")
+    print("="*60)
+
+    submitted = await server.submit_job(
+        "generate_documents_batch",
+        {"template_name": "letter.docx", "contexts": letter_contexts(50)}
+    )
+    job = job_manager.get(submitted[0].text.split("**Job ID**: ")[1].split("\n")[0])
+    await job.wait(60)
+    doc_id = job.result[0].text.split("**Document ID**: ")[1].split("\n")[0]
+    print(f"   - 任务状态: {job.state}, 进度: {job.progress}/{job.total}, 文档: {doc_id}")
+    return (
+        job.state == "succeeded"
+        and job.progress == 50
+        and doc_id in generated_documents
+        and Path(generated_documents[doc_id]["path"]).exists()
+    )
+
+
+async def main():
+    """主测试函数"""
+    print("🧪 工作进程超时与取消测试")
+    print("="*60)
+
+    if worker_pool is None:
+        print("TOOL_WORKERS=0, 跳过")
+        return
+
+    pdf_path = create_test_pdf()
+    server = DocxTemplateServer()
+
+    results = {
+        "工作进程中解析 PDF": await test_same_result(server, pdf_path),
+        "调用超时": await test_timeout(server),
+        "取消请求": await test_cancel_request(server, pdf_path),
+        "后台任务与文档登记": await test_job_in_worker(server),
+    }
+    worker_pool.shutdown()
+
+    print("\n" + "="*60)
+    print("📊 测试结果摘要")
+    print("="*60)
+    for test_name, passed in results.items():
+        print(f"{test_name}: {'✅ 通过' if passed else '❌ 失败'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())